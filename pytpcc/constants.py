@@ -163,3 +163,64 @@ TransactionTypes = enum(
     "PAYMENT",
     "STOCK_LEVEL",
 )
+
+#  Terminal emulation (TPC-C 5.2.5.7): the keying times and the mean think
+#  times of each transaction type in seconds. The think times are drawn from
+#  an exponential distribution that is cut off at ten times its mean.
+KEYING_TIME = {
+    TransactionTypes.DELIVERY:     2,
+    TransactionTypes.NEW_ORDER:    18,
+    TransactionTypes.ORDER_STATUS: 2,
+    TransactionTypes.PAYMENT:      3,
+    TransactionTypes.STOCK_LEVEL:  2,
+}
+THINK_TIME = {
+    TransactionTypes.DELIVERY:     5,
+    TransactionTypes.NEW_ORDER:    12,
+    TransactionTypes.ORDER_STATUS: 10,
+    TransactionTypes.PAYMENT:      12,
+    TransactionTypes.STOCK_LEVEL:  5,
+}
+MAX_THINK_TIME_FACTOR = 10
+TERMINALS_PER_WAREHOUSE = DISTRICTS_PER_WAREHOUSE
+
+#  Transaction mix (TPC-C 5.2.4.2): the number of cards of each transaction
+#  type in the deck that every terminal deals its transactions from. The
+#  spec deck meets the minimum percentages of TPC-C 5.2.3 exactly.
+MIX_PROFILES = {
+    "spec": {
+        TransactionTypes.DELIVERY:     1,
+        TransactionTypes.NEW_ORDER:    10,
+        TransactionTypes.ORDER_STATUS: 1,
+        TransactionTypes.PAYMENT:      10,
+        TransactionTypes.STOCK_LEVEL:  1,
+    },
+    ## The percentages that were drawn independently for every transaction
+    ## before there were decks
+    "legacy": {
+        TransactionTypes.DELIVERY:     4,
+        TransactionTypes.NEW_ORDER:    45,
+        TransactionTypes.ORDER_STATUS: 4,
+        TransactionTypes.PAYMENT:      43,
+        TransactionTypes.STOCK_LEVEL:  4,
+    },
+    "read-heavy": {
+        TransactionTypes.NEW_ORDER:    1,
+        TransactionTypes.ORDER_STATUS: 4,
+        TransactionTypes.PAYMENT:      1,
+        TransactionTypes.STOCK_LEVEL:  4,
+    },
+    "new-order-only": {
+        TransactionTypes.NEW_ORDER:    1,
+    },
+    "payment-only": {
+        TransactionTypes.PAYMENT:      1,
+    },
+}
+DEFAULT_MIX = "spec"
+
+#  Retries of the transactions that fail with an error that the driver says is
+#  retriable: the backoff (in seconds) before the first retry when
+#  --retry-backoff is not given, which doubles for every retry up to the max
+DEFAULT_RETRY_BACKOFF = 0.01
+MAX_RETRY_BACKOFF = 1.0
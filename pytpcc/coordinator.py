@@ -46,6 +46,7 @@ from util import *
 from runtime import *
 import drivers
 from hdrh.histogram import HdrHistogram
+from util.results import makeHistogram
 import constants
 
 logging.basicConfig(level = logging.INFO,
@@ -87,24 +88,37 @@ def startLoading(scalParameters,args,config,channels):
         
     load_start=time.time()
     for i in range(len(channels)):
-        m=message.Message(header=message.CMD_LOAD,data=[scalParameters,args,config,w_ids[i]])
+        m=message.Message(header=message.CMD_LOAD,data=[scalParameters,args,config,w_ids[i],(i,procs)])
         channels[i].send(pickle.dumps(m,-1))
+    load_stats = None
     for ch in channels:
-        ch.receive()
-        pass
-    return time.time()-load_start
+        stats=pickle.loads(ch.receive()).data
+        if load_stats == None:
+            load_stats = stats
+        else:
+            load_stats.append(stats)
+    
+    ## Every worker loaded part of the ITEM table, so fire loadFinishItem once they are all done
+    m=message.Message(header=message.CMD_LOAD_FINISH_ITEM,data=[args,config])
+    channels[0].send(pickle.dumps(m,-1))
+    channels[0].receive()
+    return (time.time()-load_start, load_stats)
 
 
 ## ==============================================
 ## startExecution
 ## ==============================================
-def startExecution(scaleParameters, args, config,channels):
+def startExecution(scaleParameters, args, config,channels,nodes):
     procs = len(channels)
     total_results = results.Results()
     
-    for ch in channels:
-        m=message.Message(header=message.CMD_EXECUTE,data=[scaleParameters,args,config])
-        ch.send(pickle.dumps(m,-1))
+    ## Every client process gets its own share of the home warehouses, and
+    ## every node a share in proportion to its client processes
+    homes = executor.assignClientWarehouses(scaleParameters, procs, nodes)
+    for i in range(procs):
+        clientArgs = dict(args, client_warehouses=homes[i])
+        m=message.Message(header=message.CMD_EXECUTE,data=[scaleParameters,clientArgs,config,i])
+        channels[i].send(pickle.dumps(m,-1))
     for ch in channels:
         r=pickle.loads(ch.receive()).data
         total_results.append(r)
@@ -136,7 +150,79 @@ if __name__ == '__main__':
     ## number of processes per node
     aparser.add_argument('--clientprocs', default=1, type=int, metavar='N',
                          help='Number of processes on each client node.')
+    aparser.add_argument('--rate', type=float, metavar='TPS',
+                         help='Start transactions at this total rate over all of the clients, no matter how long they take (open-loop)')
+    aparser.add_argument('--arrivals', default='poisson', choices=['poisson', 'constant'],
+                         help='The distribution of the time between the transactions started with --rate')
+    aparser.add_argument('--threads', default=1, type=int, metavar='K',
+                         help='The number of blocking terminals that each client process runs in threads, each with its own driver')
+    aparser.add_argument('--terminals', default=1, type=int, metavar='T',
+                         help='The number of terminals that each client process runs concurrently')
+    aparser.add_argument('--mix', metavar='MIX',
+                         help='The transaction mix: one of %s (default: %s), or the number of cards of each transaction type in the deck, e.g. NEW_ORDER=1,PAYMENT=1' % \
+                              (", ".join(sorted(constants.MIX_PROFILES.keys())), constants.DEFAULT_MIX))
+    aparser.add_argument('--skew', metavar='SKEW',
+                         help='The distributions of the transaction parameters (%s) as PARAM=DIST[:ARG...] with DIST in %s, e.g. warehouse=zipfian:0.99,item=hotspot:0.2:0.8, and the remote percentages, e.g. remote-item=5,remote-payment=30' % \
+                              (", ".join(distribution.PARAMETERS), ", ".join(distribution.DISTRIBUTIONS)))
+    aparser.add_argument('--home-warehouses', action='store_true',
+                         help='Bind every terminal to home warehouses of its own instead of picking any warehouse for each transaction')
+    aparser.add_argument('--emulate-terminals', action='store_true',
+                         help='Emulate the terminals of the spec: ten per warehouse, each with keying and think times')
+    aparser.add_argument('--terminal-time-scale', default=1.0, type=float, metavar='F',
+                         help='Scale the keying and think times of --emulate-terminals by this factor')
+    aparser.add_argument('--driver-threads', type=int, metavar='N',
+                         help='The number of threads that run the transactions of the terminals of drivers that are not asynchronous (default: one per terminal)')
+    aparser.add_argument('--loaderprocs', default=1, type=int, metavar='P',
+                         help='Number of processes each client process uses to load its warehouses.')
+    aparser.add_argument('--load-pipeline', default=0, type=int, metavar='G',
+                         help='Generate the data in G processes that feed separate driver writer threads.')
+    aparser.add_argument('--load-writers', default=1, type=int, metavar='W',
+                         help='The number of driver writer threads used with --load-pipeline.')
+    aparser.add_argument('--data-cache', metavar='DIR',
+                         help='Cache the generated data in this directory on each client node and replay it on later loads with the same --seed.')
                          
+    aparser.add_argument('--load-journal', metavar='DIR',
+                         help='Record the progress of the load in a journal in this directory')
+    aparser.add_argument('--resume-load', action='store_true',
+                         help='Resume the most recent load in the --load-journal directory, skipping the data that it already loaded')
+    aparser.add_argument('--load-stats', metavar='FILE',
+                         help='Write the per worker and per table load statistics to this file as JSON')
+    aparser.add_argument('--timeline', metavar='FILE',
+                         help='Write the throughput and latency of every second of the run to this file (as CSV if it ends with .csv, otherwise as JSON)')
+    aparser.add_argument('--results', metavar='FILE',
+                         help='Write the counts, latency histograms and timeline of the run to this file as JSON')
+    aparser.add_argument('--replay', metavar='PATH',
+                         help='Run the transactions of a trace that the csv driver recorded (its txn_directory, or one of its files) instead of generating them, split across the clients by warehouse')
+    aparser.add_argument('--replay-speed', default=1.0, type=float, metavar='F',
+                         help='Replay the trace at this multiple of its original pace, or as fast as possible with 0')
+    aparser.add_argument('--param-stream', action='store_true',
+                         help='Generate the transaction parameters ahead of time in a helper process')
+    aparser.add_argument('--param-cache', metavar='DIR',
+                         help='Pre-generate the transaction parameters in this directory on each client node and reuse them in later runs with the same --seed')
+    aparser.add_argument('--slo-p99', type=float, metavar='MS',
+                         help='Instead of running the benchmark once, search for the highest load whose p99 latency stays within this many milliseconds')
+    aparser.add_argument('--slo-p999', type=float, metavar='MS',
+                         help='Also require the p99.9 latency of the saturation search steps to stay within this many milliseconds')
+    aparser.add_argument('--search-knob', default=saturation.KNOB_RATE, choices=[saturation.KNOB_RATE, saturation.KNOB_TERMINALS],
+                         help='Adjust the load of the saturation search by the target rate (over all of the clients) or the number of terminals per client')
+    aparser.add_argument('--search-min', type=float, metavar='L',
+                         help='The load that the saturation search starts from (--rate or 10 transactions/s, or 1 terminal, by default)')
+    aparser.add_argument('--search-max', type=float, metavar='L',
+                         help='The highest load that the saturation search tries')
+    aparser.add_argument('--search-steps', default=saturation.SEARCH_MAX_STEPS, type=int, metavar='N',
+                         help='The most steps (each a run of --duration seconds after --warmup) that the saturation search takes')
+    aparser.add_argument('--search-output', metavar='FILE',
+                         help='Write the result and the whole curve of the saturation search to this file as JSON')
+    aparser.add_argument('--deferred-delivery', action='store_true',
+                         help='Only queue the DELIVERY transactions at the terminals, and run them in the background as in TPC-C 2.7.2')
+    aparser.add_argument('--delivery-workers', default=1, type=int, metavar='N',
+                         help='Number of background workers per client process that run the queued DELIVERY transactions')
+    aparser.add_argument('--retries', default=0, type=int, metavar='R',
+                         help='Retry a transaction that failed with an error that the driver says is retriable (e.g., a conflict) up to this many times')
+    aparser.add_argument('--retry-backoff', default=constants.DEFAULT_RETRY_BACKOFF, type=float, metavar='S',
+                         help='Wait up to this many seconds before the first retry of a transaction, and twice as long before each of the next ones')
+    aparser.add_argument('--seed', type=int,
+                         help='Master seed that all of the random data and transaction parameters are derived from')
     aparser.add_argument('--stop-on-error', action='store_true',
                          help='Stop the transaction execution when the driver throws an exception.')
     aparser.add_argument('--no-load', action='store_true',
@@ -150,6 +236,17 @@ if __name__ == '__main__':
     args = vars(aparser.parse_args())
 
     if args['debug']: logging.getLogger().setLevel(logging.DEBUG)
+    ## The cache is keyed by the seed, so a random one would never be replayed
+    if args['data_cache']: assert args['seed'] != None or args['resume_load'], "--data-cache requires --seed"
+    if args['resume_load']:
+        assert args['load_journal'], "--resume-load requires --load-journal"
+        assert not args['reset'], "Cannot reset the database when resuming a load"
+    if args['replay']:
+        assert not args['slo_p99'], "Cannot search for the saturation point of a replay"
+        assert not args['deferred_delivery'], "Cannot defer the DELIVERY transactions of a replay"
+    args['load_id'] = time.strftime("%Y%m%d-%H%M%S")
+    args['mix'] = executor.parseMix(args['mix'])
+    args['skew'] = distribution.parseSkew(args['skew'])
         
     ## Create a handle to the target client driver
     driverClass = createDriverClass(args['system'])
@@ -183,6 +280,7 @@ if __name__ == '__main__':
     ##Get a list of clientnodes from configuration file.
     clients=[]
     channels=[]
+    nodes=[]
     total_clients = 0
     assert config['clients']!=''
     clients=re.split(r"\s+",str(config['clients']))
@@ -202,25 +300,48 @@ if __name__ == '__main__':
             gw=execnet.makegateway(cmd)
             ch=gw.remote_exec(worker)
             channels.append(ch)
+            nodes.append(node)
     
     ## Create ScaleParameters
     scaleParameters = scaleparameters.makeWithScaleFactor(args['warehouses'], args['scalefactor'])
-    nurand = rand.setNURand(nurand.makeForLoad())
+    ## A resumed load goes on with the seed that it was started with (if the journal
+    ## directory is shared with the client nodes)
+    if args['seed'] == None and args['resume_load']: args['seed'] = loadjournal.resumeSeed(args['load_journal'])
+    if args['seed'] == None: args['seed'] = rand.makeSeed()
+    logging.info("Using random seed %d" % args['seed'])
+    rand.setNURand(nurand.makeForSeed(args['seed'])[0])
     if args['debug']: logging.debug("Scale Parameters:\n%s" % scaleParameters)
     if args['debug']: logging.debug("Total clients: %s" % str(total_clients))
+    if args['rate']: args['client_rate'] = args['rate'] / float(total_clients)
+    args['total_clients'] = total_clients
     ## DATA LOADER!!!
     load_time = None
     if not args['no_load']:
-        load_time = startLoading(scaleParameters, args, config,channels)
-        #print load_time
+        load_time, load_stats = startLoading(scaleParameters, args, config,channels)
+        print load_stats.show(load_time)
+        if args['load_stats']: load_stats.save(args['load_stats'], load_time)
     ## IF
     
+    ## SATURATION SEARCH!!!
+    ## The workers stay up between the steps, so every step after the first
+    ## one runs on warm clients
+    if not args['no_execute'] and args['slo_p99']:
+        search = saturation.makeSaturationSearch(args, lambda stepArgs: startExecution(scaleParameters, stepArgs, config, channels, nodes))
+        search.run()
+        print search.show()
+        if args['search_output']: search.save(args['search_output'])
+    
     ## WORKLOAD DRIVER!!!
-    if not args['no_execute']:
-        results = startExecution(scaleParameters, args, config,channels)
+    elif not args['no_execute']:
+        results = startExecution(scaleParameters, args, config,channels,nodes)
         assert results
+        duration = args['duration']
+        ## A replay ends early if it runs out of transactions
+        if args['replay']: duration = max(min(duration, results.stop - results.start - args['warmup']), 1)
         #print results.show(args['duration'], load_time)
-        hdr = HdrHistogram(1, 1000000, 3)
+        if args['timeline']: results.saveTimeline(args['timeline'])
+        if args['results']: results.save(args['results'], duration)
+        hdr = makeHistogram()
         d = constants.TransactionTypes.DELIVERY
         no = constants.TransactionTypes.NEW_ORDER
         os = constants.TransactionTypes.ORDER_STATUS
@@ -230,11 +351,30 @@ if __name__ == '__main__':
         for t in [d, no, os, p, sl]:
             sum_commits += results.txn_counters[t]
             hdr.add(results.txn_times[t])
-        throughput = sum_commits / args['duration']
+        throughput = sum_commits / duration
         print '[raw]'
         print 'total = {}'.format(sum_commits)
         print '[throughput]'
         print 'commits/s = {}'.format(throughput)
+        print 'tpmC = {}'.format(results.tpmC(duration))
+        print '[mix]'
+        mix = results.mix()
+        for t in [d, no, os, p, sl]:
+            print '{} = {:.4f}'.format(t.lower(), mix[t])
+        if results.deferred_count > 0:
+            print '[deferred-delivery]'
+            print 'executed = {}'.format(results.deferred_count)
+            print 'queue-median = {}'.format(results.deferred_queue_times.get_value_at_percentile(50))
+            print 'queue-99 = {}'.format(results.deferred_queue_times.get_value_at_percentile(99))
+            print 'processing-median = {}'.format(results.deferred_times.get_value_at_percentile(50))
+            print 'processing-99 = {}'.format(results.deferred_times.get_value_at_percentile(99))
+        print '[aborts]'
+        for t in [d, no, os, p, sl]:
+            print '{}-attempts = {}'.format(t.lower(), results.attempts(t))
+            for reason, count in sorted(results.txn_retries[t].items()):
+                print '{}-retries-{} = {}'.format(t.lower(), reason, count)
+            for reason, count in sorted(results.txn_aborts[t].items()):
+                print '{}-aborts-{} = {}'.format(t.lower(), reason, count)
         print '[latency]'
         print 'lat-min = {}'.format(hdr.get_min_value())
         print 'lat-mean = {}'.format(hdr.get_mean_value())
@@ -83,10 +83,54 @@ class AbstractDriver(object):
         """Optional callback to indicate to the driver that the data for the given district is finished."""
         return None
         
+    def loadCheckpoint(self):
+        """Optional callback to make all of the data passed to the driver so far durable.
+        When the load is journaled, this is called before a unit of work is recorded as done."""
+        return None
+        
+    def loadCleanupItems(self, first_i_id, last_i_id):
+        """Optional callback to delete whatever was stored for the ITEM ids in [first_i_id, last_i_id]
+        by a load that was interrupted, before they are loaded again. Drivers need to implement
+        this and the other loadCleanup callbacks for an interrupted load to be resumed."""
+        return None
+        
+    def loadCleanupWarehouse(self, w_id):
+        """Optional callback to delete the WAREHOUSE record of an interrupted load."""
+        return None
+        
+    def loadCleanupDistrict(self, w_id, d_id):
+        """Optional callback to delete all of the data of the given district from an interrupted load."""
+        return None
+        
+    def loadCleanupStock(self, w_id, first_i_id, last_i_id):
+        """Optional callback to delete the STOCK records for the given item ids from an interrupted load."""
+        return None
+        
+    def loadSupportsCleanup(self):
+        """Returns true if this driver implements the loadCleanup callbacks, without which
+        an interrupted load cannot be resumed."""
+        return type(self).loadCleanupDistrict.im_func != AbstractDriver.loadCleanupDistrict.im_func
+        
     def loadTuples(self, tableName, tuples):
         """Load a list of tuples into the target table"""
         raise NotImplementedError("%s does not implement loadTuples" % (self.driver_name))
         
+    def loadTupleStream(self, tableName, chunks):
+        """Optional callback to load the tuples of the target table from an iterator of lists of tuples.
+        Each chunk is only generated when the driver asks for the next one, so drivers that can consume
+        the tuples incrementally should override this to keep the loader's memory usage bounded.
+        The default passes each chunk to loadTuples."""
+        for tuples in chunks:
+            self.loadTuples(tableName, tuples)
+        return None
+        
+    def loadBatchBounds(self, tableName):
+        """Optional callback that returns the (min, max) number of tuples that the loader may pass
+        in one loadTuples call for the target table. The loader adapts the batch size to the rate at
+        which the driver ingests the tuples within these bounds, so drivers with request size
+        limits should lower the maximum for the tables with wide rows."""
+        return (100, 10000)
+        
     def executeStart(self):
         """Optional callback before the execution phase starts"""
         return None
@@ -112,6 +156,39 @@ class AbstractDriver(object):
             assert False, "Unexpected TransactionType: " + txn
         return result
         
+    def executeTransactionAsync(self, txn, params, callback):
+        """Optional asynchronous variant of executeTransaction. It starts the transaction and returns
+        right away, and callback(result, error) is invoked exactly once when the transaction is done,
+        from any thread. error is None if the transaction succeeded. Drivers whose client library is
+        non-blocking should override this so that a single driver can have the transactions of many
+        terminals outstanding at once. The default executes the transaction before returning."""
+        try:
+            result = self.executeTransaction(txn, params)
+        except (Exception, AssertionError), ex:
+            callback(None, ex)
+            return None
+        callback(result, None)
+        return None
+        
+    @classmethod
+    def isAsync(cls):
+        """Return whether this driver class implements executeTransactionAsync itself"""
+        return (cls.executeTransactionAsync.im_func is not AbstractDriver.executeTransactionAsync.im_func)
+        
+    @classmethod
+    def isRetriable(cls, error):
+        """Return whether a transaction that failed with the given error can be run again and
+        might succeed, e.g., because it lost a conflict with another transaction or a lock timed
+        out. The executors retry these (with backoff) when --retries is given. Drivers whose
+        backend reports conflicts with specific errors should override this."""
+        return False
+        
+    @classmethod
+    def abortReason(cls, error):
+        """Return a short name for the reason that a transaction failed with the given error.
+        The retries and aborts of every transaction type are counted by reason."""
+        return error.__class__.__name__
+        
     def doDelivery(self, params):
         """Execute DELIVERY Transaction
         Parameters Dict:
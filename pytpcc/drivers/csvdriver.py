@@ -26,10 +26,18 @@
 
 import os
 import csv
+import time
+import threading
 from datetime import datetime
 from pprint import pprint,pformat
 
 from abstractdriver import *
+from util import records
+
+## The clients in the same process each write their trace to a file with
+## their own number
+nextTraceId = 0
+traceIdLock = threading.Lock()
 
 ## ==============================================
 ## CSVDriver
@@ -38,6 +46,7 @@ class CsvDriver(AbstractDriver):
     DEFAULT_CONFIG = {
         "table_directory": ("The path to the directory to store the table CSV files", "/tmp/tpcc-tables" ),
         "txn_directory": ("The path to the directory to store the txn CSV files", "/tmp/tpcc-txns" ),
+        "txn_format": ("Write the txns as a CSV file per transaction type ('csv') or as a compact trace file per client ('binary')", "csv" ),
     }
     
     def __init__(self, ddl):
@@ -45,8 +54,11 @@ class CsvDriver(AbstractDriver):
         self.table_directory = None
         self.table_outputs = { }
         self.txn_directory = None
+        self.txn_files = { }
         self.txn_outputs = { }
         self.txn_params = { }
+        self.txn_format = None
+        self.trace_output = None
     ## DEF
     
     def makeDefaultConfig(self):
@@ -54,6 +66,8 @@ class CsvDriver(AbstractDriver):
     ## DEF
     
     def loadConfig(self, config):
+        ## Configuration files from before the binary trace do not have it
+        if not "txn_format" in config: config["txn_format"] = CsvDriver.DEFAULT_CONFIG["txn_format"][1]
         for key in CsvDriver.DEFAULT_CONFIG.keys():
             assert key in config, "Missing parameter '%s' in %s configuration" % (key, self.name)
         
@@ -64,6 +78,9 @@ class CsvDriver(AbstractDriver):
         self.txn_directory = config["txn_directory"]
         assert self.txn_directory
         if not os.path.exists(self.txn_directory): os.makedirs(self.txn_directory)
+        
+        self.txn_format = config["txn_format"]
+        assert self.txn_format in ("csv", "binary"), "Unknown txn_format '%s'" % self.txn_format
     ## DEF
     
     def loadTuples(self, tableName, tuples):
@@ -75,15 +92,40 @@ class CsvDriver(AbstractDriver):
     ## DEF
     
     def executeTransaction(self, txn, params):
+        if self.txn_format == "binary":
+            ## The clients each write their own trace, in the order that they
+            ## ran their transactions
+            if self.trace_output == None:
+                global nextTraceId
+                with traceIdLock:
+                    traceId = nextTraceId
+                    nextTraceId += 1
+                path = os.path.join(self.txn_directory, "trace-%d-%d.dat" % (os.getpid(), traceId))
+                self.trace_output = open(path, 'wb')
+            records.writeRecord(self.trace_output, (time.time(), txn, params))
+            return
+        ## IF
         if not txn in self.txn_outputs:
             path = os.path.join(self.txn_directory, "%s.csv" % txn)
-            self.txn_outputs[txn] = csv.writer(open(path, 'wb'), quoting=csv.QUOTE_ALL)
+            self.txn_files[txn] = open(path, 'wb')
+            self.txn_outputs[txn] = csv.writer(self.txn_files[txn], quoting=csv.QUOTE_ALL)
             self.txn_params[txn] = params.keys()[:]
             self.txn_outputs[txn].writerow(["Timestamp"] + self.txn_params[txn])
         ## IF
         row = [datetime.now()] + [params[k] for k in self.txn_params[txn]]
         self.txn_outputs[txn].writerow(row)
     ## DEF
+    
+    def executeFinish(self):
+        ## The client processes do not flush their files when they exit
+        for f in self.txn_files.values():
+            f.close()
+        self.txn_files = { }
+        self.txn_outputs = { }
+        if self.trace_output != None:
+            self.trace_output.close()
+            self.trace_output = None
+    ## DEF
 ## CLASS
 
         
@@ -331,7 +331,7 @@ class MembaseDriver(AbstractDriver):
         end_time = time.time()
         self.load_time += (end_time - start_time)
         self.conn.replace(tableName+"_max_pkey",temp_max_id)     
-        print "[",tableName,"]"," Current Load Time: ",self.load_time
+        logging.debug("%s: total time in the driver so far %.2f seconds" % (tableName, self.load_time))
         logging.debug("Loaded %d tuples for tableName %s" % (len(tuples), tableName))
         return
 
@@ -336,6 +336,45 @@ class MongodbDriver(AbstractDriver):
         
         return
         
+    ## ----------------------------------------------
+    ## loadBatchBounds
+    ## ----------------------------------------------
+    def loadBatchBounds(self, tableName):
+        ## Each batch is sent as one insert message, which the server limits in size
+        if tableName in [constants.TABLENAME_STOCK, constants.TABLENAME_CUSTOMER]:
+            return (100, 5000)
+        return (100, 20000)
+        
+    ## ----------------------------------------------
+    ## loadCheckpoint
+    ## ----------------------------------------------
+    def loadCheckpoint(self):
+        ## Inserts are not acknowledged, so wait for everything sent so far to be flushed
+        self.conn.fsync()
+
+    ## ----------------------------------------------
+    ## loadCleanup
+    ## ----------------------------------------------
+    def loadCleanupItems(self, first_i_id, last_i_id):
+        self.item.remove({"I_ID": {"$gte": first_i_id, "$lte": last_i_id}}, safe=True)
+
+    def loadCleanupWarehouse(self, w_id):
+        self.warehouse.remove({"W_ID": w_id}, safe=True)
+
+    def loadCleanupDistrict(self, w_id, d_id):
+        self.district.remove({"D_W_ID": w_id, "D_ID": d_id}, safe=True)
+        ## The denormalized ORDERS, ORDER_LINE, and HISTORY records are stored inside of the CUSTOMER
+        self.customer.remove({"C_W_ID": w_id, "C_D_ID": d_id}, safe=True)
+        if not self.denormalize:
+            self.history.remove({"H_C_W_ID": w_id, "H_C_D_ID": d_id}, safe=True)
+            self.orders.remove({"O_W_ID": w_id, "O_D_ID": d_id}, safe=True)
+            self.order_line.remove({"OL_W_ID": w_id, "OL_D_ID": d_id}, safe=True)
+        ## IF
+        self.new_order.remove({"NO_W_ID": w_id, "NO_D_ID": d_id}, safe=True)
+
+    def loadCleanupStock(self, w_id, first_i_id, last_i_id):
+        self.stock.remove({"S_W_ID": w_id, "S_I_ID": {"$gte": first_i_id, "$lte": last_i_id}}, safe=True)
+
     ## ----------------------------------------------
     ## loadFinishDistrict
     ## ----------------------------------------------
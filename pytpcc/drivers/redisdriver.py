@@ -1285,6 +1285,16 @@ class RedisDriver(AbstractDriver):
 			
 		return len(stock_counts)
 		
+	#------------------------------------------------------------------------
+	# A transaction whose WATCHed keys changed before its MULTI/EXEC
+	# can be run again
+	#
+	# @param Exception error
+	#------------------------------------------------------------------------
+	@classmethod
+	def isRetriable(cls, error) :
+		return isinstance(error, redis.WatchError)
+	
 	#------------------------------------------------------------------------
 	# Load the specified configuration for Redis TPC-C run
 	#
@@ -12,7 +12,7 @@ import os, logging, commands, constants
 
 from collections import defaultdict
 
-from api.Scalaris import JSONConnection, Transaction, TransactionSingleOp, NotFoundException
+from api.Scalaris import JSONConnection, Transaction, TransactionSingleOp, NotFoundException, AbortException, TimeoutException
 
 
 #Table Definitions
@@ -211,6 +211,14 @@ class ScalarisDriver(AbstractDriver):
     def makeDefaultConfig(self):
         return ScalarisDriver.DEFAULT_CONFIG
     
+    ## ----------------------------------------------
+    ## isRetriable
+    ## ----------------------------------------------
+    @classmethod
+    def isRetriable(cls, error):
+        ## A transaction that conflicted with another one is aborted at commit
+        return isinstance(error, (AbortException, TimeoutException))
+    
     ## ----------------------------------------------
     ## loadConfig
     ## ----------------------------------------------
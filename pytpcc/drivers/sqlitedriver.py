@@ -35,6 +35,7 @@ import os
 import sqlite3
 import logging
 import commands
+import itertools
 from pprint import pprint,pformat
 
 import constants
@@ -118,6 +119,23 @@ class SqliteDriver(AbstractDriver):
     def makeDefaultConfig(self):
         return SqliteDriver.DEFAULT_CONFIG
     
+    ## ----------------------------------------------
+    ## isRetriable
+    ## ----------------------------------------------
+    @classmethod
+    def isRetriable(cls, error):
+        ## Another connection held the lock on the database for longer than the timeout
+        return isinstance(error, sqlite3.OperationalError) and cls.abortReason(error) == "locked"
+    
+    ## ----------------------------------------------
+    ## abortReason
+    ## ----------------------------------------------
+    @classmethod
+    def abortReason(cls, error):
+        if isinstance(error, sqlite3.OperationalError) and ("locked" in str(error) or "busy" in str(error)):
+            return "locked"
+        return super(SqliteDriver, cls).abortReason(error)
+    
     ## ----------------------------------------------
     ## loadConfig
     ## ----------------------------------------------
@@ -155,6 +173,64 @@ class SqliteDriver(AbstractDriver):
         logging.debug("Loaded %d tuples for tableName %s" % (len(tuples), tableName))
         return
 
+    ## ----------------------------------------------
+    ## loadTupleStream
+    ## ----------------------------------------------
+    def loadTupleStream(self, tableName, chunks):
+        ## The first tuple gives the number of columns. Chunks can be empty.
+        chunks = iter(chunks)
+        first = next(chunks, None)
+        while first != None and not first:
+            first = next(chunks, None)
+        if first == None: return
+        
+        ## Let executemany() pull the tuples straight out of the loader's generator
+        p = ["?"]*len(first[0])
+        sql = "INSERT INTO %s VALUES (%s)" % (tableName, ",".join(p))
+        self.cursor.executemany(sql, itertools.chain(first, itertools.chain.from_iterable(chunks)))
+        
+        logging.debug("Loaded %d tuples for tableName %s" % (self.cursor.rowcount, tableName))
+        return
+
+    ## ----------------------------------------------
+    ## loadBatchBounds
+    ## ----------------------------------------------
+    def loadBatchBounds(self, tableName):
+        ## executemany() streams the tuples, so big batches cost nothing
+        return (1000, 50000)
+
+    ## ----------------------------------------------
+    ## loadCheckpoint
+    ## ----------------------------------------------
+    def loadCheckpoint(self):
+        self.conn.commit()
+
+    ## ----------------------------------------------
+    ## loadCleanup
+    ## ----------------------------------------------
+    def loadCleanupItems(self, first_i_id, last_i_id):
+        self.cursor.execute("DELETE FROM ITEM WHERE I_ID BETWEEN ? AND ?", (first_i_id, last_i_id))
+        self.conn.commit()
+
+    def loadCleanupWarehouse(self, w_id):
+        self.cursor.execute("DELETE FROM WAREHOUSE WHERE W_ID = ?", (w_id,))
+        self.conn.commit()
+
+    def loadCleanupDistrict(self, w_id, d_id):
+        for sql in [ "DELETE FROM DISTRICT WHERE D_W_ID = ? AND D_ID = ?",
+                     "DELETE FROM CUSTOMER WHERE C_W_ID = ? AND C_D_ID = ?",
+                     "DELETE FROM HISTORY WHERE H_C_W_ID = ? AND H_C_D_ID = ?",
+                     "DELETE FROM ORDERS WHERE O_W_ID = ? AND O_D_ID = ?",
+                     "DELETE FROM NEW_ORDER WHERE NO_W_ID = ? AND NO_D_ID = ?",
+                     "DELETE FROM ORDER_LINE WHERE OL_W_ID = ? AND OL_D_ID = ?" ]:
+            self.cursor.execute(sql, (w_id, d_id))
+        ## FOR
+        self.conn.commit()
+
+    def loadCleanupStock(self, w_id, first_i_id, last_i_id):
+        self.cursor.execute("DELETE FROM STOCK WHERE S_W_ID = ? AND S_I_ID BETWEEN ? AND ?", (w_id, first_i_id, last_i_id))
+        self.conn.commit()
+
     ## ----------------------------------------------
     ## loadFinish
     ## ----------------------------------------------
@@ -0,0 +1,670 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import sys
+import time
+import heapq
+import logging
+import threading
+import traceback
+import Queue
+
+import constants
+import executor
+import paramstream
+from util import *
+
+## The interarrival time distributions of the open-loop mode
+ARRIVALS_POISSON = "poisson"
+ARRIVALS_CONSTANT = "constant"
+
+## The number of threads that run the transactions of a blocking driver in
+## open-loop and terminal emulation modes when --driver-threads is not given
+OPEN_LOOP_DRIVER_THREADS = 16
+
+## The events that the AsyncExecutor and the OpenLoopExecutor handle
+EVENT_ARRIVAL = "ARRIVAL"       # (EVENT_ARRIVAL, intendedStartTime)
+EVENT_COMPLETION = "DONE"       # (EVENT_COMPLETION, terminal, result, error)
+EVENT_RETRY = "RETRY"           # (EVENT_RETRY, terminal)
+
+## ==============================================
+## SyncDriverAdapter
+## ==============================================
+class SyncDriverAdapter:
+    """
+        Gives blocking drivers the executeTransactionAsync interface by
+        running their transactions in a pool of threads. Drivers are not
+        thread-safe, so every thread creates and uses a driver of its own.
+    """
+    
+    def __init__(self, makeDriver, threads):
+        self.makeDriver = makeDriver
+        self.requests = Queue.Queue()
+        self.errors = [ ]
+        self.threads = [ ]
+        for i in range(threads):
+            t = threading.Thread(target=self.run)
+            t.daemon = True
+            self.threads.append(t)
+        ## FOR
+    
+    def executeStart(self):
+        for t in self.threads:
+            t.start()
+    
+    def executeFinish(self):
+        """Stop the threads once they are done with the transactions that were already started"""
+        for t in self.threads:
+            self.requests.put(None)
+        for t in self.threads:
+            t.join()
+        if self.errors: raise Exception("Driver thread failed\n%s" % self.errors[0])
+    
+    def executeTransactionAsync(self, txn, params, callback):
+        self.requests.put((txn, params, callback))
+    
+    def run(self):
+        try:
+            driver = self.makeDriver()
+            driver.executeStart()
+        except (Exception, AssertionError), ex:
+            logging.warn("Failed to create driver: %s" % ex)
+            self.errors.append(traceback.format_exc())
+            driver = None
+        
+        for request in iter(self.requests.get, None):
+            txn, params, callback = request
+            if driver == None:
+                callback(None, Exception("Driver thread failed to start"))
+                continue
+            try:
+                result = driver.executeTransaction(txn, params)
+            except (Exception, AssertionError), ex:
+                callback(None, ex)
+                continue
+            callback(result, None)
+        ## FOR
+        
+        if driver != None: driver.executeFinish()
+    ## DEF
+## CLASS
+
+## ==============================================
+## RetryTimer
+## ==============================================
+class RetryTimer:
+    """
+        Puts the retries of the transactions that failed back on the event
+        queue of an executor once their backoff is over, so that the
+        executor's loop runs them again. A single thread waits for all of
+        them, and is only started once there is a first retry.
+    """
+    
+    def __init__(self, events):
+        self.events = events
+        self.timers = [ ]
+        self.sequence = 0
+        self.cond = threading.Condition()
+        self.thread = None
+    
+    def schedule(self, delay, event):
+        with self.cond:
+            self.sequence += 1
+            heapq.heappush(self.timers, (time.time() + delay, self.sequence, event))
+            if self.thread == None:
+                self.thread = threading.Thread(target=self.run)
+                self.thread.daemon = True
+                self.thread.start()
+            self.cond.notify()
+        ## WITH
+    
+    def run(self):
+        with self.cond:
+            while True:
+                if not self.timers:
+                    self.cond.wait()
+                    continue
+                delay = self.timers[0][0] - time.time()
+                if delay > 0:
+                    self.cond.wait(delay)
+                    continue
+                due, sequence, event = heapq.heappop(self.timers)
+                self.events.put(event)
+            ## WHILE
+        ## WITH
+    ## DEF
+## CLASS
+
+## ==============================================
+## Terminal
+## ==============================================
+class Terminal:
+    """
+        One logical terminal: it has at most one transaction outstanding at a
+        time. A terminal with a (w_ids, d_id) home or a MixDeck of its own
+        sets them on the generator that it shares with other terminals before
+        every transaction.
+    """
+    
+    def __init__(self, terminalId, generator, home = None, deck = None):
+        self.terminalId = terminalId
+        self.generator = generator
+        self.home = home
+        self.deck = deck
+        self.txn = None
+        self.params = None
+        self.txn_id = None
+        self.attempt = 0
+    
+    def nextTransaction(self):
+        ## The number of times that the transaction was retried so far
+        self.attempt = 0
+        ## A DELIVERY is repeated for all of the districts of its warehouse,
+        ## just like the blocking Executor does
+        if self.txn != constants.TransactionTypes.DELIVERY:
+            if self.home != None: self.generator.home = self.home
+            if self.deck != None: self.generator.deck = self.deck
+            self.txn, self.params = self.generator.doOne()
+        return (self.txn, self.params)
+    
+    def completed(self):
+        if self.txn == constants.TransactionTypes.DELIVERY:
+            if self.params['d_id'] < constants.DISTRICTS_PER_WAREHOUSE:
+                ## The next district is a transaction of its own with its own retries
+                self.params['d_id'] += 1
+                self.attempt = 0
+            else:
+                self.txn = None
+    ## DEF
+## CLASS
+
+## ==============================================
+## AsyncExecutor
+## ==============================================
+class AsyncExecutor:
+    """
+        Runs many logical terminals in a single process. Each terminal keeps
+        one transaction outstanding at the driver's executeTransactionAsync,
+        and all of the completions are handled by a single loop, so the
+        Results do not need to be thread-safe. The driver can be one that is
+        asynchronous itself or a SyncDriverAdapter. The terminals take their
+        transactions from the given ParameterStreams if there are any, which
+        are closed when the execution is over, and are bound to the given
+        homes if there are any. The transactions that fail with a retriable
+        error are run again after the backoff of the given RetryPolicy. With
+        a DeliveryQueue, the terminals only queue their DELIVERY transactions
+        and go on with their next transaction.
+    """
+    
+    def __init__(self, driver, scaleParameters, terminals, stop_on_error = False, seed = None, clientId = 0, streams = None, homes = None, mix = None, skew = None, retry = None, deliveries = None):
+        self.driver = driver
+        self.scaleParameters = scaleParameters
+        self.stop_on_error = stop_on_error
+        self.streams = streams
+        self.completions = Queue.Queue()
+        self.retry = retry if retry != None else executor.RetryPolicy()
+        self.retryTimer = RetryTimer(self.completions)
+        self.deliveries = deliveries
+        self.terminals = [ ]
+        for i in range(terminals):
+            if streams != None:
+                generator = streams.get(i)
+            else:
+                generator = executor.Executor(None, scaleParameters, seed=seed, clientId=clientId, terminalId=i, home=homes[i] if homes != None else None, mix=mix, skew=skew)
+            self.terminals.append(Terminal(i, generator))
+        ## FOR
+    ## DEF
+    
+    def execute(self, duration, warmup):
+        try:
+            return self.executeTerminals(duration, warmup)
+        finally:
+            if self.streams != None: self.streams.close()
+    ## DEF
+    
+    def executeTerminals(self, duration, warmup):
+        r = results.Results()
+        logging.info("Running %d terminals; warming up benchmark for %d seconds" % (len(self.terminals), warmup))
+        start = r.startBenchmark()
+        end = start + duration + warmup * 2
+        self.measureFrom, self.measureUntil = start + warmup, start + warmup + duration
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+        
+        for terminal in self.terminals:
+            self.startTransaction(terminal, r, debug)
+        
+        outstanding = len(self.terminals)
+        failure = None
+        while outstanding > 0:
+            event = self.completions.get()
+            if event[0] == EVENT_RETRY:
+                self.submit(event[1], debug)
+                continue
+            
+            terminal, result, error = event[1:]
+            elapsed = time.time() - start
+            measure = warmup <= elapsed and elapsed < (warmup + duration)
+            if error != None and failure == None and self.retry.shouldRetry(error, terminal.attempt):
+                ## The terminal's transaction stays outstanding until it is retried
+                r.retryTransaction(terminal.txn_id, measure, self.retry.reason(error))
+                self.retryTimer.schedule(self.retry.backoff(terminal.attempt), (EVENT_RETRY, terminal))
+                terminal.attempt += 1
+                continue
+            outstanding -= 1
+            
+            if error != None:
+                logging.warn("Failed to execute Transaction '%s': %s" % (terminal.txn, error))
+                r.abortTransaction(terminal.txn_id, measure, self.retry.reason(error))
+                if self.stop_on_error and failure == None:
+                    failure = error
+            else:
+                r.stopTransaction(terminal.txn_id, measure)
+                terminal.completed()
+            
+            if failure == None and time.time() < end:
+                self.startTransaction(terminal, r, debug)
+                outstanding += 1
+        ## WHILE
+        
+        r.stopBenchmark()
+        if failure != None: raise failure
+        return (r)
+    ## DEF
+    
+    def startTransaction(self, terminal, r, debug):
+        txn, params = terminal.nextTransaction()
+        while txn == constants.TransactionTypes.DELIVERY and self.deliveries != None:
+            ## The terminal only waits for the DELIVERY to be queued
+            now = time.time()
+            self.deliveries.enqueue(params, self.measureFrom <= now and now < self.measureUntil)
+            terminal.txn = None
+            txn, params = terminal.nextTransaction()
+        ## WHILE
+        terminal.txn_id = r.startTransaction(txn)
+        self.submit(terminal, debug)
+    ## DEF
+    
+    def submit(self, terminal, debug):
+        if debug: logging.debug("Terminal %d executing '%s' transaction" % (terminal.terminalId, terminal.txn))
+        self.driver.executeTransactionAsync(terminal.txn, terminal.params, lambda result, error: self.completions.put((EVENT_COMPLETION, terminal, result, error)))
+    ## DEF
+## CLASS
+
+## ==============================================
+## OpenLoopExecutor
+## ==============================================
+class OpenLoopExecutor:
+    """
+        Starts transactions at a fixed average rate no matter how long the
+        earlier ones take, with either Poisson or evenly spaced arrivals.
+        The latency of a transaction is measured from the time that it was
+        supposed to start, so when the database stalls the transactions that
+        pile up behind the stall are charged for it (instead of the stall
+        silently lowering the offered load, which is what happens with the
+        closed-loop executors). A DELIVERY that arrives still runs one
+        transaction per district, one after the other, as in the other
+        executors. The transactions are taken from the first of the given
+        ParameterStreams if there are any, and are all for the warehouses of
+        the given home if there is one. A transaction that is retried is
+        charged for its backoffs as well. With a DeliveryQueue, a DELIVERY
+        that arrives is only queued.
+    """
+    
+    def __init__(self, driver, scaleParameters, rate, arrivals = ARRIVALS_POISSON, stop_on_error = False, seed = None, clientId = 0, streams = None, home = None, mix = None, skew = None, retry = None, deliveries = None):
+        assert rate > 0, "Invalid arrival rate %s" % rate
+        assert arrivals in [ARRIVALS_POISSON, ARRIVALS_CONSTANT], "Unexpected arrival distribution '%s'" % arrivals
+        self.driver = driver
+        self.rate = rate
+        self.arrivals = arrivals
+        self.stop_on_error = stop_on_error
+        self.streams = streams
+        if streams != None:
+            self.generator = streams.get(0)
+        else:
+            self.generator = executor.Executor(None, scaleParameters, seed=seed, clientId=clientId, home=home, mix=mix, skew=skew)
+        self.arrivalRand = rand.Random(rand.deriveSeed(seed, "arrivals", clientId))
+        self.events = Queue.Queue()
+        self.nextId = 0
+        self.retry = retry if retry != None else executor.RetryPolicy()
+        self.retryTimer = RetryTimer(self.events)
+        self.deliveries = deliveries
+    ## DEF
+    
+    def execute(self, duration, warmup):
+        try:
+            return self.executeArrivals(duration, warmup)
+        finally:
+            if self.streams != None: self.streams.close()
+    ## DEF
+    
+    def executeArrivals(self, duration, warmup):
+        r = results.Results()
+        logging.info("Starting %.1f transactions/s (%s arrivals); warming up benchmark for %d seconds" % (self.rate, self.arrivals, warmup))
+        start = r.startBenchmark()
+        end = start + duration + warmup * 2
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+        
+        ## The arrivals are timed by a thread of their own that sleeps until
+        ## each of them is due, and are handled along with the completions
+        t = threading.Thread(target=self.generateArrivals, args=(start, end))
+        t.daemon = True
+        t.start()
+        
+        outstanding = 0
+        arriving = True
+        failure = None
+        while arriving or outstanding > 0:
+            event = self.events.get()
+            if event == None:
+                arriving = False
+                continue
+            
+            if event[0] == EVENT_ARRIVAL:
+                ## A new arrival: each one gets a Terminal of its own
+                intended = event[1]
+                terminal = Terminal(self.nextId, self.generator)
+                self.nextId += 1
+                if failure == None and self.startTransaction(terminal, intended, start, warmup, duration, r, debug):
+                    outstanding += 1
+                continue
+            elif event[0] == EVENT_RETRY:
+                if debug: logging.debug("Retrying '%s' transaction" % event[1].txn)
+                self.submit(event[1])
+                continue
+            
+            terminal, result, error = event[1:]
+            elapsed = terminal.intended - start
+            measure = warmup <= elapsed and elapsed < (warmup + duration)
+            if error != None and failure == None and self.retry.shouldRetry(error, terminal.attempt):
+                r.retryTransaction(terminal.txn_id, measure, self.retry.reason(error))
+                self.retryTimer.schedule(self.retry.backoff(terminal.attempt), (EVENT_RETRY, terminal))
+                terminal.attempt += 1
+                continue
+            outstanding -= 1
+            if error != None:
+                logging.warn("Failed to execute Transaction '%s': %s" % (terminal.txn, error))
+                r.abortTransaction(terminal.txn_id, measure, self.retry.reason(error))
+                if self.stop_on_error and failure == None:
+                    failure = error
+                continue
+            
+            r.stopTransaction(terminal.txn_id, measure)
+            terminal.completed()
+            ## The rest of the districts of a DELIVERY start right away
+            if terminal.txn == constants.TransactionTypes.DELIVERY and failure == None:
+                self.startTransaction(terminal, time.time(), start, warmup, duration, r, debug)
+                outstanding += 1
+        ## WHILE
+        
+        r.stopBenchmark()
+        if failure != None: raise failure
+        return (r)
+    ## DEF
+    
+    def generateArrivals(self, start, end):
+        intended = start
+        while True:
+            if self.arrivals == ARRIVALS_POISSON:
+                intended += self.arrivalRand.random.expovariate(self.rate)
+            else:
+                intended += 1.0 / self.rate
+            if intended >= end: break
+            delay = intended - time.time()
+            if delay > 0: time.sleep(delay)
+            self.events.put((EVENT_ARRIVAL, intended))
+        ## WHILE
+        self.events.put(None)
+    ## DEF
+    
+    def startTransaction(self, terminal, intended, start, warmup, duration, r, debug):
+        """Start the next transaction of the terminal, and return whether it
+        is outstanding (a DELIVERY that is only queued is not)"""
+        txn, params = terminal.nextTransaction()
+        if txn == constants.TransactionTypes.DELIVERY and self.deliveries != None:
+            elapsed = intended - start
+            self.deliveries.enqueue(params, warmup <= elapsed and elapsed < (warmup + duration))
+            return (False)
+        terminal.intended = intended
+        terminal.txn_id = r.startTransaction(txn, r.clockTime(intended))
+        if debug: logging.debug("Executing '%s' transaction %.3fs late" % (txn, time.time() - intended))
+        self.submit(terminal)
+        return (True)
+    ## DEF
+    
+    def submit(self, terminal):
+        self.driver.executeTransactionAsync(terminal.txn, terminal.params, lambda result, error: self.events.put((EVENT_COMPLETION, terminal, result, error)))
+    ## DEF
+## CLASS
+
+## ==============================================
+## EmulatedTerminalExecutor
+## ==============================================
+class EmulatedTerminalExecutor:
+    """
+        Emulates the terminals of TPC-C 5.2.5: ten for each of the home
+        warehouses of this client, each with a home district and a deck of
+        its own. A terminal waits for the keying time of the transaction that
+        it picked before it submits it, and then for an exponentially
+        distributed think time after the response. Most terminals are waiting at any one time, so instead
+        of a thread per terminal the waits are kept in a heap ordered by the
+        time that each terminal submits its next transaction, and a single
+        loop starts the ones that are due and handles the completions. The
+        keying and think times can be scaled down with timeScale to get to a
+        steady state sooner, although the tpmC is then no longer comparable
+        with the one of the spec. The retries of the transactions that failed
+        wait for their backoff in the same heap. With a DeliveryQueue, a
+        terminal only queues its DELIVERY and then goes on to think right away.
+    """
+    
+    def __init__(self, driver, scaleParameters, w_ids, timeScale = 1.0, stop_on_error = False, seed = None, clientId = 0, mix = None, skew = None, retry = None, deliveries = None):
+        assert w_ids, "No warehouses to emulate the terminals of"
+        assert timeScale >= 0, "Invalid terminal time scale %s" % timeScale
+        self.driver = driver
+        self.timeScale = timeScale
+        self.stop_on_error = stop_on_error
+        self.generator = executor.Executor(None, scaleParameters, seed=seed, clientId=clientId, skew=skew)
+        self.thinkRand = rand.Random(rand.deriveSeed(seed, "think", clientId))
+        self.completions = Queue.Queue()
+        self.retry = retry if retry != None else executor.RetryPolicy()
+        self.deliveries = deliveries
+        self.terminals = [ ]
+        homes = executor.assignTerminalHomes(w_ids, len(w_ids) * constants.TERMINALS_PER_WAREHOUSE)
+        for i in range(len(homes)):
+            deck = executor.MixDeck(mix, rand.Random(rand.deriveSeed(seed, "deck", clientId, i)))
+            self.terminals.append(Terminal(i, self.generator, homes[i], deck))
+        ## FOR
+        
+        ## How late the transactions were submitted with respect to the end
+        ## of their keying times
+        self.lateness = 0.0
+        self.maxLateness = 0.0
+        self.submitted = 0
+    ## DEF
+    
+    def execute(self, duration, warmup):
+        r = results.Results()
+        logging.info("Emulating %d terminals; warming up benchmark for %d seconds" % (len(self.terminals), warmup))
+        start = r.startBenchmark()
+        end = start + duration + warmup * 2
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+        
+        ## The terminals start at random points of a NEW_ORDER cycle so that
+        ## they do not all submit at the same time
+        cycle = (constants.KEYING_TIME[constants.TransactionTypes.NEW_ORDER] + constants.THINK_TIME[constants.TransactionTypes.NEW_ORDER]) * self.timeScale
+        timers = [ ]
+        for terminal in self.terminals:
+            self.schedule(timers, terminal, start + self.thinkRand.random.uniform(0, cycle))
+        heapq.heapify(timers)
+        
+        outstanding = 0
+        failure = None
+        while True:
+            now = time.time()
+            while timers and timers[0][0] <= now:
+                due, terminalId, terminal = heapq.heappop(timers)
+                ## Once the run is over only the retries that are waiting are started
+                if terminal.attempt == 0 and (now >= end or failure != None): continue
+                if terminal.txn == constants.TransactionTypes.DELIVERY and self.deliveries != None:
+                    ## The terminal only waits for the DELIVERY to be queued
+                    elapsed = now - start
+                    self.deliveries.enqueue(terminal.params, warmup <= elapsed and elapsed < (warmup + duration))
+                    terminal.txn = None
+                    self.schedule(timers, terminal, now + self.thinkTime(constants.TransactionTypes.DELIVERY), True)
+                    continue
+                ## A retry was still outstanding while it waited for its backoff
+                if terminal.attempt == 0: outstanding += 1
+                self.startTransaction(terminal, due, r, debug)
+            ## WHILE
+            
+            ## Wait for a completion until the next terminal is due
+            starting = now < end and failure == None
+            if outstanding == 0 and not starting: break
+            timeout = None
+            if timers: timeout = timers[0][0] - now
+            if starting: timeout = min(timeout, end - now) if timeout != None else end - now
+            if timeout != None: timeout = max(0.0, timeout)
+            try:
+                terminal, result, error, stop, clockStop = self.completions.get(True, timeout)
+            except Queue.Empty:
+                continue
+            txn = terminal.txn
+            elapsed = stop - start
+            measure = warmup <= elapsed and elapsed < (warmup + duration)
+            
+            if error != None and failure == None and self.retry.shouldRetry(error, terminal.attempt):
+                backoff = self.retry.backoff(terminal.attempt)
+                ## A retry that would only start after the end of the run
+                ## is never run, so the transaction is aborted instead
+                if stop + backoff < end:
+                    r.retryTransaction(terminal.txn_id, measure, self.retry.reason(error))
+                    heapq.heappush(timers, (stop + backoff, terminal.terminalId, terminal))
+                    terminal.attempt += 1
+                    continue
+            ## IF
+            outstanding -= 1
+            if error != None:
+                logging.warn("Failed to execute Transaction '%s': %s" % (terminal.txn, error))
+                r.abortTransaction(terminal.txn_id, measure, self.retry.reason(error))
+                if self.stop_on_error and failure == None:
+                    failure = error
+                ## The terminal goes on with a new transaction
+                terminal.txn = None
+            else:
+                r.stopTransaction(terminal.txn_id, measure, clockStop)
+                terminal.completed()
+            
+            if terminal.txn == constants.TransactionTypes.DELIVERY:
+                ## The rest of the districts of a DELIVERY start right away
+                heapq.heappush(timers, (stop, terminal.terminalId, terminal))
+            else:
+                self.schedule(timers, terminal, stop + self.thinkTime(txn), True)
+        ## WHILE
+        
+        r.stopBenchmark()
+        if self.submitted > 0:
+            logging.info("Submitted %d transactions on average %.3fms (at most %.3fms) after they were due" % \
+                         (self.submitted, self.lateness / self.submitted * 1000, self.maxLateness * 1000))
+        if failure != None: raise failure
+        return (r)
+    ## DEF
+    
+    def schedule(self, timers, terminal, ready, push = False):
+        """Pick the next transaction of the terminal and time its submission
+        for after its keying time, starting from the given time"""
+        txn, params = terminal.nextTransaction()
+        entry = (ready + constants.KEYING_TIME[txn] * self.timeScale, terminal.terminalId, terminal)
+        if push: heapq.heappush(timers, entry)
+        else: timers.append(entry)
+    ## DEF
+    
+    def thinkTime(self, txn):
+        """The think time after a transaction of the given type. See TPC-C 5.2.5.4."""
+        mean = constants.THINK_TIME[txn] * self.timeScale
+        if mean == 0: return 0
+        return min(self.thinkRand.random.expovariate(1.0 / mean), mean * constants.MAX_THINK_TIME_FACTOR)
+    ## DEF
+    
+    def startTransaction(self, terminal, due, r, debug):
+        txn, params = terminal.txn, terminal.params
+        now = time.time()
+        self.submitted += 1
+        self.lateness += now - due
+        self.maxLateness = max(self.maxLateness, now - due)
+        ## A retry goes on with the start time of the first attempt
+        if terminal.attempt == 0: terminal.txn_id = r.startTransaction(txn)
+        if debug: logging.debug("Terminal %d executing '%s' transaction" % (terminal.terminalId, txn))
+        ## The completion is timed both for scheduling the terminal and for the results
+        self.driver.executeTransactionAsync(txn, params, lambda result, error: self.completions.put((terminal, result, error, time.time(), results.now())))
+    ## DEF
+## CLASS
+
+## ==============================================
+## makeAsyncExecutor
+## ==============================================
+def makeAsyncExecutor(driverClass, scaleParameters, args, config, clientId = 0, deliveries = None):
+    """
+        Create an AsyncExecutor (or an OpenLoopExecutor if this client was
+        given an arrival rate, or an EmulatedTerminalExecutor with
+        --emulate-terminals) for the options in the command line arguments,
+        along with the driver that it dispatches to. Drivers that are not
+        asynchronous are wrapped in a SyncDriverAdapter with --driver-threads
+        threads (one per terminal by default). The DELIVERY transactions are
+        deferred to the given DeliveryQueue if there is one.
+    """
+    def makeDriver():
+        driver = driverClass(args['ddl'])
+        driver.loadConfig(config)
+        return (driver)
+    ## DEF
+    
+    terminals = args['terminals']
+    rate = args.get('client_rate')
+    emulate = args.get('emulate_terminals')
+    retry = executor.makeRetryPolicy(driverClass, args, clientId)
+    if driverClass.isAsync():
+        driver = makeDriver()
+    else:
+        threads = args.get('driver_threads') or (OPEN_LOOP_DRIVER_THREADS if rate or emulate else terminals)
+        driver = SyncDriverAdapter(makeDriver, threads)
+    
+    if emulate:
+        assert not args.get('param_stream') and not args.get('param_cache'), "The emulated terminals cannot use pre-generated parameters"
+        w_ids = executor.clientWarehouses(scaleParameters, args)
+        e = EmulatedTerminalExecutor(driver, scaleParameters, w_ids, args.get('terminal_time_scale', 1.0), stop_on_error=args['stop_on_error'], seed=args.get('seed'), clientId=clientId, mix=args.get('mix'), skew=args.get('skew'), retry=retry, deliveries=deliveries)
+    elif rate:
+        ## The arrivals are not tied to any terminal, so they share the
+        ## warehouses of the client
+        homes = executor.makeTerminalHomes(scaleParameters, args, 1)
+        streams = paramstream.makeParameterStreams(scaleParameters, args, clientId, [ None ], homes)
+        e = OpenLoopExecutor(driver, scaleParameters, rate, args.get('arrivals', ARRIVALS_POISSON), stop_on_error=args['stop_on_error'], seed=args.get('seed'), clientId=clientId, \
+                             streams=streams, home=homes[0] if homes != None else None, mix=args.get('mix'), skew=args.get('skew'), retry=retry, \
+                             deliveries=deliveries)
+    else:
+        homes = executor.makeTerminalHomes(scaleParameters, args, terminals)
+        streams = paramstream.makeParameterStreams(scaleParameters, args, clientId, range(terminals), homes)
+        e = AsyncExecutor(driver, scaleParameters, terminals, stop_on_error=args['stop_on_error'], seed=args.get('seed'), clientId=clientId, streams=streams, homes=homes, mix=args.get('mix'), skew=args.get('skew'), retry=retry, deliveries=deliveries)
+    return (e, driver)
+## DEF
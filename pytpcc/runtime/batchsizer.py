@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import time
+import logging
+
+## ==============================================
+## BatchSizer
+## ==============================================
+class BatchSizer:
+    """
+        Picks how many tuples the loader hands to the driver in each call,
+        separately for every table. It measures the rate at which the driver
+        ingests full batches and hill climbs between the bounds that the
+        driver declares: as long as a new batch size is faster than the last
+        one it keeps moving the same way, otherwise it goes back to the last
+        size and then tries the other way with a smaller step. Batches that take
+        longer than maxLatency always make it shrink, so a backend that is
+        drowning in big requests backs off quickly.
+        
+        Drivers whose loadTupleStream reads all of the chunks before loading
+        them cannot be timed this way and simply end up at their maximum.
+    """
+    
+    ## The factor that the batch size first changes by in each step
+    GROWTH = 1.5
+    ## The smallest factor that the steps shrink to as it settles
+    MIN_GROWTH = 1.1
+    ## The number of full batches that are timed before a new size is tried
+    SAMPLES = 3
+    
+    def __init__(self, handle, initial, maxLatency = 2.0):
+        self.handle = handle
+        self.initial = initial
+        self.maxLatency = maxLatency
+        self.tables = { }
+    
+    def getTable(self, tableName):
+        state = self.tables.get(tableName)
+        if state == None:
+            minSize, maxSize = self.handle.loadBatchBounds(tableName)
+            assert 0 < minSize and minSize <= maxSize, "Invalid batch bounds for %s: (%d, %d)" % (tableName, minSize, maxSize)
+            state = {
+                "min": minSize,
+                "max": maxSize,
+                "size": max(minSize, min(maxSize, self.initial)),
+                "growth": BatchSizer.GROWTH,
+                "direction": 1,
+                "rows": 0,
+                "time": 0.0,
+                "samples": 0,
+                "lastSize": None,
+                "lastRate": None,
+            }
+            self.tables[tableName] = state
+        return (state)
+    ## DEF
+    
+    def size(self, tableName):
+        """Return the number of tuples that the next batch for the table should have"""
+        return self.getTable(tableName)["size"]
+    ## DEF
+    
+    def record(self, tableName, rows, seconds):
+        """Record that the driver took the given number of seconds to load a full batch"""
+        state = self.getTable(tableName)
+        if seconds > self.maxLatency and state["size"] > state["min"]:
+            state["direction"] = -1
+            state["lastSize"] = None
+            state["lastRate"] = None
+            self.resize(tableName, state, int(state["size"] / BatchSizer.GROWTH), "%.2fs batch" % seconds)
+            return
+        
+        state["rows"] += rows
+        state["time"] += seconds
+        state["samples"] += 1
+        if state["samples"] < BatchSizer.SAMPLES: return
+        
+        rate = state["rows"] / max(state["time"], 1e-6)
+        if state["lastRate"] != None and rate < state["lastRate"]:
+            ## Worse than where we came from, so go back there and take a new
+            ## measurement before trying the other way with a smaller step
+            state["direction"] = -state["direction"]
+            state["growth"] = max(BatchSizer.MIN_GROWTH, state["growth"] ** 0.5)
+            size = state["lastSize"]
+            state["lastSize"] = None
+            state["lastRate"] = None
+        else:
+            state["lastSize"] = state["size"]
+            state["lastRate"] = rate
+            if state["direction"] > 0:
+                size = int(state["size"] * state["growth"])
+            else:
+                size = int(state["size"] / state["growth"])
+        self.resize(tableName, state, size, "%.0f rows/s" % rate)
+    ## DEF
+    
+    def resize(self, tableName, state, size, reason):
+        size = max(state["min"], min(state["max"], size))
+        ## Turn around at the bounds instead of getting stuck on them
+        if size == state["size"]:
+            state["direction"] = -state["direction"]
+        else:
+            logging.debug("LOAD - %s batch size %d -> %d (%s)" % (tableName, state["size"], size, reason))
+        state["size"] = size
+        state["rows"] = 0
+        state["time"] = 0.0
+        state["samples"] = 0
+    ## DEF
+    
+    def rebatch(self, tableName, chunks):
+        """
+            Regroup the given chunks of tuples into batches of the current
+            size, timing how long the consumer takes with each full batch
+        """
+        pending = [ ]
+        for tuples in chunks:
+            pending.extend(tuples)
+            while len(pending) >= self.size(tableName):
+                size = self.size(tableName)
+                batch = pending[:size]
+                del pending[:size]
+                start = time.time()
+                yield batch
+                self.record(tableName, size, time.time() - start)
+            ## WHILE
+        ## FOR
+        if pending: yield pending
+    ## DEF
+## CLASS
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import os
+import mmap
+import hashlib
+import logging
+import cPickle
+
+from util.records import RECORD_HEADER, writeRecord
+
+## Bump this whenever the generated data or the file layout changes so that
+## stale caches are not replayed
+FORMAT_VERSION = 3
+
+## ==============================================
+## DataCache
+## ==============================================
+class DataCache:
+    """
+        On-disk cache of the tuples generated by the Loader. Every work unit
+        is stored in its own file so that any subset of the warehouses can be
+        replayed. The cache directory is keyed by the scale parameters, so the
+        same cache can be used for runs with a different number of warehouses.
+    """
+    
+    def __init__(self, directory, scaleParameters, seed):
+        key = "%d-%d-%d-%d-%d-%s" % (FORMAT_VERSION, \
+                                     scaleParameters.items, \
+                                     scaleParameters.districtsPerWarehouse, \
+                                     scaleParameters.customersPerDistrict, \
+                                     scaleParameters.newOrdersPerDistrict, \
+                                     seed)
+        self.directory = os.path.join(directory, hashlib.md5(key).hexdigest())
+        if not os.path.exists(self.directory):
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                ## Another loader process created it first
+                if not os.path.isdir(self.directory): raise
+    ## DEF
+    
+    def unitPath(self, unit):
+        name = "-".join([ str(x) for x in unit if not isinstance(x, set) ])
+        return os.path.join(self.directory, name + ".dat")
+    ## DEF
+    
+    def contains(self, unit):
+        """Return true if the tuples for the given unit are in the cache"""
+        return os.path.exists(self.unitPath(unit))
+    ## DEF
+    
+    def open(self, unit):
+        """Return a DataCacheWriter that stores the tuples for the given unit"""
+        return DataCacheWriter(self.unitPath(unit))
+    ## DEF
+    
+    def replay(self, unit):
+        """Generator of the (tableName, tuples) pairs stored for the given unit"""
+        path = self.unitPath(unit)
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0: return
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                offset = 0
+                while offset < size:
+                    length, = RECORD_HEADER.unpack_from(m, offset)
+                    offset += RECORD_HEADER.size
+                    yield cPickle.loads(m[offset:offset+length])
+                    offset += length
+                ## WHILE
+            finally:
+                m.close()
+    ## DEF
+## CLASS
+
+## ==============================================
+## DataCacheWriter
+## ==============================================
+class DataCacheWriter:
+    """
+        Writes the tuples of a single unit to a temporary file that is only
+        moved into place by commit(), so a unit that failed half way through
+        is never replayed.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.tmpPath = "%s.%d.tmp" % (path, os.getpid())
+        self.output = open(self.tmpPath, "wb")
+    ## DEF
+    
+    def write(self, tableName, tuples):
+        writeRecord(self.output, (tableName, tuples))
+    ## DEF
+    
+    def record(self, tableName, chunks):
+        """Pass through each chunk of a stream after writing it out"""
+        for tuples in chunks:
+            self.write(tableName, tuples)
+            yield tuples
+        ## FOR
+    ## DEF
+    
+    def commit(self):
+        self.output.close()
+        os.rename(self.tmpPath, self.path)
+        logging.debug("Cached tuples in '%s'" % self.path)
+    ## DEF
+    
+    def abort(self):
+        self.output.close()
+        if os.path.exists(self.tmpPath): os.unlink(self.tmpPath)
+    ## DEF
+## CLASS
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import logging
+import threading
+import traceback
+import Queue
+
+import constants
+import executor
+from util import *
+
+## ==============================================
+## DeliveryQueue
+## ==============================================
+class DeliveryQueue:
+    """
+        Runs the DELIVERY transactions in deferred mode (TPC-C 2.7.2): the
+        terminals only queue them and go on right away, and a pool of
+        background workers, each with a driver of its own, takes them off
+        the queue and delivers the orders of all of the districts of the
+        warehouse. Every worker records into its own Results how long each
+        DELIVERY waited in the queue and how long it took to process, along
+        with the transaction of every district, and the Results are merged
+        once the workers have drained the queue.
+    """
+    
+    def __init__(self, makeDriver, workers, stop_on_error = False, retries = None):
+        assert workers > 0, "Invalid number of delivery workers %d" % workers
+        self.makeDriver = makeDriver
+        self.stop_on_error = stop_on_error
+        self.requests = Queue.Queue()
+        self.results = [ None ] * workers
+        self.errors = [ ]
+        self.threads = [ ]
+        self.retries = retries
+        for i in range(workers):
+            t = threading.Thread(target=self.run, args=(i,))
+            t.daemon = True
+            self.threads.append(t)
+        ## FOR
+    ## DEF
+    
+    def start(self):
+        for t in self.threads:
+            t.start()
+    ## DEF
+    
+    def enqueue(self, params, measure):
+        """Queue a DELIVERY, whose statistics count if measure is True"""
+        self.requests.put((params, measure, results.now()))
+    ## DEF
+    
+    def finish(self):
+        """Wait for the workers to run the rest of the queued DELIVERY
+        transactions, and return their Results merged"""
+        logging.debug("Waiting for %d queued DELIVERY transactions" % self.requests.qsize())
+        for t in self.threads:
+            self.requests.put(None)
+        for t in self.threads:
+            t.join()
+        if self.errors: raise Exception("Delivery worker failed\n%s" % self.errors[0])
+        
+        r = results.Results()
+        for worker_results in self.results:
+            r.merge(worker_results)
+        return (r)
+    ## DEF
+    
+    def run(self, i):
+        r = results.Results()
+        self.results[i] = r
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+        try:
+            driver = self.makeDriver()
+            e = executor.Executor(driver, None, stop_on_error=self.stop_on_error, retry=self.retries[i] if self.retries != None else None)
+            driver.executeStart()
+            for request in iter(self.requests.get, None):
+                params, measure, queued = request
+                started = results.now()
+                for d_id in range(1, constants.DISTRICTS_PER_WAREHOUSE+1):
+                    params['d_id'] = d_id
+                    txn_id = r.startTransaction(constants.TransactionTypes.DELIVERY)
+                    if e.executeTransaction(r, constants.TransactionTypes.DELIVERY, params, txn_id, measure, debug):
+                        r.stopTransaction(txn_id, measure)
+                ## FOR
+                r.recordDeferred(queued, started, results.now(), measure)
+            ## FOR
+            driver.executeFinish()
+        except (Exception, AssertionError), ex:
+            logging.warn("Delivery worker %d failed: %s" % (i, ex))
+            self.errors.append(traceback.format_exc())
+            ## Keep draining the queue so that finish() does not wait forever
+            for request in iter(self.requests.get, None): pass
+    ## DEF
+## CLASS
+
+## ==============================================
+## makeDeliveryQueue
+## ==============================================
+def makeDeliveryQueue(driverClass, args, config, clientId = 0):
+    """Create the DeliveryQueue of a client for --deferred-delivery, or return None without it"""
+    if not args.get('deferred_delivery'): return (None)
+    mix = args.get('mix') or constants.MIX_PROFILES[constants.DEFAULT_MIX]
+    assert [ txn for txn in mix.keys() if txn != constants.TransactionTypes.DELIVERY ], \
+        "The terminals need transactions other than DELIVERY to run with deferred delivery"
+    def makeDriver():
+        driver = driverClass(args['ddl'])
+        driver.loadConfig(config)
+        return (driver)
+    ## DEF
+    workers = args.get('delivery_workers', 1)
+    retries = [ executor.makeRetryPolicy(driverClass, args, clientId, "delivery-%d" % i) for i in range(workers) ]
+    return (DeliveryQueue(makeDriver, workers, args['stop_on_error'], retries))
+## DEF
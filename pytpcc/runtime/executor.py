@@ -47,10 +47,46 @@ class Executor:
     __MEASURE = 1
     __COOLDOWN = 2
     
-    def __init__(self, driver, scaleParameters, stop_on_error = False):
+    def __init__(self, driver, scaleParameters, stop_on_error = False, seed = None, clientId = 0, terminalId = None, stream = None, home = None, mix = None, skew = None, retry = None, deliveries = None):
         self.driver = driver
         self.scaleParameters = scaleParameters
         self.stop_on_error = stop_on_error
+        
+        ## Which failed transactions are run again, and after how long. The
+        ## default retries nothing.
+        self.retry = retry if retry != None else RetryPolicy()
+        
+        ## The DeliveryQueue that the DELIVERY transactions are deferred to,
+        ## if they are not run by the terminal itself
+        self.deliveries = deliveries
+        
+        ## Each client (and each terminal of a client that runs more than one)
+        ## gets its own random stream derived from the master seed. All of
+        ## them share the NURand run constants, which must be valid with
+        ## respect to the ones that were used to load the database
+        self.clientId = clientId
+        self.terminalId = terminalId
+        path = ("execute", clientId) if terminalId == None else ("execute", clientId, terminalId)
+        runC = nurand.makeForSeed(seed)[1] if seed is not None else None
+        self.rand = rand.Random(rand.deriveSeed(seed, *path), runC)
+        
+        ## The home (w_ids, d_id) of the terminal that the parameters are
+        ## generated for: its transactions are for one of its w_ids, and its
+        ## STOCK_LEVELs for d_id if it has one. Without a home they can be
+        ## for any warehouse and district.
+        self.home = home
+        
+        ## The transactions are dealt from a deck with the given number of
+        ## cards of each type (the spec deck by default)
+        self.deck = MixDeck(mix, self.rand)
+        
+        ## The distributions that the warehouses, districts, customers and
+        ## items are drawn from (the ones of the specification by default)
+        self.skew = distribution.Skew(skew, scaleParameters) if scaleParameters != None else None
+        
+        ## Where the transactions come from: this Executor generates them
+        ## itself unless it was given a pre-generated ParameterStream
+        self.source = stream if stream != None else self
     ## DEF
     
     def execute(self, duration, warmup):
@@ -73,29 +109,28 @@ class Executor:
                     logging.info("Cooling down benchmark for %d seconds" % warmup)
                 state = Executor.__COOLDOWN
             if txn != constants.TransactionTypes.DELIVERY:
-                txn, params = self.doOne()
+                txn, params = self.source.doOne()
+                if txn == constants.TransactionTypes.DELIVERY and self.deliveries != None:
+                    ## The terminal only waits for the DELIVERY to be queued
+                    self.deliveries.enqueue(params, state == Executor.__MEASURE)
+                    txn = None
+                    elapsed = time.time() - start
+                    continue
             txn_id = r.startTransaction(txn)
             
-            if debug: logging.debug("Executing '%s' transaction" % txn)
             try:
-                val = self.driver.executeTransaction(txn, params)
-                if txn == constants.TransactionTypes.DELIVERY: 
-                    if params['d_id'] < constants.DISTRICTS_PER_WAREHOUSE:
-                        params['d_id'] += 1
-                    else:
-                        txn = None
+                succeeded = self.executeTransaction(r, txn, params, txn_id, state == Executor.__MEASURE, debug)
             except KeyboardInterrupt:
                 return -1
-            except (Exception, AssertionError), ex:
-                logging.warn("Failed to execute Transaction '%s': %s" % (txn, ex))
-                if debug: traceback.print_exc(file=sys.stdout)
-                if self.stop_on_error: raise
-                r.abortTransaction(txn_id)
-                continue
             cur_time = time.time()
             elapsed = cur_time - start
-
-            #if debug: logging.debug("%s\nParameters:\n%s\nResult:\n%s" % (txn, pformat(params), pformat(val)))
+            if not succeeded: continue
+            
+            if txn == constants.TransactionTypes.DELIVERY: 
+                if params['d_id'] < constants.DISTRICTS_PER_WAREHOUSE:
+                    params['d_id'] += 1
+                else:
+                    txn = None
             
             r.stopTransaction(txn_id, state == Executor.__MEASURE)
         ## WHILE
@@ -104,26 +139,55 @@ class Executor:
         return (r)
     ## DEF
     
+    def executeTransaction(self, r, txn, params, txn_id, measure, debug):
+        """Run a transaction with the driver, and retry it if the RetryPolicy
+        says so. Return whether it succeeded; if it did not, it was aborted.
+        The latency of a transaction that is retried includes all of its
+        attempts and the backoffs between them."""
+        attempt = 0
+        while True:
+            if debug: logging.debug("Executing '%s' transaction" % txn)
+            try:
+                val = self.driver.executeTransaction(txn, params)
+                #if debug: logging.debug("%s\nParameters:\n%s\nResult:\n%s" % (txn, pformat(params), pformat(val)))
+                return (True)
+            except KeyboardInterrupt:
+                raise
+            except (Exception, AssertionError), ex:
+                reason = self.retry.reason(ex)
+                if self.retry.shouldRetry(ex, attempt):
+                    if debug: logging.debug("Retrying '%s' transaction after '%s': %s" % (txn, reason, ex))
+                    r.retryTransaction(txn_id, measure, reason)
+                    time.sleep(self.retry.backoff(attempt))
+                    attempt += 1
+                    continue
+                logging.warn("Failed to execute Transaction '%s': %s" % (txn, ex))
+                if debug: traceback.print_exc(file=sys.stdout)
+                if self.stop_on_error: raise
+                r.abortTransaction(txn_id, measure, reason)
+                return (False)
+        ## WHILE
+    ## DEF
+    
     def doOne(self):
-        """Selects and executes a transaction at random. The number of new order transactions executed per minute is the official "tpmC" metric. See TPC-C 5.4.2 (page 71)."""
+        """Selects the next transaction from the deck and generates its parameters. The number of new order transactions executed per minute is the official "tpmC" metric. See TPC-C 5.4.2 (page 71)."""
         
-        ## This is not strictly accurate: The requirement is for certain
-        ## *minimum* percentages to be maintained. This is close to the right
-        ## thing, but not precisely correct. See TPC-C 5.2.4 (page 68).
-        x = rand.number(1, 100)
+        ## Dealing the transactions from a deck keeps the mix exact over every
+        ## deck, so that the minimum percentages are always met and short
+        ## runs do not drift from the mix. See TPC-C 5.2.4.2 (page 68).
+        txn = self.deck.next()
         params = None
-        txn = None
-        if x <= 4: ## 4%
-            txn, params = (constants.TransactionTypes.STOCK_LEVEL, self.generateStockLevelParams())
-        elif x <= 4 + 4: ## 4%
-            txn, params = (constants.TransactionTypes.DELIVERY, self.generateDeliveryParams())
-        elif x <= 4 + 4 + 4: ## 4%
-            txn, params = (constants.TransactionTypes.ORDER_STATUS, self.generateOrderStatusParams())
-        elif x <= 43 + 4 + 4 + 4: ## 43%
-            txn, params = (constants.TransactionTypes.PAYMENT, self.generatePaymentParams())
-        else: ## 45%
-            assert x > 100 - 45
-            txn, params = (constants.TransactionTypes.NEW_ORDER, self.generateNewOrderParams())
+        if txn == constants.TransactionTypes.STOCK_LEVEL:
+            params = self.generateStockLevelParams()
+        elif txn == constants.TransactionTypes.DELIVERY:
+            params = self.generateDeliveryParams()
+        elif txn == constants.TransactionTypes.ORDER_STATUS:
+            params = self.generateOrderStatusParams()
+        elif txn == constants.TransactionTypes.PAYMENT:
+            params = self.generatePaymentParams()
+        else:
+            assert txn == constants.TransactionTypes.NEW_ORDER
+            params = self.generateNewOrderParams()
         
         return (txn, params)
     ## DEF
@@ -135,7 +199,7 @@ class Executor:
         """Return parameters for DELIVERY"""
         w_id = self.makeWarehouseId()
         d_id = 1
-        o_carrier_id = rand.number(constants.MIN_CARRIER_ID, constants.MAX_CARRIER_ID)
+        o_carrier_id = self.rand.number(constants.MIN_CARRIER_ID, constants.MAX_CARRIER_ID)
         ol_delivery_d = datetime.now()
         return makeParameterDict(locals(), "w_id", "d_id", "o_carrier_id", "ol_delivery_d")
     ## DEF
@@ -148,11 +212,11 @@ class Executor:
         w_id = self.makeWarehouseId()
         d_id = self.makeDistrictId()
         c_id = self.makeCustomerId()
-        ol_cnt = rand.number(constants.MIN_OL_CNT, constants.MAX_OL_CNT)
+        ol_cnt = self.rand.number(constants.MIN_OL_CNT, constants.MAX_OL_CNT)
         o_entry_d = datetime.now()
 
         ## 1% of transactions roll back
-        rollback = False # FIXME rand.number(1, 100) == 1
+        rollback = False # FIXME self.rand.number(1, 100) == 1
 
         i_ids = [ ]
         i_w_ids = [ ]
@@ -166,14 +230,14 @@ class Executor:
                     i_id = self.makeItemId()
                 i_ids.append(i_id)
 
-            ## 1% of items are from a remote warehouse
-            remote = (rand.number(1, 100) == 1)
+            ## 1% of items are from a remote warehouse (by default)
+            remote = (self.rand.number(1, 100) <= self.skew.remoteItem)
             if self.scaleParameters.warehouses > 1 and remote:
-                i_w_ids.append(rand.numberExcluding(self.scaleParameters.starting_warehouse, self.scaleParameters.ending_warehouse, w_id))
+                i_w_ids.append(self.rand.numberExcluding(self.scaleParameters.starting_warehouse, self.scaleParameters.ending_warehouse, w_id))
             else:
                 i_w_ids.append(w_id)
 
-            i_qtys.append(rand.number(1, constants.MAX_OL_QUANTITY))
+            i_qtys.append(self.rand.number(1, constants.MAX_OL_QUANTITY))
         ## FOR
 
         return makeParameterDict(locals(), "w_id", "d_id", "c_id", "o_entry_d", "i_ids", "i_w_ids", "i_qtys")
@@ -190,8 +254,8 @@ class Executor:
         c_id = None
         
         ## 60%: order status by last name
-        if rand.number(1, 100) <= 60:
-            c_last = rand.makeRandomLastName(self.scaleParameters.customersPerDistrict)
+        if self.rand.number(1, 100) <= 60:
+            c_last = self.rand.makeRandomLastName(self.scaleParameters.customersPerDistrict)
 
         ## 40%: order status by id
         else:
@@ -205,8 +269,8 @@ class Executor:
     ## ----------------------------------------------
     def generatePaymentParams(self):
         """Return parameters for PAYMENT"""
-        x = rand.number(1, 100)
-        y = rand.number(1, 100)
+        x = self.rand.number(1, 100)
+        y = self.rand.number(1, 100)
 
         w_id = self.makeWarehouseId()
         d_id = self.makeDistrictId()
@@ -214,23 +278,23 @@ class Executor:
         c_d_id = None
         c_id = None
         c_last = None
-        h_amount = rand.fixedPoint(2, constants.MIN_PAYMENT, constants.MAX_PAYMENT)
+        h_amount = self.rand.fixedPoint(2, constants.MIN_PAYMENT, constants.MAX_PAYMENT)
         h_date = datetime.now()
 
-        ## 85%: paying through own warehouse (or there is only 1 warehouse)
-        if self.scaleParameters.warehouses == 1 or x <= 85:
+        ## 85% (by default): paying through own warehouse (or there is only 1 warehouse)
+        if self.scaleParameters.warehouses == 1 or x <= 100 - self.skew.remotePayment:
             c_w_id = w_id
             c_d_id = d_id
-        ## 15%: paying through another warehouse:
+        ## 15% (by default): paying through another warehouse:
         else:
             ## select in range [1, num_warehouses] excluding w_id
-            c_w_id = rand.numberExcluding(self.scaleParameters.starting_warehouse, self.scaleParameters.ending_warehouse, w_id)
+            c_w_id = self.rand.numberExcluding(self.scaleParameters.starting_warehouse, self.scaleParameters.ending_warehouse, w_id)
             assert c_w_id != w_id
             c_d_id = self.makeDistrictId()
 
         ## 60%: payment by last name
         if y <= 60:
-            c_last = rand.makeRandomLastName(self.scaleParameters.customersPerDistrict)
+            c_last = self.rand.makeRandomLastName(self.scaleParameters.customersPerDistrict)
         ## 40%: payment by id
         else:
             assert y > 60
@@ -245,31 +309,203 @@ class Executor:
     def generateStockLevelParams(self):
         """Returns parameters for STOCK_LEVEL"""
         w_id = self.makeWarehouseId()
-        d_id = self.makeDistrictId()
-        threshold = rand.number(constants.MIN_STOCK_LEVEL_THRESHOLD, constants.MAX_STOCK_LEVEL_THRESHOLD)
+        ## Each terminal checks the stock of a district of its own (TPC-C 2.8.1.1)
+        d_id = self.home[1] if self.home != None and self.home[1] != None else self.makeDistrictId()
+        threshold = self.rand.number(constants.MIN_STOCK_LEVEL_THRESHOLD, constants.MAX_STOCK_LEVEL_THRESHOLD)
         return makeParameterDict(locals(), "w_id", "d_id", "threshold")
     ## DEF
 
     def makeWarehouseId(self):
-        w_id = rand.number(self.scaleParameters.starting_warehouse, self.scaleParameters.ending_warehouse)
+        if self.home != None:
+            w_ids = self.home[0]
+            return w_ids[0] if len(w_ids) == 1 else w_ids[self.skew.home(len(w_ids)).next(self.rand)]
+        w_id = self.skew.warehouse.next(self.rand)
         assert(w_id >= self.scaleParameters.starting_warehouse), "Invalid W_ID: %d" % w_id
         assert(w_id <= self.scaleParameters.ending_warehouse), "Invalid W_ID: %d" % w_id
         return w_id
     ## DEF
 
     def makeDistrictId(self):
-        return rand.number(1, self.scaleParameters.districtsPerWarehouse)
+        return self.skew.district.next(self.rand)
     ## DEF
 
     def makeCustomerId(self):
-        return rand.NURand(1023, 1, self.scaleParameters.customersPerDistrict)
+        return self.skew.customer.next(self.rand)
     ## DEF
 
     def makeItemId(self):
-        return rand.NURand(8191, 1, self.scaleParameters.items)
+        return self.skew.item.next(self.rand)
     ## DEF
 ## CLASS
 
 def makeParameterDict(values, *args):
     return dict(map(lambda x: (x, values[x]), args))
 ## DEF
+
+## ==============================================
+## MixDeck
+## ==============================================
+class MixDeck:
+    """
+        A deck with the given number of cards of each transaction type (a
+        dict, or None for the spec deck) that is shuffled every time that all
+        of its cards have been dealt. See TPC-C 5.2.4.2.
+    """
+    
+    def __init__(self, mix, rand):
+        if mix == None: mix = constants.MIX_PROFILES[constants.DEFAULT_MIX]
+        self.rand = rand
+        self.cards = [ ]
+        for txn in sorted(mix.keys()):
+            self.cards += [ txn ] * mix[txn]
+        assert self.cards, "Empty transaction mix"
+        self.position = len(self.cards)
+    ## DEF
+    
+    def next(self):
+        if self.position == len(self.cards):
+            self.rand.random.shuffle(self.cards)
+            self.position = 0
+        txn = self.cards[self.position]
+        self.position += 1
+        return (txn)
+    ## DEF
+## CLASS
+
+def parseMix(value):
+    """
+        Parse a --mix: either the name of one of the MIX_PROFILES or a comma
+        separated list of TXN=cards (e.g., "NEW_ORDER=1,PAYMENT=1"). The
+        transaction types that are left out get no cards.
+    """
+    if value == None: value = constants.DEFAULT_MIX
+    if value in constants.MIX_PROFILES: return dict(constants.MIX_PROFILES[value])
+    
+    txnTypes = [ x for x in dir(constants.TransactionTypes) if not x.startswith("_") ]
+    mix = { }
+    for item in value.split(","):
+        name, sep, cards = item.partition("=")
+        name = name.strip().upper()
+        if not sep or not name in txnTypes or not cards.strip().isdigit():
+            raise Exception("Invalid transaction mix '%s': expected one of %s or a list of TXN=cards with TXN in %s" % \
+                            (value, ", ".join(sorted(constants.MIX_PROFILES.keys())), ", ".join(txnTypes)))
+        if int(cards) > 0: mix[name] = int(cards)
+    ## FOR
+    if not mix: raise Exception("Invalid transaction mix '%s': there are no cards" % value)
+    return (mix)
+## DEF
+
+## ==============================================
+## RetryPolicy
+## ==============================================
+class RetryPolicy:
+    """
+        Decides whether a transaction that failed is run again, and how long
+        to wait before that. Only the errors that the driver class says are
+        retriable are retried, at most the given number of times per
+        transaction. The backoff before the n-th retry is drawn uniformly
+        from zero up to backoff * 2^n seconds (but at most MAX_RETRY_BACKOFF),
+        so that the transactions that conflicted do not all retry together.
+    """
+    
+    def __init__(self, driverClass = None, retries = 0, backoff = 0.0, rand = None):
+        self.driverClass = driverClass
+        self.retries = retries
+        self.initialBackoff = backoff
+        self.rand = rand
+    ## DEF
+    
+    def reason(self, error):
+        """The reason that the retries and aborts because of the given error are counted by"""
+        if self.driverClass == None: return (error.__class__.__name__)
+        return (self.driverClass.abortReason(error))
+    ## DEF
+    
+    def shouldRetry(self, error, attempt):
+        """Whether to retry a transaction that failed with the given error
+        after the given number of retries"""
+        if attempt >= self.retries or self.driverClass == None: return (False)
+        return (self.driverClass.isRetriable(error))
+    ## DEF
+    
+    def backoff(self, attempt):
+        backoff = min(self.initialBackoff * (2 ** attempt), constants.MAX_RETRY_BACKOFF)
+        return (self.rand.random.uniform(0, backoff))
+    ## DEF
+## CLASS
+
+def makeRetryPolicy(driverClass, args, clientId = 0, terminalId = None):
+    """Return the RetryPolicy of the given client (or terminal) for the --retries and --retry-backoff"""
+    path = ("retry", clientId) if terminalId == None else ("retry", clientId, terminalId)
+    return (RetryPolicy(driverClass, args.get('retries', 0), args.get('retry_backoff', constants.DEFAULT_RETRY_BACKOFF), \
+                        rand.Random(rand.deriveSeed(args.get('seed'), *path))))
+## DEF
+
+## ==============================================
+## Home warehouses
+## ==============================================
+def assignClientWarehouses(scaleParameters, clients, nodes = None):
+    """
+        Split the warehouses evenly over the clients and return the list of
+        the home warehouses of each one. The clients are dealt the warehouses
+        one node at a time (nodes gives the node of each client), so that the
+        nodes get an even share of them as well. If there are fewer
+        warehouses than clients, the clients share them.
+    """
+    if nodes == None: nodes = [ None ] * clients
+    assert len(nodes) == clients
+    byNode = { }
+    nodeOrder = [ ]
+    for i in range(clients):
+        if not nodes[i] in byNode:
+            byNode[nodes[i]] = [ ]
+            nodeOrder.append(nodes[i])
+        byNode[nodes[i]].append(i)
+    ## FOR
+    order = [ ]
+    while len(order) < clients:
+        for node in nodeOrder:
+            if byNode[node]: order.append(byNode[node].pop(0))
+    ## WHILE
+    
+    w_ids = range(scaleParameters.starting_warehouse, scaleParameters.ending_warehouse+1)
+    homes = [ None ] * clients
+    for k in range(clients):
+        if len(w_ids) >= clients:
+            homes[order[k]] = w_ids[k::clients]
+        else:
+            homes[order[k]] = [ w_ids[k % len(w_ids)] ]
+    ## FOR
+    return (homes)
+## DEF
+
+def clientWarehouses(scaleParameters, args):
+    """The home warehouses that were assigned to this client (all of them by default)"""
+    w_ids = args.get('client_warehouses')
+    if w_ids == None: w_ids = range(scaleParameters.starting_warehouse, scaleParameters.ending_warehouse+1)
+    return (w_ids)
+## DEF
+
+def assignTerminalHomes(w_ids, terminals):
+    """
+        Split the home warehouses of a client over its terminals and return
+        the (w_ids, d_id) home of each one. If there are fewer terminals than
+        warehouses, every terminal gets a share of the warehouses and no home
+        district. Otherwise every terminal gets one warehouse, and the
+        terminals of a warehouse get a district each.
+    """
+    homes = [ ]
+    for i in range(terminals):
+        if terminals <= len(w_ids):
+            homes.append((w_ids[i::terminals], None))
+        else:
+            homes.append(([ w_ids[i % len(w_ids)] ], (i // len(w_ids)) % constants.DISTRICTS_PER_WAREHOUSE + 1))
+    ## FOR
+    return (homes)
+## DEF
+
+def makeTerminalHomes(scaleParameters, args, terminals):
+    """The homes of the terminals of this client if --home-warehouses was given, otherwise None"""
+    if not args.get('home_warehouses'): return (None)
+    return assignTerminalHomes(clientWarehouses(scaleParameters, args), terminals)
+## DEF
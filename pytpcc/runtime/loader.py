@@ -32,64 +32,445 @@
 import os
 import sys
 
+import copy
 import logging
+import itertools
+import multiprocessing
+import threading
+import Queue
+import traceback
 from datetime import datetime
-from random import shuffle
 from pprint import pprint,pformat
 
 import constants
+import batchsizer
+import datacache
+import loadjournal
 from util import *
 
+## Work unit types. Each unit is a tuple that starts with one of these.
+UNIT_ITEM = "ITEM"              # (UNIT_ITEM, first_i_id, last_i_id, originalRows)
+UNIT_WAREHOUSE = "WAREHOUSE"    # (UNIT_WAREHOUSE, w_id)
+UNIT_DISTRICT = "DISTRICT"      # (UNIT_DISTRICT, w_id, d_id)
+UNIT_STOCK = "STOCK"            # (UNIT_STOCK, w_id, first_i_id, last_i_id, originalRows)
+
+## The number of ids that are generated from the same random stream
+GENERATION_BLOCK = 1000
+
+## The number of messages that a pipeline generator process can get ahead
+## of its writer before it has to wait for it
+PIPELINE_DEPTH = 16
+
 class Loader:
     
-    def __init__(self, handle, scaleParameters, w_ids, needLoadItems):
+    def __init__(self, handle, scaleParameters, w_ids, needLoadItems, processes = 1, config = None, cacheDir = None, seed = None, journal = None, generators = 0, writers = 1, itemShare = (0, 1)):
         self.handle = handle
         self.scaleParameters = scaleParameters
         self.w_ids = w_ids
         self.needLoadItems = needLoadItems
+        
+        ## The ITEM table can be split among several loaders. itemShare is
+        ## (share, shares): this loader loads every shares-th ITEM unit starting
+        ## from the share-th one. When the table is split, it is up to whoever
+        ## started the loaders to fire loadFinishItem once they are all done.
+        self.itemShare = itemShare
         self.batch_size = 2500
         
+        ## Picks the number of tuples per driver call for each table, starting
+        ## from batch_size. Every process or thread with its own driver has its
+        ## own BatchSizer.
+        self.batchSizer = batchsizer.BatchSizer(handle, self.batch_size)
+        
+        ## Every piece of the data is generated from its own random stream that
+        ## is derived from the master seed, so the data does not depend on which
+        ## process generates it or in what order
+        self.seed = seed
+        self.nurandC = nurand.makeForSeed(seed)[0] if seed is not None else None
+        self.rand = self.makeRandom()
+        
+        ## When processes > 1, each worker process creates its own driver
+        ## of the same class as handle and initializes it with config
+        self.processes = processes
+        self.config = config
+        assert self.processes == 1 or self.config != None, "Parallel loading requires the driver configuration"
+        
+        ## When generators > 0, the tuples are generated in that many processes
+        ## and handed over to writers threads that each have their own driver
+        ## instead of each process generating and writing its own units
+        self.generators = generators
+        self.writers = max(1, min(writers, generators))
+        assert self.generators == 0 or self.config != None, "Pipelined loading requires the driver configuration"
+        
+        ## Units found in the cache are replayed instead of generated, and
+        ## the ones that are not get written to it as they are generated
+        self.cache = datacache.DataCache(cacheDir, scaleParameters, seed) if cacheDir else None
+        self.cacheWriter = None
+        
+        ## The LoadJournal (if any) that the progress of the load is recorded in.
+        ## Units that it says are done are skipped.
+        self.journal = journal
+        
+        ## Where the time of the load went. Every process or thread that loads
+        ## tuples records its own LoadStats that get merged in here.
+        self.stats = loadstats.LoadStats()
+        
     ## ==============================================
     ## execute
     ## ==============================================
     def execute(self):
+        """Load all of the data, returning the LoadStats of all of the workers"""
+        self.stats.startLoading()
+        units = self.makeWorkUnits()
+        
+        ## Count the outstanding units of each warehouse so that we know
+        ## when to fire loadFinishWarehouse/loadFinishItem
+        pending = { }
+        for unit in units:
+            key = self.unitWarehouse(unit)
+            pending[key] = pending.get(key, 0) + 1
+        ## FOR
+        
+        ## Skip the units that were already loaded by the load we are resuming
+        if self.journal != None:
+            done = [ unit for unit in units if self.journal.isDone(unitName(unit)) ]
+            if done: logging.info("Skipping %d of %d work units that were already loaded" % (len(done), len(units)))
+            units = [ unit for unit in units if not self.journal.isDone(unitName(unit)) ]
+            for unit in done:
+                self.completeUnit(unit, pending)
+        ## IF
+        
+        if self.generators > 0:
+            completed = self.executePipelined(units)
+        elif self.processes > 1:
+            completed = self.executeParallel(units)
+        else:
+            completed = self.executeSerial(units)
+        
+        for unit in completed:
+            self.completeUnit(unit, pending)
+        ## FOR
+        
+        self.stats.stopLoading()
+        return (self.stats)
+    ## DEF
+    
+    def completeUnit(self, unit, pending):
+        """Fire the finish callback once all of the units of a warehouse (or ITEM) are done"""
+        key = self.unitWarehouse(unit)
+        pending[key] -= 1
+        if pending[key] > 0: return
+        
+        if key == None and self.itemShare[1] > 1: return
+        name = constants.TABLENAME_ITEM if key == None else "%s-%d" % (constants.TABLENAME_WAREHOUSE, key)
+        if self.journal != None and self.journal.isFinished(name): return
+        if key == None:
+            self.stats.measureCallback(self.handle.loadFinishItem)
+        else:
+            self.stats.measureCallback(self.handle.loadFinishWarehouse, key)
+        if self.journal != None: self.journal.finished(name)
+    ## DEF
+    
+    ## ==============================================
+    ## executeSerial
+    ## ==============================================
+    def executeSerial(self, units):
+        """Load every unit in this process, yielding each one once it is done"""
+        for unit in units:
+            self.loadUnit(unit)
+            yield unit
+        ## FOR
+    ## DEF
+    
+    ## ==============================================
+    ## executeParallel
+    ## ==============================================
+    def executeParallel(self, units):
+        """
+            Load the units using a pool of worker processes, yielding each
+            unit once it is done. All of the units are put in one shared queue,
+            so a worker that finishes early just takes the next unit instead of
+            waiting for the slower ones.
+        """
+        unitQueue = multiprocessing.Queue()
+        doneQueue = multiprocessing.Queue()
+        for unit in units:
+            unitQueue.put(unit)
+        ## FOR
+        
+        workers = [ ]
+        for i in range(self.processes):
+            unitQueue.put(None)
+            p = multiprocessing.Process(target=loaderWorker, args=(self, unitQueue, doneQueue))
+            p.start()
+            workers.append(p)
+        ## FOR
+        logging.debug("Started %d loader processes for %d work units" % (len(workers), len(units)))
+        
+        try:
+            running = len(workers)
+            while running > 0:
+                try:
+                    status, payload = doneQueue.get(timeout=1.0)
+                except Queue.Empty:
+                    if not any([ p.is_alive() for p in workers ]):
+                        raise Exception("All loader processes exited before finishing their work units")
+                    continue
+                if status == LOADER_UNIT_DONE:
+                    yield payload
+                elif status == LOADER_EXIT:
+                    self.stats.append(payload)
+                    running -= 1
+                else:
+                    raise Exception("Loader process failed on work unit %s\n%s" % (unitName(payload), status))
+            ## WHILE
+        finally:
+            for p in workers:
+                if p.is_alive(): p.terminate()
+                p.join()
+            ## FOR
+    ## DEF
+    
+    ## ==============================================
+    ## executePipelined
+    ## ==============================================
+    def executePipelined(self, units):
+        """
+            Load the units with separate generator processes and driver writer
+            threads, yielding each unit once it is done. Each generator has its
+            own bounded queue that it hands the driver calls for its units
+            over in, so the generators only run ahead of the writers by
+            PIPELINE_DEPTH chunks. All of the messages of a unit go through the
+            same queue and thus reach the same writer in order.
+        """
+        unitQueue = multiprocessing.Queue()
+        for unit in units:
+            unitQueue.put(unit)
+        ## FOR
+        
+        generators = [ ]
+        tupleQueues = [ ]
+        for i in range(self.generators):
+            unitQueue.put(None)
+            tupleQueue = multiprocessing.Queue(PIPELINE_DEPTH)
+            p = multiprocessing.Process(target=pipelineGenerator, args=(self, unitQueue, tupleQueue))
+            p.start()
+            generators.append(p)
+            tupleQueues.append(tupleQueue)
+        ## FOR
+        
+        doneQueue = Queue.Queue()
+        writers = [ ]
+        for i in range(self.writers):
+            t = threading.Thread(target=pipelineWriter, args=(self, i, tupleQueues[i::self.writers], doneQueue))
+            t.daemon = True
+            t.start()
+            writers.append(t)
+        ## FOR
+        logging.debug("Started %d generator processes and %d writers for %d work units" % (len(generators), len(writers), len(units)))
+        
+        try:
+            running = len(writers)
+            while running > 0:
+                try:
+                    status, payload = doneQueue.get(timeout=1.0)
+                except Queue.Empty:
+                    if not any([ t.is_alive() for t in writers ]):
+                        raise Exception("All loader writers exited before finishing their work units")
+                    if any([ p.exitcode not in (None, 0) for p in generators ]):
+                        raise Exception("A generator process died before finishing its work units")
+                    continue
+                if status == LOADER_UNIT_DONE:
+                    yield payload
+                elif status == LOADER_EXIT:
+                    self.stats.append(payload)
+                    running -= 1
+                else:
+                    raise Exception("Loader pipeline failed on work unit %s\n%s" % (unitName(payload), status))
+            ## WHILE
+        finally:
+            for p in generators:
+                if p.is_alive(): p.terminate()
+                p.join()
+            ## FOR
+    ## DEF
+    
+    ## ==============================================
+    ## makeWorkUnits
+    ## ==============================================
+    def makeWorkUnits(self):
+        """
+            Split the data to load into independent units of work. The STOCK
+            table of a warehouse is split into districtsPerWarehouse ranges so
+            that its units are about as big as the DISTRICT units.
+        """
+        units = [ ]
+        items = self.scaleParameters.items
         
-        ## Item Table
         if self.needLoadItems:
-            logging.debug("Loading ITEM table")
-            self.loadItems()
-            self.handle.loadFinishItem()
-            
-        ## Then create the warehouse-specific tuples
+            ## Select 10% of the rows to be marked "original"
+            ## Every loader picks the same rows and splits the table the same way,
+            ## no matter which part of it they end up loading
+            originalRows = self.makeRandom(constants.TABLENAME_ITEM, "original").selectUniqueIds(items / 10, 1, items)
+            share, shares = self.itemShare
+            units.extend(self.makeRangeUnits(UNIT_ITEM, [ ], originalRows)[share::shares])
+        ## IF
+        
         for w_id in self.w_ids:
-            self.loadWarehouse(w_id)
-            self.handle.loadFinishWarehouse(w_id)
+            units.append((UNIT_WAREHOUSE, w_id))
+            
+            ## Select 10% of the stock to be marked "original"
+            originalRows = self.makeRandom(constants.TABLENAME_STOCK, w_id, "original").selectUniqueIds(items / 10, 1, items)
+            stock = self.makeRangeUnits(UNIT_STOCK, [ w_id ], originalRows)
+            
+            ## Interleave the STOCK and DISTRICT units so that the big ones are
+            ## spread out over the queue
+            for d_id in range(1, self.scaleParameters.districtsPerWarehouse+1):
+                units.append((UNIT_DISTRICT, w_id, d_id))
+                if stock: units.append(stock.pop(0))
+            ## FOR
+            units.extend(stock)
+        ## FOR
+        return (units)
+    ## DEF
+    
+    def makeRangeUnits(self, unitType, prefix, originalRows):
+        items = self.scaleParameters.items
+        numDistricts = self.scaleParameters.districtsPerWarehouse
+        step = max(self.batch_size, (items + numDistricts - 1) / numDistricts)
+        step = ((step + GENERATION_BLOCK - 1) / GENERATION_BLOCK) * GENERATION_BLOCK
+        units = [ ]
+        for first in range(1, items+1, step):
+            last = min(first + step - 1, items)
+            original = set([ i for i in originalRows if first <= i and i <= last ])
+            units.append(tuple([ unitType ] + prefix + [ first, last, original ]))
         ## FOR
+        return (units)
+    ## DEF
+    
+    def makeRandom(self, *path):
+        """Return the random stream for the given part of the data"""
+        return rand.Random(rand.deriveSeed(self.seed, "load", *path), self.nurandC)
+    ## DEF
+    
+    def unitWarehouse(self, unit):
+        """Return the W_ID that the given unit belongs to (None for ITEM)"""
+        return (None if unit[0] == UNIT_ITEM else unit[1])
+    ## DEF
+    
+    ## ==============================================
+    ## loadUnit
+    ## ==============================================
+    def loadUnit(self, unit):
+        self.beginUnit(unit)
+        self.writeUnit(unit)
+        self.endUnit(unit)
+    ## DEF
+    
+    def beginUnit(self, unit):
+        """Record in the journal that the unit is started, cleaning up what an earlier load left of it"""
+        if self.journal == None: return
+        name = unitName(unit)
+        if self.journal.isPartial(name):
+            logging.info("Cleaning up partially loaded work unit %s" % name)
+            self.cleanupUnit(unit)
+        self.journal.started(name)
+    ## DEF
+    
+    def writeUnit(self, unit):
+        """Hand all of the tuples of the unit to the driver, from the cache or freshly generated"""
+        if self.cache != None:
+            if self.cache.contains(unit):
+                self.replayUnit(unit)
+            else:
+                self.cacheWriter = self.cache.open(unit)
+                try:
+                    self.generateUnit(unit)
+                    self.cacheWriter.commit()
+                except:
+                    self.cacheWriter.abort()
+                    raise
+                finally:
+                    self.cacheWriter = None
+        else:
+            self.generateUnit(unit)
         
-        return (None)
+        if unit[0] == UNIT_DISTRICT:
+            self.stats.measureCallback(self.handle.loadFinishDistrict, *unit[1:])
+    ## DEF
+    
+    def endUnit(self, unit):
+        """The unit can only be marked as done once the driver has made it durable"""
+        if self.journal == None: return
+        self.stats.measureCallback(self.handle.loadCheckpoint)
+        self.journal.done(unitName(unit))
+    ## DEF
+    
+    def cleanupUnit(self, unit):
+        """Have the driver remove whatever part of the unit an earlier load managed to store"""
+        if unit[0] == UNIT_ITEM:
+            self.handle.loadCleanupItems(*unit[1:3])
+        elif unit[0] == UNIT_WAREHOUSE:
+            self.handle.loadCleanupWarehouse(*unit[1:])
+        elif unit[0] == UNIT_DISTRICT:
+            self.handle.loadCleanupDistrict(*unit[1:])
+        elif unit[0] == UNIT_STOCK:
+            self.handle.loadCleanupStock(*unit[1:4])
+        else:
+            assert False, "Unexpected work unit: %s" % str(unit)
+    ## DEF
+    
+    def replayUnit(self, unit):
+        logging.debug("LOAD - Replaying %s from the data cache" % unitName(unit))
+        for tableName, records in itertools.groupby(self.cache.replay(unit), lambda r: r[0]):
+            self.writeTupleStream(tableName, (tuples for (_, tuples) in records))
+        ## FOR
+    ## DEF
+    
+    def generateUnit(self, unit):
+        if unit[0] == UNIT_ITEM:
+            self.loadItems(*unit[1:])
+        elif unit[0] == UNIT_WAREHOUSE:
+            self.loadWarehouse(*unit[1:])
+        elif unit[0] == UNIT_DISTRICT:
+            self.loadDistrict(*unit[1:])
+        elif unit[0] == UNIT_STOCK:
+            self.loadStock(*unit[1:])
+        else:
+            assert False, "Unexpected work unit: %s" % str(unit)
+    ## DEF
+
+    ## ==============================================
+    ## loadTuples
+    ## ==============================================
+    def loadTuples(self, tableName, tuples):
+        if self.cacheWriter != None: self.cacheWriter.write(tableName, tuples)
+        self.writeTupleStream(tableName, [ tuples ])
+    ## DEF
+
+    ## ==============================================
+    ## loadTupleStream
+    ## ==============================================
+    def loadTupleStream(self, tableName, chunks):
+        if self.cacheWriter != None: chunks = self.cacheWriter.record(tableName, chunks)
+        self.writeTupleStream(tableName, chunks)
+    ## DEF
+
+    ## ==============================================
+    ## writeTupleStream
+    ## ==============================================
+    def writeTupleStream(self, tableName, chunks):
+        """Hand the tuples to the driver in batches of the size that the BatchSizer picks"""
+        chunks = self.stats.measureGeneration(tableName, chunks)
+        if self.batchSizer != None: chunks = self.batchSizer.rebatch(tableName, chunks)
+        self.stats.measureDriver(tableName, self.handle.loadTupleStream, chunks)
+    ## DEF
 
     ## ==============================================
     ## loadItems
     ## ==============================================
-    def loadItems(self):
-        ## Select 10% of the rows to be marked "original"
-        originalRows = rand.selectUniqueIds(self.scaleParameters.items / 10, 1, self.scaleParameters.items)
-        
-        ## Load all of the items
-        tuples = [ ]
-        total_tuples = 0
-        for i in range(1, self.scaleParameters.items+1):
-            original = (i in originalRows)
-            tuples.append(self.generateItem(i, original))
-            total_tuples += 1
-            if len(tuples) == self.batch_size:
-                logging.debug("LOAD - %s: %5d / %d" % (constants.TABLENAME_ITEM, total_tuples, self.scaleParameters.items))
-                self.handle.loadTuples(constants.TABLENAME_ITEM, tuples)
-                tuples = [ ]
-        ## FOR
-        if len(tuples) > 0:
-            logging.debug("LOAD - %s: %5d / %d" % (constants.TABLENAME_ITEM, total_tuples, self.scaleParameters.items))
-            self.handle.loadTuples(constants.TABLENAME_ITEM, tuples)
+    def loadItems(self, first_i_id, last_i_id, originalRows):
+        generate = lambda first, last: self.generateItemBatch(first, last, originalRows)
+        self.loadTupleStream(constants.TABLENAME_ITEM, self.generateChunks(constants.TABLENAME_ITEM, (), first_i_id, last_i_id, generate))
     ## DEF
 
     ## ==============================================
@@ -97,97 +478,108 @@ class Loader:
     ## ==============================================
     def loadWarehouse(self, w_id):
         logging.debug("LOAD - %s: %d / %d" % (constants.TABLENAME_WAREHOUSE, w_id, len(self.w_ids)))
-        
-        ## WAREHOUSE
+        self.rand = self.makeRandom(constants.TABLENAME_WAREHOUSE, w_id)
         w_tuples = [ self.generateWarehouse(w_id) ]
-        self.handle.loadTuples(constants.TABLENAME_WAREHOUSE, w_tuples)
+        self.loadTuples(constants.TABLENAME_WAREHOUSE, w_tuples)
+    ## DEF
 
-        ## DISTRICT
-        d_tuples = [ ]
-        for d_id in range(1, self.scaleParameters.districtsPerWarehouse+1):
-            d_next_o_id = self.scaleParameters.customersPerDistrict + 1
-            d_tuples = [ self.generateDistrict(w_id, d_id, d_next_o_id) ]
-            
-            c_tuples = [ ]
-            h_tuples = [ ]
-            
-            ## Select 10% of the customers to have bad credit
-            selectedRows = rand.selectUniqueIds(self.scaleParameters.customersPerDistrict / 10, 1, self.scaleParameters.customersPerDistrict)
-            
-            ## TPC-C 4.3.3.1. says that o_c_id should be a permutation of [1, 3000]. But since it
-            ## is a c_id field, it seems to make sense to have it be a permutation of the
-            ## customers. For the "real" thing this will be equivalent
-            cIdPermutation = [ ]
-
-            for c_id in range(1, self.scaleParameters.customersPerDistrict+1):
-                badCredit = (c_id in selectedRows)
-                c_tuples.append(self.generateCustomer(w_id, d_id, c_id, badCredit, True))
-                h_tuples.append(self.generateHistory(w_id, d_id, c_id))
-                cIdPermutation.append(c_id)
-            ## FOR
-            assert cIdPermutation[0] == 1
-            assert cIdPermutation[self.scaleParameters.customersPerDistrict - 1] == self.scaleParameters.customersPerDistrict
-            shuffle(cIdPermutation)
-            
-            o_tuples = [ ]
-            ol_tuples = [ ]
-            no_tuples = [ ]
-            
-            for o_id in range(1, self.scaleParameters.customersPerDistrict+1):
-                o_ol_cnt = rand.number(constants.MIN_OL_CNT, constants.MAX_OL_CNT)
-                
-                ## The last newOrdersPerDistrict are new orders
-                newOrder = ((self.scaleParameters.customersPerDistrict - self.scaleParameters.newOrdersPerDistrict) < o_id)
-                o_tuples.append(self.generateOrder(w_id, d_id, o_id, cIdPermutation[o_id - 1], o_ol_cnt, newOrder))
-
-                ## Generate each OrderLine for the order
-                for ol_number in range(0, o_ol_cnt):
-                    ol_tuples.append(self.generateOrderLine(w_id, d_id, o_id, ol_number, self.scaleParameters.items, newOrder))
-                ## FOR
-
-                ## This is a new order: make one for it
-                if newOrder: no_tuples.append([o_id, d_id, w_id])
-            ## FOR
-            
-            self.handle.loadTuples(constants.TABLENAME_DISTRICT, d_tuples)
-            self.handle.loadTuples(constants.TABLENAME_CUSTOMER, c_tuples)
-            self.handle.loadTuples(constants.TABLENAME_ORDERS, o_tuples)
-            self.handle.loadTuples(constants.TABLENAME_ORDER_LINE, ol_tuples)
-            self.handle.loadTuples(constants.TABLENAME_NEW_ORDER, no_tuples)
-            self.handle.loadTuples(constants.TABLENAME_HISTORY, h_tuples)
-            self.handle.loadFinishDistrict(w_id, d_id)
-        ## FOR
+    ## ==============================================
+    ## loadStock
+    ## ==============================================
+    def loadStock(self, w_id, first_i_id, last_i_id, originalRows):
+        generate = lambda first, last: self.generateStockBatch(w_id, first, last, originalRows)
+        self.loadTupleStream(constants.TABLENAME_STOCK, self.generateChunks(constants.TABLENAME_STOCK, (w_id,), first_i_id, last_i_id, generate))
+    ## DEF
+
+    ## ==============================================
+    ## loadDistrict
+    ## ==============================================
+    def loadDistrict(self, w_id, d_id):
+        """
+            Load all of the tuples for a single district. The large tables are
+            handed to the driver as streams of chunks that are only generated
+            when the driver asks for them.
+        """
+        self.rand = self.makeRandom(constants.TABLENAME_DISTRICT, w_id, d_id)
+        numCustomers = self.scaleParameters.customersPerDistrict
+        d_next_o_id = numCustomers + 1
+        d_tuples = [ self.generateDistrict(w_id, d_id, d_next_o_id) ]
+        
+        ## Select 10% of the customers to have bad credit
+        selectedRows = self.rand.selectUniqueIds(numCustomers / 10, 1, numCustomers)
+        
+        ## TPC-C 4.3.3.1. says that o_c_id should be a permutation of [1, 3000]. But since it
+        ## is a c_id field, it seems to make sense to have it be a permutation of the
+        ## customers. For the "real" thing this will be equivalent
+        cIdPermutation = range(1, numCustomers+1)
+        self.rand.shuffle(cIdPermutation)
         
-        ## Select 10% of the stock to be marked "original"
-        s_tuples = [ ]
-        selectedRows = rand.selectUniqueIds(self.scaleParameters.items / 10, 1, self.scaleParameters.items)
-        total_tuples = 0
-        for i_id in range(1, self.scaleParameters.items+1):
-            original = (i_id in selectedRows)
-            s_tuples.append(self.generateStock(w_id, i_id, original))
-            if len(s_tuples) >= self.batch_size:
-                logging.debug("LOAD - %s [W_ID=%d]: %5d / %d" % (constants.TABLENAME_STOCK, w_id, total_tuples, self.scaleParameters.items))
-                self.handle.loadTuples(constants.TABLENAME_STOCK, s_tuples)
-                s_tuples = [ ]
-            total_tuples += 1
+        ## ORDERS and ORDER_LINE both need the number of lines in each order
+        o_ol_cnts = self.rand.numbers(constants.MIN_OL_CNT, constants.MAX_OL_CNT, numCustomers)
+        
+        ## The last newOrdersPerDistrict are new orders
+        firstNewOrder = numCustomers - self.scaleParameters.newOrdersPerDistrict + 1
+        no_tuples = [ [o_id, d_id, w_id] for o_id in range(firstNewOrder, numCustomers+1) ]
+        
+        self.loadTuples(constants.TABLENAME_DISTRICT, d_tuples)
+        self.loadTupleStream(constants.TABLENAME_CUSTOMER, self.generateChunks(constants.TABLENAME_CUSTOMER, (w_id, d_id), 1, numCustomers,
+            lambda first, last: self.generateCustomerBatch(w_id, d_id, first, last, selectedRows)))
+        self.loadTupleStream(constants.TABLENAME_ORDERS, self.generateChunks(constants.TABLENAME_ORDERS, (w_id, d_id), 1, numCustomers,
+            lambda first, last: self.generateOrderBatch(w_id, d_id, first, last, cIdPermutation, o_ol_cnts)))
+        self.loadTupleStream(constants.TABLENAME_ORDER_LINE, self.generateChunks(constants.TABLENAME_ORDER_LINE, (w_id, d_id), 1, numCustomers,
+            lambda first, last: self.generateOrderLineBatch(w_id, d_id, first, last, o_ol_cnts)))
+        self.loadTuples(constants.TABLENAME_NEW_ORDER, no_tuples)
+        self.loadTupleStream(constants.TABLENAME_HISTORY, self.generateChunks(constants.TABLENAME_HISTORY, (w_id, d_id), 1, numCustomers,
+            lambda first, last: self.generateHistoryBatch(w_id, d_id, first, last)))
+    ## DEF
+
+    ## ==============================================
+    ## generateChunks
+    ## ==============================================
+    def generateChunks(self, tableName, streamPath, first_id, last_id, generate):
+        """
+            Lazily generate the tuples for the ids in [first_id, last_id] and
+            yield one chunk per block. The ids are generated in fixed blocks of
+            GENERATION_BLOCK ids that each use their own random stream, so the
+            tuples do not depend on the batch sizes that the driver is given or
+            on how the range was split into work units.
+        """
+        assert (first_id - 1) % GENERATION_BLOCK == 0, "Unaligned %s range [%d, %d]" % (tableName, first_id, last_id)
+        for first in xrange(first_id, last_id+1, GENERATION_BLOCK):
+            last = min(first + GENERATION_BLOCK - 1, last_id)
+            logging.debug("LOAD - %s: %5d / %d" % (tableName, last, last_id))
+            self.rand = self.makeRandom(tableName, *(streamPath + ((first - 1) / GENERATION_BLOCK,)))
+            yield generate(first, last)
         ## FOR
-        if len(s_tuples) > 0:
-            logging.debug("LOAD - %s [W_ID=%d]: %5d / %d" % (constants.TABLENAME_STOCK, w_id, total_tuples, self.scaleParameters.items))
-            self.handle.loadTuples(constants.TABLENAME_STOCK, s_tuples)
     ## DEF
 
     ## ==============================================
-    ## generateItem
+    ## isNewOrder
     ## ==============================================
-    def generateItem(self, id, original):
-        i_id = id
-        i_im_id = rand.number(constants.MIN_IM, constants.MAX_IM)
-        i_name = rand.astring(constants.MIN_I_NAME, constants.MAX_I_NAME)
-        i_price = rand.fixedPoint(constants.MONEY_DECIMALS, constants.MIN_PRICE, constants.MAX_PRICE)
-        i_data = rand.astring(constants.MIN_I_DATA, constants.MAX_I_DATA)
-        if original: i_data = self.fillOriginal(i_data)
+    def isNewOrder(self, o_id):
+        """The last newOrdersPerDistrict orders in each district are new orders"""
+        return (self.scaleParameters.customersPerDistrict - self.scaleParameters.newOrdersPerDistrict) < o_id
+    ## DEF
 
-        return [i_id, i_im_id, i_name, i_price, i_data]
+    ## ==============================================
+    ## generateItemBatch
+    ## ==============================================
+    def generateItemBatch(self, first_i_id, last_i_id, originalRows):
+        """Returns the ITEM tuples for the ids in [first_i_id, last_i_id]"""
+        count = last_i_id - first_i_id + 1
+        i_im_ids = self.rand.numbers(constants.MIN_IM, constants.MAX_IM, count)
+        i_names = self.rand.astrings(constants.MIN_I_NAME, constants.MAX_I_NAME, count)
+        i_prices = self.rand.fixedPoints(constants.MONEY_DECIMALS, constants.MIN_PRICE, constants.MAX_PRICE, count)
+        i_datas = self.rand.astrings(constants.MIN_I_DATA, constants.MAX_I_DATA, count)
+
+        tuples = [ ]
+        for i in xrange(count):
+            i_id = first_i_id + i
+            i_data = i_datas[i]
+            if i_id in originalRows: i_data = self.fillOriginal(i_data)
+            tuples.append([ i_id, i_im_ids[i], i_names[i], i_prices[i], i_data ])
+        ## FOR
+        return tuples
     ## DEF
 
     ## ==============================================
@@ -211,102 +603,133 @@ class Loader:
     ## DEF
 
     ## ==============================================
-    ## generateCustomer
+    ## generateCustomerBatch
     ## ==============================================
-    def generateCustomer(self, c_w_id, c_d_id, c_id, badCredit, doesReplicateName):
-        c_first = rand.astring(constants.MIN_FIRST, constants.MAX_FIRST)
-        c_middle = constants.MIDDLE
-
-        assert 1 <= c_id and c_id <= constants.CUSTOMERS_PER_DISTRICT
-        if c_id <= 1000:
-            c_last = rand.makeLastName(c_id - 1)
-        else:
-            c_last = rand.makeRandomLastName(constants.CUSTOMERS_PER_DISTRICT)
+    def generateCustomerBatch(self, c_w_id, c_d_id, first_c_id, last_c_id, badCreditRows):
+        """Returns the CUSTOMER tuples for the customers in [first_c_id, last_c_id] of the given district"""
+        count = last_c_id - first_c_id + 1
+        assert 1 <= first_c_id and last_c_id <= constants.CUSTOMERS_PER_DISTRICT
 
-        c_phone = rand.nstring(constants.PHONE, constants.PHONE)
+        c_firsts = self.rand.astrings(constants.MIN_FIRST, constants.MAX_FIRST, count)
+        c_middle = constants.MIDDLE
+        c_phones = self.rand.nstrings(constants.PHONE, constants.PHONE, count)
         c_since = datetime.now()
-        c_credit = constants.BAD_CREDIT if badCredit else constants.GOOD_CREDIT
         c_credit_lim = constants.INITIAL_CREDIT_LIM
-        c_discount = rand.fixedPoint(constants.DISCOUNT_DECIMALS, constants.MIN_DISCOUNT, constants.MAX_DISCOUNT)
+        c_discounts = self.rand.fixedPoints(constants.DISCOUNT_DECIMALS, constants.MIN_DISCOUNT, constants.MAX_DISCOUNT, count)
         c_balance = constants.INITIAL_BALANCE
         c_ytd_payment = constants.INITIAL_YTD_PAYMENT
         c_payment_cnt = constants.INITIAL_PAYMENT_CNT
         c_delivery_cnt = constants.INITIAL_DELIVERY_CNT
-        c_data = rand.astring(constants.MIN_C_DATA, constants.MAX_C_DATA)
+        c_datas = self.rand.astrings(constants.MIN_C_DATA, constants.MAX_C_DATA, count)
 
-        c_street1 = rand.astring(constants.MIN_STREET, constants.MAX_STREET)
-        c_street2 = rand.astring(constants.MIN_STREET, constants.MAX_STREET)
-        c_city = rand.astring(constants.MIN_CITY, constants.MAX_CITY)
-        c_state = rand.astring(constants.STATE, constants.STATE)
-        c_zip = self.generateZip()
+        c_street1s = self.rand.astrings(constants.MIN_STREET, constants.MAX_STREET, count)
+        c_street2s = self.rand.astrings(constants.MIN_STREET, constants.MAX_STREET, count)
+        c_cities = self.rand.astrings(constants.MIN_CITY, constants.MAX_CITY, count)
+        c_states = self.rand.astrings(constants.STATE, constants.STATE, count)
+        c_zips = self.generateZipBatch(count)
 
-        return [ c_id, c_d_id, c_w_id, c_first, c_middle, c_last, \
-                c_street1, c_street2, c_city, c_state, c_zip, \
-                c_phone, c_since, c_credit, c_credit_lim, c_discount, c_balance, \
-                c_ytd_payment, c_payment_cnt, c_delivery_cnt, c_data ]
+        tuples = [ ]
+        for i in xrange(count):
+            c_id = first_c_id + i
+            if c_id <= 1000:
+                c_last = rand.makeLastName(c_id - 1)
+            else:
+                c_last = self.rand.makeRandomLastName(constants.CUSTOMERS_PER_DISTRICT)
+            c_credit = constants.BAD_CREDIT if c_id in badCreditRows else constants.GOOD_CREDIT
+
+            tuples.append([ c_id, c_d_id, c_w_id, c_firsts[i], c_middle, c_last, \
+                            c_street1s[i], c_street2s[i], c_cities[i], c_states[i], c_zips[i], \
+                            c_phones[i], c_since, c_credit, c_credit_lim, c_discounts[i], c_balance, \
+                            c_ytd_payment, c_payment_cnt, c_delivery_cnt, c_datas[i] ])
+        ## FOR
+        return tuples
     ## DEF
 
     ## ==============================================
-    ## generateOrder
+    ## generateOrderBatch
     ## ==============================================
-    def generateOrder(self, o_w_id, o_d_id, o_id, o_c_id, o_ol_cnt, newOrder):
-        """Returns the generated o_ol_cnt value."""
+    def generateOrderBatch(self, o_w_id, o_d_id, first_o_id, last_o_id, cIdPermutation, o_ol_cnts):
+        """Returns the ORDERS tuples for the orders in [first_o_id, last_o_id] of the given district"""
+        count = last_o_id - first_o_id + 1
         o_entry_d = datetime.now()
-        o_carrier_id = constants.NULL_CARRIER_ID if newOrder else rand.number(constants.MIN_CARRIER_ID, constants.MAX_CARRIER_ID)
+        o_carrier_ids = self.rand.numbers(constants.MIN_CARRIER_ID, constants.MAX_CARRIER_ID, count)
         o_all_local = constants.INITIAL_ALL_LOCAL
-        return [ o_id, o_c_id, o_d_id, o_w_id, o_entry_d, o_carrier_id, o_ol_cnt, o_all_local ]
+
+        tuples = [ ]
+        for i in xrange(count):
+            o_id = first_o_id + i
+            o_carrier_id = constants.NULL_CARRIER_ID if self.isNewOrder(o_id) else o_carrier_ids[i]
+            tuples.append([ o_id, cIdPermutation[o_id - 1], o_d_id, o_w_id, o_entry_d, o_carrier_id, o_ol_cnts[o_id - 1], o_all_local ])
+        ## FOR
+        return tuples
     ## DEF
 
     ## ==============================================
-    ## generateOrderLine
+    ## generateOrderLineBatch
     ## ==============================================
-    def generateOrderLine(self, ol_w_id, ol_d_id, ol_o_id, ol_number, max_items, newOrder):
-        ol_i_id = rand.number(1, max_items)
+    def generateOrderLineBatch(self, ol_w_id, ol_d_id, first_o_id, last_o_id, o_ol_cnts):
+        """Returns the ORDER_LINE tuples for the orders in [first_o_id, last_o_id] of the given district"""
+        count = sum(o_ol_cnts[first_o_id - 1:last_o_id])
+        ol_i_ids = self.rand.numbers(1, self.scaleParameters.items, count)
         ol_supply_w_id = ol_w_id
         ol_delivery_d = datetime.now()
         ol_quantity = constants.INITIAL_QUANTITY
+        ol_amounts = self.rand.fixedPoints(constants.MONEY_DECIMALS, constants.MIN_AMOUNT, constants.MAX_PRICE * constants.MAX_OL_QUANTITY, count)
+        ol_dist_infos = self.rand.astrings(constants.DIST, constants.DIST, count)
 
-        if newOrder == False:
-            ol_amount = 0.00
-        else:
-            ol_amount = rand.fixedPoint(constants.MONEY_DECIMALS, constants.MIN_AMOUNT, constants.MAX_PRICE * constants.MAX_OL_QUANTITY)
-            ol_delivery_d = None
-        ol_dist_info = rand.astring(constants.DIST, constants.DIST)
-
-        return [ ol_o_id, ol_d_id, ol_w_id, ol_number, ol_i_id, ol_supply_w_id, ol_delivery_d, ol_quantity, ol_amount, ol_dist_info ]
+        tuples = [ ]
+        i = 0
+        for ol_o_id in xrange(first_o_id, last_o_id+1):
+            newOrder = self.isNewOrder(ol_o_id)
+            for ol_number in xrange(o_ol_cnts[ol_o_id - 1]):
+                if newOrder:
+                    tuples.append([ ol_o_id, ol_d_id, ol_w_id, ol_number, ol_i_ids[i], ol_supply_w_id, None, ol_quantity, ol_amounts[i], ol_dist_infos[i] ])
+                else:
+                    tuples.append([ ol_o_id, ol_d_id, ol_w_id, ol_number, ol_i_ids[i], ol_supply_w_id, ol_delivery_d, ol_quantity, 0.00, ol_dist_infos[i] ])
+                i += 1
+            ## FOR
+        ## FOR
+        return tuples
     ## DEF
 
     ## ==============================================
-    ## generateStock
+    ## generateStockBatch
     ## ==============================================
-    def generateStock(self, s_w_id, s_i_id, original):
-        s_quantity = rand.number(constants.MIN_QUANTITY, constants.MAX_QUANTITY);
-        s_ytd = 0;
-        s_order_cnt = 0;
-        s_remote_cnt = 0;
-
-        s_data = rand.astring(constants.MIN_I_DATA, constants.MAX_I_DATA);
-        if original: self.fillOriginal(s_data)
+    def generateStockBatch(self, s_w_id, first_i_id, last_i_id, originalRows):
+        """Returns the STOCK tuples for the items in [first_i_id, last_i_id]"""
+        count = last_i_id - first_i_id + 1
+        numDists = constants.DISTRICTS_PER_WAREHOUSE
+        s_quantities = self.rand.numbers(constants.MIN_QUANTITY, constants.MAX_QUANTITY, count)
+        s_ytd = 0
+        s_order_cnt = 0
+        s_remote_cnt = 0
+        s_datas = self.rand.astrings(constants.MIN_I_DATA, constants.MAX_I_DATA, count)
+        s_dists = self.rand.astrings(constants.DIST, constants.DIST, count * numDists)
 
-        s_dists = [ ]
-        for i in range(0, constants.DISTRICTS_PER_WAREHOUSE):
-            s_dists.append(rand.astring(constants.DIST, constants.DIST))
-        
-        return [ s_i_id, s_w_id, s_quantity ] + \
-               s_dists + \
-               [ s_ytd, s_order_cnt, s_remote_cnt, s_data ]
+        tuples = [ ]
+        for i in xrange(count):
+            s_i_id = first_i_id + i
+            s_data = s_datas[i]
+            if s_i_id in originalRows: s_data = self.fillOriginal(s_data)
+            tuples.append([ s_i_id, s_w_id, s_quantities[i] ] + \
+                          s_dists[i*numDists:(i+1)*numDists] + \
+                          [ s_ytd, s_order_cnt, s_remote_cnt, s_data ])
+        ## FOR
+        return tuples
     ## DEF
 
     ## ==============================================
-    ## generateHistory
+    ## generateHistoryBatch
     ## ==============================================
-    def generateHistory(self, h_c_w_id, h_c_d_id, h_c_id):
+    def generateHistoryBatch(self, h_c_w_id, h_c_d_id, first_c_id, last_c_id):
+        """Returns the HISTORY tuples for the customers in [first_c_id, last_c_id] of the given district"""
+        count = last_c_id - first_c_id + 1
         h_w_id = h_c_w_id
         h_d_id = h_c_d_id
         h_date = datetime.now()
         h_amount = constants.INITIAL_AMOUNT
-        h_data = rand.astring(constants.MIN_DATA, constants.MAX_DATA)
-        return [ h_c_id, h_c_d_id, h_c_w_id, h_d_id, h_w_id, h_date, h_amount, h_data ]
+        h_datas = self.rand.astrings(constants.MIN_DATA, constants.MAX_DATA, count)
+        return [ [ first_c_id + i, h_c_d_id, h_c_w_id, h_d_id, h_w_id, h_date, h_amount, h_datas[i] ] for i in xrange(count) ]
     ## DEF
 
     ## ==============================================
@@ -317,7 +740,7 @@ class Loader:
             Returns a name and a street address 
             Used by both generateWarehouse and generateDistrict.
         """
-        name = rand.astring(constants.MIN_NAME, constants.MAX_NAME)
+        name = self.rand.astring(constants.MIN_NAME, constants.MAX_NAME)
         return [ name ] + self.generateStreetAddress()
     ## DEF
 
@@ -329,10 +752,10 @@ class Loader:
             Returns a list for a street address
             Used for warehouses, districts and customers.
         """
-        street1 = rand.astring(constants.MIN_STREET, constants.MAX_STREET)
-        street2 = rand.astring(constants.MIN_STREET, constants.MAX_STREET)
-        city = rand.astring(constants.MIN_CITY, constants.MAX_CITY)
-        state = rand.astring(constants.STATE, constants.STATE)
+        street1 = self.rand.astring(constants.MIN_STREET, constants.MAX_STREET)
+        street2 = self.rand.astring(constants.MIN_STREET, constants.MAX_STREET)
+        city = self.rand.astring(constants.MIN_CITY, constants.MAX_CITY)
+        state = self.rand.astring(constants.STATE, constants.STATE)
         zip = self.generateZip()
 
         return [ street1, street2, city, state, zip ]
@@ -342,7 +765,7 @@ class Loader:
     ## generateTax
     ## ==============================================
     def generateTax(self):
-        return rand.fixedPoint(constants.TAX_DECIMALS, constants.MIN_TAX, constants.MAX_TAX)
+        return self.rand.fixedPoint(constants.TAX_DECIMALS, constants.MIN_TAX, constants.MAX_TAX)
     ## DEF
 
     ## ==============================================
@@ -350,7 +773,15 @@ class Loader:
     ## ==============================================
     def generateZip(self):
         length = constants.ZIP_LENGTH - len(constants.ZIP_SUFFIX)
-        return rand.nstring(length, length) + constants.ZIP_SUFFIX
+        return self.rand.nstring(length, length) + constants.ZIP_SUFFIX
+    ## DEF
+
+    ## ==============================================
+    ## generateZipBatch
+    ## ==============================================
+    def generateZipBatch(self, count):
+        length = constants.ZIP_LENGTH - len(constants.ZIP_SUFFIX)
+        return [ z + constants.ZIP_SUFFIX for z in self.rand.nstrings(length, length, count) ]
     ## DEF
 
     ## ==============================================
@@ -361,9 +792,231 @@ class Loader:
             a string with ORIGINAL_STRING at a random position
         """
         originalLength = len(constants.ORIGINAL_STRING)
-        position = rand.number(0, len(data) - originalLength)
+        position = self.rand.number(0, len(data) - originalLength)
         out = data[:position] + constants.ORIGINAL_STRING + data[position + originalLength:]
         assert len(out) == len(data)
         return out
     ## DEF
-## CLASS
\ No newline at end of file
+## CLASS
+
+## ==============================================
+## loaderWorker
+## ==============================================
+LOADER_UNIT_DONE = "DONE"
+LOADER_EXIT = "EXIT"
+
+def unitName(unit):
+    """Return a short name for a work unit, e.g. DISTRICT-1-3"""
+    if unit == None: return "<none>"
+    return "-".join([ str(x) for x in unit if not isinstance(x, set) ])
+## DEF
+
+def makeWorkerDriver(parent):
+    """Create a driver of our own for a loader process or thread, configured like the parent's"""
+    config = dict(parent.config)
+    ## The parent's driver already reset the database
+    config['reset'] = False
+    handle = parent.handle.__class__(parent.handle.ddl)
+    handle.loadConfig(config)
+    return (handle)
+## DEF
+
+def loaderWorker(parent, unitQueue, doneQueue):
+    """Entry point of a loader process: load units until the queue hands us None"""
+    unit = None
+    try:
+        handle = makeWorkerDriver(parent)
+        l = copy.copy(parent)
+        l.handle = handle
+        l.processes = 1
+        l.generators = 0
+        l.batchSizer = batchsizer.BatchSizer(handle, parent.batch_size)
+        l.stats = loadstats.LoadStats()
+        
+        l.stats.startLoading()
+        handle.loadStart()
+        for unit in iter(unitQueue.get, None):
+            l.loadUnit(unit)
+            doneQueue.put((LOADER_UNIT_DONE, unit))
+        ## FOR
+        handle.loadFinish()
+        l.stats.stopLoading()
+        doneQueue.put((LOADER_EXIT, l.stats))
+    except KeyboardInterrupt:
+        pass
+    except (Exception, AssertionError), ex:
+        logging.warn("Failed to load data: %s" % (ex))
+        doneQueue.put((traceback.format_exc(), unit))
+## DEF
+
+## ==============================================
+## Pipelined Loading
+## ==============================================
+PIPELINE_BEGIN = "BEGIN"        # (PIPELINE_BEGIN, unit)
+PIPELINE_CALL = "CALL"          # (PIPELINE_CALL, (methodName, args))
+PIPELINE_STREAM = "STREAM"      # (PIPELINE_STREAM, tableName)
+PIPELINE_CHUNK = "CHUNK"        # (PIPELINE_CHUNK, tuples)
+PIPELINE_STREAM_END = "ENDSTREAM" # (PIPELINE_STREAM_END, tableName)
+PIPELINE_END = "END"            # (PIPELINE_END, unit)
+PIPELINE_ERROR = "ERROR"        # (PIPELINE_ERROR, (unit, traceback))
+
+class PipelineHandle:
+    """
+        Stands in for the driver in a generator process. Every load call
+        is turned into a message for the writer that owns the real driver.
+    """
+    def __init__(self, queue):
+        self.queue = queue
+    
+    def loadTuples(self, tableName, tuples):
+        self.queue.put((PIPELINE_CALL, ("loadTuples", (tableName, tuples))))
+    
+    def loadTupleStream(self, tableName, chunks):
+        self.queue.put((PIPELINE_STREAM, tableName))
+        for tuples in chunks:
+            self.queue.put((PIPELINE_CHUNK, tuples))
+        self.queue.put((PIPELINE_STREAM_END, tableName))
+    
+    def loadFinishDistrict(self, w_id, d_id):
+        self.queue.put((PIPELINE_CALL, ("loadFinishDistrict", (w_id, d_id))))
+## CLASS
+
+def pipelineGenerator(parent, unitQueue, tupleQueue):
+    """Entry point of a generator process: generate units until the queue hands us None"""
+    unit = None
+    try:
+        l = copy.copy(parent)
+        l.handle = PipelineHandle(tupleQueue)
+        l.journal = None
+        ## The batches are sized by the writer that times the real driver
+        l.batchSizer = None
+        l.stats = loadstats.LoadStats(role=loadstats.ROLE_GENERATOR)
+        
+        l.stats.startLoading()
+        for unit in iter(unitQueue.get, None):
+            tupleQueue.put((PIPELINE_BEGIN, unit))
+            l.writeUnit(unit)
+            tupleQueue.put((PIPELINE_END, unit))
+        ## FOR
+        l.stats.stopLoading()
+        tupleQueue.put((LOADER_EXIT, l.stats))
+    except KeyboardInterrupt:
+        pass
+    except (Exception, AssertionError), ex:
+        logging.warn("Failed to generate data: %s" % (ex))
+        tupleQueue.put((PIPELINE_ERROR, (unit, traceback.format_exc())))
+## DEF
+
+def pipelineWriter(parent, writerId, tupleQueues, doneQueue):
+    """
+        Body of a writer thread: apply the messages of the given generators
+        to a driver of our own, taking one unit from each queue in turn
+    """
+    unit = None
+    try:
+        handle = makeWorkerDriver(parent)
+        l = copy.copy(parent)
+        l.handle = handle
+        l.batchSizer = batchsizer.BatchSizer(handle, parent.batch_size)
+        l.stats = loadstats.LoadStats("%s/writer-%d" % (parent.stats.name, writerId), loadstats.ROLE_WRITER)
+        
+        l.stats.startLoading()
+        handle.loadStart()
+        active = list(tupleQueues)
+        while active:
+            for tupleQueue in list(active):
+                kind, payload = pipelineReceive(tupleQueue)
+                if kind == LOADER_EXIT:
+                    ## The generator is done and sent us its LoadStats
+                    l.stats.append(payload)
+                    active.remove(tupleQueue)
+                    continue
+                assert kind == PIPELINE_BEGIN, "Unexpected pipeline message %s" % kind
+                unit = payload
+                l.beginUnit(unit)
+                pipelineApply(l, tupleQueue)
+                l.endUnit(unit)
+                doneQueue.put((LOADER_UNIT_DONE, unit))
+            ## FOR
+        ## WHILE
+        handle.loadFinish()
+        l.stats.stopLoading()
+        doneQueue.put((LOADER_EXIT, l.stats))
+    except (Exception, AssertionError), ex:
+        logging.warn("Failed to load data: %s" % (ex))
+        doneQueue.put((traceback.format_exc(), unit))
+## DEF
+
+def pipelineReceive(tupleQueue):
+    kind, payload = tupleQueue.get()
+    if kind == PIPELINE_ERROR:
+        raise Exception("Generator process failed on work unit %s\n%s" % (unitName(payload[0]), payload[1]))
+    return (kind, payload)
+## DEF
+
+def pipelineApply(l, tupleQueue):
+    """Apply the messages of one unit to the writer's driver until its PIPELINE_END"""
+    def readStream():
+        while True:
+            kind, payload = pipelineReceive(tupleQueue)
+            if kind == PIPELINE_STREAM_END: return
+            assert kind == PIPELINE_CHUNK, "Unexpected pipeline message %s" % kind
+            yield payload
+        ## WHILE
+    ## DEF
+    
+    while True:
+        kind, payload = pipelineReceive(tupleQueue)
+        if kind == PIPELINE_END:
+            break
+        elif kind == PIPELINE_STREAM:
+            chunks = readStream()
+            l.writeTupleStream(payload, chunks)
+            ## Drain whatever the driver did not ask for so that we stay in sync
+            for tuples in chunks: pass
+        elif kind == PIPELINE_CALL:
+            methodName, args = payload
+            l.stats.measureCallback(getattr(l.handle, methodName), *args)
+        else:
+            assert False, "Unexpected pipeline message %s" % kind
+    ## WHILE
+## DEF
+
+## ==============================================
+## finishSplitItems
+## ==============================================
+def finishSplitItems(handle, args):
+    """
+        Fire loadFinishItem once all of the loaders that split the ITEM table
+        between them are done, unless the journal of the load that is being
+        resumed says that it was already fired
+    """
+    journal = None
+    if args.get('load_journal'):
+        journal = loadjournal.openJournal(args['load_journal'], args['load_id'], args.get('resume_load', False))
+        if journal.isFinished(constants.TABLENAME_ITEM): return
+    handle.loadFinishItem()
+    if journal != None: journal.finished(constants.TABLENAME_ITEM)
+## DEF
+
+## ==============================================
+## makeLoader
+## ==============================================
+def makeLoader(handle, scaleParameters, w_ids, needLoadItems, args, config, itemShare = (0, 1)):
+    """Create a Loader that uses the options in the command line arguments"""
+    journal = None
+    if args.get('load_journal'):
+        journal = loadjournal.openJournal(args['load_journal'], args['load_id'], args.get('resume_load', False))
+        journal.checkSeed(args.get('seed'))
+        if args.get('resume_load'):
+            assert handle.loadSupportsCleanup(), "%s cannot resume an interrupted load" % handle.driver_name
+    return Loader(handle, scaleParameters, w_ids, needLoadItems, \
+                  processes=args.get('loaderprocs', 1), \
+                  config=config, \
+                  cacheDir=args.get('data_cache'), \
+                  seed=args.get('seed'), \
+                  journal=journal, \
+                  generators=args.get('load_pipeline', 0), \
+                  writers=args.get('load_writers', 1), \
+                  itemShare=itemShare)
+## DEF
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import os
+import glob
+import logging
+
+## Journal entries
+SEED = "SEED"               # The master seed that the data was generated from
+UNIT_STARTED = "START"      # The loader began to load the unit
+UNIT_DONE = "DONE"          # All of the unit's tuples were loaded and checkpointed
+FINISHED = "FINISH"         # The loadFinishWarehouse/loadFinishItem callback was fired
+
+## ==============================================
+## openJournal
+## ==============================================
+def openJournal(directory, loadId, resume):
+    """
+        Return the LoadJournal for a new load with the given id, or the
+        journal of the most recent load in the directory if resume is true.
+    """
+    if not os.path.exists(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory): raise
+    if resume:
+        path = latestJournal(directory)
+        assert path != None, "There is no load journal to resume in '%s'" % directory
+        logging.info("Resuming the load recorded in '%s'" % path)
+    else:
+        path = os.path.join(directory, "load-%s.journal" % loadId)
+    return LoadJournal(path)
+## DEF
+
+def latestJournal(directory):
+    """Return the path of the journal of the most recent load in the directory, or None"""
+    journals = sorted(glob.glob(os.path.join(directory, "load-*.journal")), key=os.path.getmtime)
+    return (journals[-1] if journals else None)
+## DEF
+
+def resumeSeed(directory):
+    """Return the seed of the load that --resume-load would resume in the directory, or None"""
+    path = latestJournal(directory)
+    if path == None: return (None)
+    with open(path, "r") as f:
+        for line in f:
+            fields = line.split()
+            if len(fields) == 2 and fields[0] == SEED: return (long(fields[1]))
+    ## WITH
+    return (None)
+## DEF
+
+## ==============================================
+## LoadJournal
+## ==============================================
+class LoadJournal:
+    """
+        Append-only record of the loader's progress. Every loader process of
+        a load appends to the same file. Each entry is a single short line
+        written with one unbuffered write in append mode, so entries from
+        different processes do not get interleaved.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self.seed = None
+        self.entries = { UNIT_STARTED: set(), UNIT_DONE: set(), FINISHED: set() }
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                for line in f:
+                    fields = line.split()
+                    ## Skip a line that was cut short by a crash
+                    if len(fields) != 2: continue
+                    if fields[0] == SEED:
+                        self.seed = long(fields[1])
+                    elif fields[0] in self.entries:
+                        self.entries[fields[0]].add(fields[1])
+                ## FOR
+        ## IF
+        self.output = open(path, "a", 0)
+    ## DEF
+    
+    def checkSeed(self, seed):
+        """Record the seed of a new load, or make sure that it is the same as the one being resumed"""
+        if self.seed == None and seed != None:
+            self.seed = seed
+            self.output.write("%s %s\n" % (SEED, seed))
+        assert self.seed == seed, "The load in '%s' was generated with --seed %d" % (self.path, self.seed)
+    ## DEF
+    
+    def isDone(self, name):
+        return name in self.entries[UNIT_DONE]
+    
+    def isPartial(self, name):
+        """Return true if the unit was started but not done"""
+        return name in self.entries[UNIT_STARTED] and not name in self.entries[UNIT_DONE]
+    
+    def isFinished(self, name):
+        return name in self.entries[FINISHED]
+    
+    def started(self, name):
+        self.record(UNIT_STARTED, name)
+    
+    def done(self, name):
+        self.record(UNIT_DONE, name)
+        
+    def finished(self, name):
+        self.record(FINISHED, name)
+    
+    def record(self, entry, name):
+        self.entries[entry].add(name)
+        self.output.write("%s %s\n" % (entry, name))
+        os.fsync(self.output.fileno())
+    ## DEF
+## CLASS
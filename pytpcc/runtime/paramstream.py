@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import os
+import logging
+import hashlib
+import threading
+import traceback
+import multiprocessing
+import collections
+import Queue
+from datetime import datetime
+
+import executor
+from util import distribution
+from util.records import writeRecord, readRecord, readRecords
+
+## Bump this whenever the generated parameters or the file layout change so
+## that stale parameter files are not replayed
+FORMAT_VERSION = 2
+
+## The number of transactions that the helper generates at a time, and how
+## many of those batches it keeps ready for each stream
+PARAMETER_BATCH = 256
+PREFETCH_BATCHES = 2
+
+## The parameters that hold the time that the transaction was submitted. They
+## are set again when a pre-generated transaction is taken from the stream.
+DATE_PARAMS = [ "o_entry_d", "h_date", "ol_delivery_d" ]
+
+## The records of a parameter file: the batches in the order that they were
+## generated, and the state of the generator after the last one of them
+RECORD_BATCH = "BATCH"
+RECORD_STATE = "STATE"
+
+## ==============================================
+## ParameterStreams
+## ==============================================
+class ParameterStreams:
+    """
+        Pre-generates the transactions and their parameters of a set of
+        terminals in a helper process, so that the executors only have to
+        dequeue them. Every terminal has a stream of its own that produces
+        exactly the same sequence as its Executor would have (they are
+        derived from the same seed and have the same home), and the helper
+        keeps PREFETCH_BATCHES batches of each stream ready ahead of the
+        executor.
+    """
+    
+    def __init__(self, scaleParameters, seed, clientId, terminalIds, cacheDir = None, homes = None, mix = None, skew = None):
+        self.requests = multiprocessing.Queue()
+        self.batches = multiprocessing.Queue()
+        self.lock = threading.Lock()
+        self.streams = [ ParameterStream(self, i) for i in range(len(terminalIds)) ]
+        for i in range(len(terminalIds)):
+            for j in range(PREFETCH_BATCHES):
+                self.requests.put(i)
+        ## FOR
+        self.helper = multiprocessing.Process(target=parameterGenerator, \
+                                              args=(scaleParameters, seed, clientId, terminalIds, homes, mix, skew, cacheDir, self.requests, self.batches))
+        self.helper.start()
+    ## DEF
+    
+    def get(self, i):
+        return self.streams[i]
+    
+    def receive(self, i):
+        """Wait for a batch of the given stream, keeping the batches of the
+        other streams that arrive in the meantime"""
+        with self.lock:
+            while not self.streams[i].pending:
+                j, batch = self.receiveBatch()
+                if j == None: raise Exception("Parameter generator failed\n%s" % batch)
+                self.streams[j].pending.append(batch)
+            ## WHILE
+    ## DEF
+    
+    def receiveBatch(self):
+        while True:
+            try:
+                return self.batches.get(timeout=1)
+            except Queue.Empty:
+                if not self.helper.is_alive():
+                    raise Exception("Parameter generator died with exit code %s" % self.helper.exitcode)
+        ## WHILE
+    ## DEF
+    
+    def close(self):
+        """Stop the helper once it has saved the state of the parameter files"""
+        self.requests.put(None)
+        ## The batches that were never used have to be read for the helper to exit
+        while True:
+            j, batch = self.receiveBatch()
+            if j == None: break
+        self.helper.join()
+        if batch != None: raise Exception("Parameter generator failed\n%s" % batch)
+    ## DEF
+## CLASS
+
+## ==============================================
+## ParameterStream
+## ==============================================
+class ParameterStream:
+    """The transactions of a single terminal. It can be used in place of the Executor that generates them."""
+    
+    def __init__(self, streams, index):
+        self.streams = streams
+        self.index = index
+        self.pending = collections.deque()
+        self.batch = [ ]
+        self.position = 0
+    
+    def doOne(self):
+        if self.position == len(self.batch):
+            if not self.pending: self.streams.receive(self.index)
+            self.batch = self.pending.popleft()
+            self.position = 0
+            ## Ask for a batch to replace the one that was just taken
+            self.streams.requests.put(self.index)
+        txn, params = self.batch[self.position]
+        self.batch[self.position] = None
+        self.position += 1
+        
+        now = datetime.now()
+        for name in DATE_PARAMS:
+            if name in params: params[name] = now
+        return (txn, params)
+    ## DEF
+## CLASS
+
+## ==============================================
+## parameterGenerator
+## ==============================================
+def parameterGenerator(scaleParameters, seed, clientId, terminalIds, homes, mix, skew, cacheDir, requests, batches):
+    """The helper process: generate a batch of the requested stream until it gets None"""
+    try:
+        sources = [ ]
+        for i in range(len(terminalIds)):
+            home = homes[i] if homes != None else None
+            sources.append(ParameterSource(scaleParameters, seed, clientId, terminalIds[i], cacheDir, home, mix, skew))
+        ## FOR
+        for i in iter(requests.get, None):
+            batches.put((i, sources[i].nextBatch()))
+        for source in sources:
+            source.close()
+        batches.put((None, None))
+    except:
+        batches.put((None, traceback.format_exc()))
+## DEF
+
+## ==============================================
+## ParameterSource
+## ==============================================
+class ParameterSource:
+    """
+        Generates the batches of one stream in the helper process. With a
+        cache directory, the batches are also appended to a file that is keyed
+        by everything that they depend on, and the state of the generator is
+        saved after them when the stream is closed. A later run replays the
+        batches in the file and then goes on generating from the saved state,
+        so it gets the same sequence without generating it again. Batches
+        that were written after the last saved state (by a run that did not
+        finish) are dropped and generated again.
+    """
+    
+    def __init__(self, scaleParameters, seed, clientId, terminalId, cacheDir = None, home = None, mix = None, skew = None):
+        self.generator = executor.Executor(None, scaleParameters, seed=seed, clientId=clientId, terminalId=terminalId, home=home, mix=mix, skew=skew)
+        self.input = None
+        self.output = None
+        if cacheDir != None:
+            if seed == None:
+                logging.warn("Not caching the transaction parameters because there is no seed")
+            else:
+                self.open(parameterFilePath(cacheDir, scaleParameters, seed, clientId, terminalId, home, mix, skew))
+    ## DEF
+    
+    def open(self, path):
+        if not os.path.exists(os.path.dirname(path)):
+            try:
+                os.makedirs(os.path.dirname(path))
+            except OSError:
+                ## Another client created it first
+                if not os.path.isdir(os.path.dirname(path)): raise
+        
+        end = 0
+        state = None
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for record, offset in readRecords(f):
+                    if record[0] == RECORD_STATE:
+                        state = record[1]
+                        end = offset
+                ## FOR
+            ## WITH
+        if state != None:
+            logging.debug("Replaying transaction parameters from '%s'" % path)
+            self.input = open(path, "rb")
+            self.inputEnd = end
+            self.state = state
+        
+        self.output = open(path, "r+b" if os.path.exists(path) else "wb")
+        self.output.truncate(end)
+        self.output.seek(end)
+    ## DEF
+    
+    def nextBatch(self):
+        while self.input != None:
+            if self.input.tell() >= self.inputEnd:
+                ## Go on from where the run that wrote the file stopped
+                self.input.close()
+                self.input = None
+                ## The deck shares the generator's rand, so they are saved together
+                self.generator.rand, self.generator.deck = self.state
+                break
+            record = readRecord(self.input)
+            if record[0] == RECORD_BATCH: return (record[1])
+        ## WHILE
+        
+        batch = [ self.generator.doOne() for i in range(PARAMETER_BATCH) ]
+        if self.output != None: writeRecord(self.output, (RECORD_BATCH, batch))
+        return (batch)
+    ## DEF
+    
+    def close(self):
+        if self.input != None:
+            self.input.close()
+        elif self.output != None:
+            writeRecord(self.output, (RECORD_STATE, (self.generator.rand, self.generator.deck)))
+        if self.output != None: self.output.close()
+    ## DEF
+## CLASS
+
+def parameterFilePath(cacheDir, scaleParameters, seed, clientId, terminalId, home, mix, skew = None):
+    key = "%d-%d-%d-%d-%d-%d-%d-%s-%s-%s-%r-%r" % (FORMAT_VERSION, \
+                                             scaleParameters.starting_warehouse, \
+                                             scaleParameters.ending_warehouse, \
+                                             scaleParameters.items, \
+                                             scaleParameters.districtsPerWarehouse, \
+                                             scaleParameters.customersPerDistrict, \
+                                             scaleParameters.newOrdersPerDistrict, \
+                                             seed, clientId, terminalId, home, sorted(mix.items()) if mix != None else None)
+    ## The files of the specification skew keep the names that they had
+    ## before the skew could be changed
+    if skew != None and skew != distribution.DEFAULT_SKEW: key += "-%r" % sorted(skew.items())
+    return os.path.join(cacheDir, "params-%s.dat" % hashlib.md5(key).hexdigest())
+## DEF
+
+## ==============================================
+## makeParameterStreams
+## ==============================================
+def makeParameterStreams(scaleParameters, args, clientId, terminalIds, homes = None):
+    """Return the ParameterStreams of the given terminals (with the given
+    homes) if --param-stream or --param-cache was given, otherwise None"""
+    if not args.get('param_stream') and not args.get('param_cache'): return (None)
+    return ParameterStreams(scaleParameters, args.get('seed'), clientId, terminalIds, args.get('param_cache'), homes, args.get('mix'), args.get('skew'))
+## DEF
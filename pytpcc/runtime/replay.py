@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import os
+import csv
+import ast
+import glob
+import heapq
+import time
+import logging
+from datetime import datetime
+
+import constants
+import executor
+import paramstream
+from util import *
+
+## Replay the trace as fast as the driver goes instead of at its original pace
+SPEED_UNTHROTTLED = 0.0
+
+## The binary traces that the CsvDriver writes with txn_format = binary
+TRACE_FILE_PATTERN = "trace-*.dat"
+
+DATETIME_FORMATS = [ "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S" ]
+
+## ==============================================
+## Trace readers
+## ==============================================
+def readTrace(path):
+    """
+        Generator of the (timestamp, txn, params) of the transactions of a
+        trace, in the order that they were run. The path is either a
+        directory that the CsvDriver wrote its txns to (in either format), a
+        single binary trace file or a single CSV file of one transaction type.
+    """
+    if os.path.isdir(path):
+        traces = sorted(glob.glob(os.path.join(path, TRACE_FILE_PATTERN)))
+        if traces:
+            sources = map(readBinaryTrace, traces)
+        else:
+            sources = [ readCsvTrace(os.path.join(path, "%s.csv" % txn), txn) for txn in results.TXN_SLOTS \
+                        if os.path.exists(os.path.join(path, "%s.csv" % txn)) ]
+        if not sources: raise Exception("There is no trace in '%s'" % path)
+    elif path.lower().endswith(".csv"):
+        sources = [ readCsvTrace(path, os.path.splitext(os.path.basename(path))[0].upper()) ]
+    else:
+        sources = [ readBinaryTrace(path) ]
+    
+    ## Every file is in the order that its transactions were run
+    for record in heapq.merge(*sources):
+        yield record
+## DEF
+
+def readBinaryTrace(path):
+    with open(path, "rb") as f:
+        for record, offset in records.readRecords(f):
+            yield record
+    ## WITH
+## DEF
+
+def readCsvTrace(path, txn):
+    with open(path, "rb") as f:
+        reader = csv.reader(f)
+        names = reader.next()
+        for row in reader:
+            params = dict([ (names[i], parseValue(names[i], row[i])) for i in range(1, len(names)) ])
+            timestamp = parseValue(None, row[0])
+            yield (time.mktime(timestamp.timetuple()) + timestamp.microsecond / 1000000.0, txn, params)
+        ## FOR
+    ## WITH
+## DEF
+
+def parseValue(name, value):
+    """Convert a parameter that the CsvDriver wrote with str() back to its type"""
+    if value == "": return (None)
+    if name == None or name in paramstream.DATE_PARAMS:
+        for f in DATETIME_FORMATS:
+            try:
+                return (datetime.strptime(value, f))
+            except ValueError:
+                pass
+        ## FOR
+        raise Exception("Invalid timestamp '%s' in the trace" % value)
+    if value.startswith("["): return (ast.literal_eval(value))
+    for t in (int, float):
+        try:
+            return (t(value))
+        except ValueError:
+            pass
+    ## FOR
+    return (value)
+## DEF
+
+## ==============================================
+## ReplayExecutor
+## ==============================================
+class ReplayExecutor(executor.Executor):
+    """
+        Runs the transactions of a recorded trace with the driver instead of
+        generating them. The trace is split across the clients by warehouse,
+        so that the transactions of every warehouse are run in their original
+        order by a single client.
+        
+        With a speed, each transaction is started at its time in the trace
+        (counted from the first transaction of the whole trace), scaled down
+        by the speed, and its latency is measured from then on, like in the
+        open-loop mode. Without one, the transactions are run back to back.
+    """
+    
+    def __init__(self, driver, trace, speed = 1.0, clients = 1, clientId = 0, stop_on_error = False, retry = None):
+        executor.Executor.__init__(self, driver, None, stop_on_error=stop_on_error, clientId=clientId, retry=retry)
+        self.trace = trace
+        self.speed = speed
+        self.clients = clients
+    ## DEF
+    
+    def execute(self, duration, warmup):
+        r = results.Results()
+        assert r
+        logging.info("Replaying the trace for at most %d seconds (%s)" % \
+                     (warmup + duration, "as fast as possible" if self.speed == SPEED_UNTHROTTLED else "at %gx speed" % self.speed))
+        start = r.startBenchmark()
+        startClock = r.clockTime(start)
+        first = None
+        debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+        for timestamp, txn, params in self.trace:
+            if first == None: first = timestamp
+            if (params["w_id"] - 1) % self.clients != self.clientId: continue
+            
+            if self.speed != SPEED_UNTHROTTLED:
+                intended = startClock + int((timestamp - first) / self.speed * 1000000000)
+                delay = (intended - results.now()) / 1000000000.0
+                if delay > 0: time.sleep(delay)
+                txn_id = r.startTransaction(txn, intended)
+            else:
+                txn_id = r.startTransaction(txn)
+            ## IF
+            elapsed = time.time() - start
+            if elapsed >= warmup + duration: break
+            
+            ## The transactions are submitted now, not when they were recorded
+            now = datetime.now()
+            for name in paramstream.DATE_PARAMS:
+                if name in params: params[name] = now
+            
+            try:
+                succeeded = self.executeTransaction(r, txn, params, txn_id, elapsed >= warmup, debug)
+            except KeyboardInterrupt:
+                return -1
+            if succeeded: r.stopTransaction(txn_id, elapsed >= warmup)
+        ## FOR
+        
+        r.stopBenchmark()
+        return (r)
+    ## DEF
+## CLASS
+
+## ==============================================
+## makeReplayExecutor
+## ==============================================
+def makeReplayExecutor(driverClass, args, config, clientId = 0):
+    """Create the ReplayExecutor of the given client for --replay, along with its driver"""
+    driver = driverClass(args['ddl'])
+    assert driver != None
+    driver.loadConfig(config)
+    trace = readTrace(args['replay'])
+    e = ReplayExecutor(driver, trace, args['replay_speed'], args.get('total_clients', 1), clientId, args['stop_on_error'], \
+                       executor.makeRetryPolicy(driverClass, args, clientId))
+    return (e, driver)
+## DEF
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import json
+import logging
+
+import constants
+from util import *
+
+## The loads that the offered load can be adjusted by: the target rate (in
+## transactions per second, over all of the clients) or the number of
+## terminals of every client
+KNOB_RATE = "rate"
+KNOB_TERMINALS = "terminals"
+
+## The search stops once the load that meets the SLO and the one that does not
+## are within this fraction of each other, or after this many steps
+SEARCH_TOLERANCE = 0.05
+SEARCH_MAX_STEPS = 12
+
+## A step still meets the SLO if the p99 of at most this fraction of its
+## intervals was above the SLO (as long as the p99 of the whole step was not)
+SLO_VIOLATION_QUOTA = 0.1
+
+## With the rate knob, a step only meets the SLO if the clients kept up with
+## at least this fraction of the rate that they were supposed to start
+MIN_RATE_ACHIEVED = 0.95
+
+## ==============================================
+## SaturationSearch
+## ==============================================
+class SaturationSearch:
+    """
+        Finds the highest load that the system sustains within a latency SLO.
+        Every step runs the benchmark at one load with runStep(args), which
+        gets the command line arguments changed for that load and returns
+        the Results of the step. The load is doubled from the lowest one
+        until a step misses the SLO (or the highest load is reached), and
+        then the search bisects between the highest load that met the SLO
+        and the lowest one that missed it. A step meets the SLO if the p99
+        (and the p99.9, if there is an SLO for it) of all of its
+        transactions is within the SLO, most of its per-interval p99s are
+        too, and (with the rate knob) it kept up with the offered rate.
+    """
+    
+    def __init__(self, runStep, args, knob, low, high, sloP99, sloP999 = None, maxSteps = SEARCH_MAX_STEPS):
+        assert knob in [KNOB_RATE, KNOB_TERMINALS], "Unexpected search knob '%s'" % knob
+        assert low > 0, "Invalid lowest load %s" % low
+        assert high == None or high >= low, "Invalid highest load %s" % high
+        assert sloP99 > 0, "Invalid p99 SLO %s" % sloP99
+        self.runStep = runStep
+        self.args = args
+        self.knob = knob
+        self.low = int(low) if knob == KNOB_TERMINALS else float(low)
+        self.high = (int(high) if knob == KNOB_TERMINALS else float(high)) if high != None else None
+        self.sloP99 = sloP99
+        self.sloP999 = sloP999
+        self.maxSteps = maxSteps
+        self.curve = [ ]
+        self.best = None
+    ## DEF
+    
+    def run(self):
+        """Run the search, and return the step with the highest throughput
+        that met the SLO (or None if not even the lowest load did)"""
+        passed = None
+        failed = None
+        load = self.low
+        while len(self.curve) < self.maxSteps:
+            point = self.probe(load)
+            if point["passed"]:
+                passed = load
+            else:
+                failed = load
+            
+            if failed == None:
+                ## Still ramping up
+                if self.high != None and load >= self.high: break
+                load = load * 2
+                if self.high != None: load = min(load, self.high)
+            else:
+                if passed == None or self.converged(passed, failed): break
+                load = (passed + failed) / 2 if self.knob == KNOB_TERMINALS else (passed + failed) / 2.0
+        ## WHILE
+        
+        passing = [ x for x in self.curve if x["passed"] ]
+        if passing: self.best = max(passing, key=lambda x: x["throughput"])
+        return (self.best)
+    ## DEF
+    
+    def converged(self, passed, failed):
+        if self.knob == KNOB_TERMINALS: return (failed - passed <= 1)
+        return (failed - passed <= passed * SEARCH_TOLERANCE)
+    ## DEF
+    
+    def stepArgs(self, load):
+        """The command line arguments of a step at the given load"""
+        if self.knob == KNOB_TERMINALS:
+            return (dict(self.args, terminals=load))
+        return (dict(self.args, rate=load, client_rate=load / float(self.args['total_clients'])))
+    ## DEF
+    
+    def probe(self, load):
+        logging.info("Running saturation search step %d at %s=%s" % (len(self.curve) + 1, self.knob, load))
+        r = self.runStep(self.stepArgs(load))
+        assert r, "No results for the step at %s=%s" % (self.knob, load)
+        point = self.evaluate(load, r, self.args['duration'])
+        self.curve.append(point)
+        logging.info("%s=%s: %.1f txn/s, p99 %.1fms, p99.9 %.1fms, %s" % \
+                     (self.knob, load, point["throughput"], point["p99"], point["p999"], "met the SLO" if point["passed"] else "missed the SLO"))
+        return (point)
+    ## DEF
+    
+    def evaluate(self, load, r, duration):
+        """Summarize the Results of a step at the given load (the latencies
+        are in milliseconds), and check whether it met the SLO"""
+        total_hdr = results.makeHistogram()
+        total_cnt = 0
+        for txn_name in r.txn_counters.keys():
+            total_hdr.add(r.txn_times[txn_name])
+            total_cnt += r.txn_counters[txn_name]
+        ## FOR
+        
+        ## The intervals whose p99 missed the SLO
+        intervals = [ x for x in r.timeline() if x["txn"] == "TOTAL" and x["count"] > 0 ]
+        late = [ x for x in intervals if x["p99"] / 1000.0 > self.sloP99 ]
+        
+        ## The offered rate counts a DELIVERY once, not once per district
+        delivery = r.txn_counters[constants.TransactionTypes.DELIVERY]
+        cards = total_cnt - delivery + delivery / float(constants.DISTRICTS_PER_WAREHOUSE)
+        
+        point = {
+            "load": load,
+            "throughput": total_cnt / float(duration),
+            "tpmC": r.tpmC(duration),
+            "p50": total_hdr.get_value_at_percentile(50) / 1000.0,
+            "p99": total_hdr.get_value_at_percentile(99) / 1000.0,
+            "p999": total_hdr.get_value_at_percentile(99.9) / 1000.0,
+            "worst_interval_p99": max([ x["p99"] for x in intervals ]) / 1000.0 if intervals else None,
+            "late_intervals": len(late),
+            "intervals": len(intervals),
+        }
+        passed = total_cnt > 0 and point["p99"] <= self.sloP99
+        if self.sloP999 != None: passed = passed and point["p999"] <= self.sloP999
+        passed = passed and len(late) <= len(intervals) * SLO_VIOLATION_QUOTA
+        if self.knob == KNOB_RATE:
+            point["achieved"] = cards / float(duration) / load
+            passed = passed and point["achieved"] >= MIN_RATE_ACHIEVED
+        point["passed"] = passed
+        return (point)
+    ## DEF
+    
+    def show(self):
+        col_width = 14
+        f = "\n  " + (("%-" + str(col_width) + "s")*7)
+        total_width = (col_width*7)+2
+        line = "-"*total_width
+        
+        ret = "="*total_width + "\n"
+        slo = "p99 <= %sms" % self.sloP99
+        if self.sloP999 != None: slo += ", p99.9 <= %sms" % self.sloP999
+        ret += "Saturation Search (%s)\n%s" % (slo, line)
+        ret += f % (self.knob.title(), "Txn/s", "tpmC", "p50 (ms)", "p99 (ms)", "p99.9 (ms)", "SLO")
+        for point in sorted(self.curve, key=lambda x: x["load"]):
+            ret += f % (str(point["load"]), "%.1f" % point["throughput"], "%.1f" % point["tpmC"], "%.1f" % point["p50"], \
+                        "%.1f" % point["p99"], "%.1f" % point["p999"], "met" if point["passed"] else "missed")
+        ## FOR
+        ret += "\n" + line
+        if self.best != None:
+            ret += "\n\nHighest throughput within the SLO: %.1f txn/s (%.1f tpmC) at %s=%s" % \
+                   (self.best["throughput"], self.best["tpmC"], self.knob, self.best["load"])
+        else:
+            ret += "\n\nNo load met the SLO"
+        return (ret)
+    ## DEF
+    
+    def save(self, path):
+        """Write the best point and the whole curve to the given file as JSON"""
+        with open(path, "w") as fd:
+            json.dump({ "knob": self.knob, "slo": { "p99": self.sloP99, "p999": self.sloP999 },
+                        "best": self.best, "curve": self.curve }, fd, indent=2, sort_keys=True)
+    ## DEF
+## CLASS
+
+## ==============================================
+## makeSaturationSearch
+## ==============================================
+def makeSaturationSearch(args, runStep):
+    """Create the SaturationSearch for the --search-* options in the command line arguments"""
+    knob = args['search_knob']
+    low = args['search_min']
+    if low == None: low = 1 if knob == KNOB_TERMINALS else (args['rate'] or 10.0)
+    return (SaturationSearch(runStep, args, knob, low, args['search_max'], args['slo_p99'], args['slo_p999'], args['search_steps']))
+## DEF
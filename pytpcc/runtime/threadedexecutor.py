@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import logging
+import threading
+import traceback
+
+import executor
+import paramstream
+from util import *
+
+## ==============================================
+## ThreadedExecutor
+## ==============================================
+class ThreadedExecutor:
+    """
+        Runs several blocking terminals in one process, each in its own thread
+        with its own driver (and thus connection). This helps with drivers
+        that release the GIL while they wait for the database. Every thread
+        records into its own Results, which are merged once all of them are
+        done, so the threads never contend on the statistics. The terminals
+        take their transactions from the given ParameterStreams if there are
+        any, which are closed when the execution is over, and are bound to the
+        given homes if there are any. Each of them retries its failed
+        transactions with the RetryPolicy of its own in retries, if given.
+        They all defer their DELIVERY transactions to the same DeliveryQueue
+        if there is one.
+    """
+    
+    def __init__(self, makeDriver, scaleParameters, threads, stop_on_error = False, seed = None, clientId = 0, streams = None, homes = None, mix = None, skew = None, retries = None, deliveries = None):
+        self.makeDriver = makeDriver
+        self.streams = streams
+        self.executors = [ ]
+        for i in range(threads):
+            stream = streams.get(i) if streams != None else None
+            e = executor.Executor(None, scaleParameters, stop_on_error=stop_on_error, seed=seed, clientId=clientId, terminalId=i, stream=stream, home=homes[i] if homes != None else None, mix=mix, skew=skew, \
+                                  retry=retries[i] if retries != None else None, deliveries=deliveries)
+            self.executors.append(e)
+        ## FOR
+        self.results = [ None ] * threads
+        self.errors = [ ]
+    ## DEF
+    
+    def execute(self, duration, warmup):
+        threads = [ ]
+        for i in range(len(self.executors)):
+            t = threading.Thread(target=self.run, args=(i, duration, warmup))
+            t.daemon = True
+            t.start()
+            threads.append(t)
+        ## FOR
+        logging.info("Running %d terminal threads" % len(threads))
+        for t in threads:
+            t.join()
+        if self.streams != None: self.streams.close()
+        if self.errors: raise Exception("Terminal thread failed\n%s" % self.errors[0])
+        
+        r = results.Results()
+        for thread_results in self.results:
+            r.merge(thread_results)
+        return (r)
+    ## DEF
+    
+    def run(self, i, duration, warmup):
+        try:
+            driver = self.makeDriver()
+            e = self.executors[i]
+            e.driver = driver
+            driver.executeStart()
+            self.results[i] = e.execute(duration, warmup)
+            driver.executeFinish()
+        except (Exception, AssertionError), ex:
+            logging.warn("Terminal thread %d failed: %s" % (i, ex))
+            self.errors.append(traceback.format_exc())
+    ## DEF
+## CLASS
+
+## ==============================================
+## makeThreadedExecutor
+## ==============================================
+def makeThreadedExecutor(driverClass, scaleParameters, args, config, clientId = 0, deliveries = None):
+    """Create a ThreadedExecutor with --threads terminals for the options in the command line arguments"""
+    def makeDriver():
+        driver = driverClass(args['ddl'])
+        driver.loadConfig(config)
+        return (driver)
+    ## DEF
+    homes = executor.makeTerminalHomes(scaleParameters, args, args['threads'])
+    streams = paramstream.makeParameterStreams(scaleParameters, args, clientId, range(args['threads']), homes)
+    return ThreadedExecutor(makeDriver, scaleParameters, args['threads'], stop_on_error=args['stop_on_error'], seed=args.get('seed'), clientId=clientId, streams=streams, homes=homes, mix=args.get('mix'), skew=args.get('skew'), \
+                            retries=[ executor.makeRetryPolicy(driverClass, args, clientId, i) for i in range(args['threads']) ], deliveries=deliveries)
+## DEF
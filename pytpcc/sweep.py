@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import sys
+import os
+import logging
+import argparse
+import json
+import subprocess
+import time
+from ConfigParser import SafeConfigParser
+
+from util import results
+from util.results import makeHistogram
+
+logging.basicConfig(level = logging.INFO,
+                    format="%(asctime)s [%(funcName)s:%(lineno)03d] %(levelname)-5s: %(message)s",
+                    datefmt="%m-%d-%Y %H:%M:%S",
+                    stream = sys.stdout)
+
+## The matrix is a JSON object like this one, where every variant overrides
+## some options of the [system] section of the base driver configuration:
+##
+##   { "system": "mongodb", "runner": "coordinator", "config": "mongodb.config",
+##     "scalefactor": 1, "warehouses": [ 10, 50 ], "clients": [ 1, 4, 16 ],
+##     "variants": { "base": { }, "router2": { "host": "mongos2" } },
+##     "duration": 60, "warmup": 10, "args": [ "--seed", "42" ],
+##     "load_args": [ "--loaderprocs", "8" ] }
+
+## The flag that sets the number of client processes of each runner
+CLIENT_FLAGS = {
+    "tpcc": "--clients",
+    "coordinator": "--clientprocs",
+}
+
+## The name of the variant that runs with the base driver configuration
+BASE_VARIANT = "base"
+
+SUMMARY_COLUMNS = [ "point", "warehouses", "clients", "variant", "txn/s", "tpmC", "vs-base", "p50", "p99", "p99.9", "aborts" ]
+
+## ==============================================
+## Sweep
+## ==============================================
+class Sweep:
+    """Runs the benchmark for every point of a matrix of warehouses, client
+    processes and driver configuration variants. The data is loaded once for
+    each number of warehouses, and then every point for it runs on that data
+    with --no-load. The results of each point go in the store directory, and
+    the points that already have results there are not run again, so that an
+    interrupted sweep can be resumed.
+    
+    The variants only override options of the driver configuration, and must
+    not change where the data is (all of them run on the data that was loaded
+    with the base configuration)."""
+    
+    def __init__(self, matrix, store, dryRun = False, noLoad = False):
+        self.system = matrix["system"]
+        self.runner = matrix.get("runner", "tpcc")
+        assert self.runner in CLIENT_FLAGS, "Unknown runner '%s'" % self.runner
+        self.config = matrix.get("config")
+        self.scalefactor = matrix.get("scalefactor", 1)
+        self.warehouses = matrix["warehouses"]
+        self.clients = matrix.get("clients", [ 1 ])
+        self.variants = matrix.get("variants", { BASE_VARIANT: { } })
+        self.duration = matrix.get("duration", 60)
+        self.warmup = matrix.get("warmup", 10)
+        self.args = matrix.get("args", [ ])
+        self.loadArgs = matrix.get("load_args", [ ])
+        self.store = store
+        self.dryRun = dryRun
+        self.noLoad = noLoad
+        
+        ## The base configuration comes first, as the one that the others are compared to
+        self.variantNames = sorted(self.variants.keys(), key=lambda v: (v != BASE_VARIANT, v))
+        self.configs = { }
+        self.rows = [ ]
+    ## DEF
+    
+    def pointName(self, w, c, variant):
+        return "w%d-c%d-%s" % (w, c, variant)
+    ## DEF
+    
+    def makeConfigs(self):
+        """Write the driver configuration file of every variant to the store"""
+        for variant in self.variantNames:
+            cparser = SafeConfigParser()
+            if self.config: cparser.read(os.path.realpath(self.config))
+            if not cparser.has_section(self.system): cparser.add_section(self.system)
+            for key, value in self.variants[variant].items():
+                cparser.set(self.system, str(key), str(value))
+            path = os.path.join(self.store, "config-%s.cfg" % variant)
+            with open(path, "w") as fd:
+                cparser.write(fd)
+            self.configs[variant] = path
+        ## FOR
+    ## DEF
+    
+    def command(self, w, variant, extra):
+        script = os.path.join(os.path.dirname(os.path.realpath(__file__)), "%s.py" % self.runner)
+        cmd = [ sys.executable, script, self.system, "--config", self.configs[variant],
+                "--warehouses", str(w), "--scalefactor", str(self.scalefactor) ]
+        return (cmd + extra)
+    ## DEF
+    
+    def runCommand(self, cmd, logPath):
+        """Run the runner with its output going to the given log file, and
+        return whether it succeeded"""
+        logging.info(" ".join(cmd))
+        if self.dryRun: return (True)
+        with open(logPath, "w") as fd:
+            ret = subprocess.call(cmd, stdout=fd, stderr=subprocess.STDOUT)
+        if ret != 0:
+            logging.warn("Failed with exit code %d (see %s)" % (ret, logPath))
+        return (ret == 0)
+    ## DEF
+    
+    def load(self, w):
+        """Load the data for the given number of warehouses"""
+        logging.info("Loading %d warehouses" % w)
+        cmd = self.command(w, self.variantNames[0], [ "--reset", "--no-execute", CLIENT_FLAGS[self.runner], str(max(self.clients)) ] + self.loadArgs)
+        return (self.runCommand(cmd, os.path.join(self.store, "load-w%d.log" % w)))
+    ## DEF
+    
+    def runPoint(self, w, c, variant):
+        """Run the benchmark at the given point, unless the store already has its results"""
+        name = self.pointName(w, c, variant)
+        path = os.path.join(self.store, "%s.json" % name)
+        if os.path.exists(path):
+            logging.info("Skipping %s, which already has results" % name)
+            return (True)
+        logging.info("Running %s" % name)
+        ## The results are written to a temporary file first, so that a point
+        ## that was interrupted is run again
+        cmd = self.command(w, variant, [ "--no-load", CLIENT_FLAGS[self.runner], str(c),
+                                         "--duration", str(self.duration), "--warmup", str(self.warmup),
+                                         "--results", path + ".tmp" ] + self.args)
+        ok = self.runCommand(cmd, os.path.join(self.store, "%s.log" % name))
+        if ok and not self.dryRun: os.rename(path + ".tmp", path)
+        return (ok)
+    ## DEF
+    
+    def run(self):
+        if not os.path.exists(self.store): os.makedirs(self.store)
+        self.makeConfigs()
+        start = time.time()
+        for w in self.warehouses:
+            points = [ (c, variant) for c in self.clients for variant in self.variantNames ]
+            todo = filter(lambda p: not os.path.exists(os.path.join(self.store, "%s.json" % self.pointName(w, p[0], p[1]))), points)
+            ## The data only has to be loaded if there is a point left to run on it
+            if todo and not self.noLoad:
+                if not self.load(w):
+                    logging.warn("Skipping the points with %d warehouses" % w)
+                    continue
+            ## IF
+            for c, variant in points:
+                self.runPoint(w, c, variant)
+        ## FOR
+        logging.info("Sweep finished in %d seconds" % (time.time() - start))
+        self.summarize()
+    ## DEF
+    
+    def summarize(self):
+        """Make the comparison table of every point that has results in the store"""
+        self.rows = [ ]
+        for w in self.warehouses:
+            for c in self.clients:
+                base = None
+                for variant in self.variantNames:
+                    name = self.pointName(w, c, variant)
+                    path = os.path.join(self.store, "%s.json" % name)
+                    if not os.path.exists(path): continue
+                    r, duration = results.load(path)
+                    hdr = makeHistogram()
+                    for txn_name in r.txn_times.keys():
+                        hdr.add(r.txn_times[txn_name])
+                    total = sum(r.txn_counters.values())
+                    tpmC = r.tpmC(duration)
+                    if base == None: base = tpmC
+                    self.rows.append({
+                        "point": name,
+                        "warehouses": w,
+                        "clients": c,
+                        "variant": variant,
+                        "txn/s": total / float(duration),
+                        "tpmC": tpmC,
+                        "vs-base": tpmC / base if base > 0 else None,
+                        "p50": hdr.get_value_at_percentile(50) if total > 0 else None,
+                        "p99": hdr.get_value_at_percentile(99) if total > 0 else None,
+                        "p99.9": hdr.get_value_at_percentile(99.9) if total > 0 else None,
+                        "aborts": sum([ sum(aborts.values()) for aborts in r.txn_aborts.values() ]),
+                    })
+                ## FOR
+            ## FOR
+        ## FOR
+        return (self.rows)
+    ## DEF
+    
+    def save(self, path):
+        """Write the comparison table to the given file as CSV"""
+        with open(path, "w") as fd:
+            fd.write(",".join(SUMMARY_COLUMNS) + "\n")
+            for row in self.rows:
+                fd.write(",".join(map(lambda c: "" if row[c] == None else str(row[c]), SUMMARY_COLUMNS)) + "\n")
+        ## WITH
+    ## DEF
+    
+    def show(self):
+        col_width = 12
+        f = "\n  %-24s" + (("%" + str(col_width) + "s")*(len(SUMMARY_COLUMNS)-1))
+        total_width = 26 + col_width*(len(SUMMARY_COLUMNS)-1)
+        line = "-"*total_width
+        
+        ret = "="*total_width + "\n"
+        ret += "Sweep Results (latencies in µs)\n%s" % line
+        ret += f % tuple(SUMMARY_COLUMNS)
+        for row in self.rows:
+            values = [ ]
+            for c in SUMMARY_COLUMNS:
+                v = row[c]
+                if v == None: v = "-"
+                elif c in ("txn/s", "tpmC"): v = "%.02f" % v
+                elif c == "vs-base": v = "%.02fx" % v
+                values.append(str(v))
+            ret += f % tuple(values)
+        ## FOR
+        return (ret)
+    ## DEF
+## CLASS
+
+## ==============================================
+## main
+## ==============================================
+if __name__ == '__main__':
+    aparser = argparse.ArgumentParser(description='Run the TPC-C benchmark over a matrix of warehouses, clients and driver configurations')
+    aparser.add_argument('matrix', type=file,
+                         help='Path to the JSON file with the matrix to sweep')
+    aparser.add_argument('--store', default='sweep', metavar='DIR',
+                         help='Directory to keep the driver configurations, logs and results of every point in')
+    aparser.add_argument('--no-load', action='store_true',
+                         help='Do not load the data, which is already there for every number of warehouses of the matrix')
+    aparser.add_argument('--summary', action='store_true',
+                         help='Only show the comparison table of the results that are already in the store')
+    aparser.add_argument('--dry-run', action='store_true',
+                         help='Print the commands of the sweep without running them')
+    aparser.add_argument('--debug', action='store_true',
+                         help='Enable debug log messages')
+    args = vars(aparser.parse_args())
+    
+    if args['debug']: logging.getLogger().setLevel(logging.DEBUG)
+    matrix = json.load(args['matrix'])
+    sweep = Sweep(matrix, args['store'], args['dry_run'], args['no_load'])
+    if args['summary']:
+        sweep.summarize()
+    else:
+        sweep.run()
+    print sweep.show()
+    if not args['dry_run']: sweep.save(os.path.join(args['store'], "summary.csv"))
+    
+## MAIN
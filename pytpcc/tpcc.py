@@ -34,13 +34,17 @@ import re
 import argparse
 import glob
 import time 
+import traceback
 import multiprocessing
+import Queue
+import cPickle
 from ConfigParser import SafeConfigParser
 from pprint import pprint,pformat
 
 from util import *
 from runtime import *
 import drivers
+import constants
 
 logging.basicConfig(level = logging.INFO,
                     format="%(asctime)s [%(funcName)s:%(lineno)03d] %(levelname)-5s: %(message)s",
@@ -67,12 +71,93 @@ def getDrivers():
     return (drivers)
 ## DEF
 
+## ==============================================
+## ClientPool
+## ==============================================
+class ClientPool:
+    """
+        Runs each client in a process of its own, with the same interface as
+        the parts of multiprocessing.Pool that are used here. The workers of
+        a multiprocessing.Pool are daemonic and so cannot start any processes
+        of their own, which the clients need for --loaderprocs and
+        --load-pipeline.
+    """
+    
+    def __init__(self):
+        self.results = multiprocessing.Queue()
+        self.processes = [ ]
+        self.pending = [ ]
+    
+    def apply_async(self, func, args):
+        r = ClientResult()
+        p = multiprocessing.Process(target=runClient, args=(self.results, len(self.pending), func, args))
+        p.start()
+        self.processes.append(p)
+        self.pending.append(r)
+        return (r)
+    
+    def close(self):
+        pass
+    
+    def join(self):
+        """Wait for the result of every client. The results have to be read
+        before the processes are joined, or a large one would block them."""
+        remaining = len([ r for r in self.pending if not r.ready ])
+        while remaining > 0:
+            try:
+                i, data, error = self.results.get(timeout=1)
+            except Queue.Empty:
+                ## A process that exited has sent everything that it was
+                ## going to by the time that the next get() times out
+                for i in range(len(self.processes)):
+                    if self.pending[i].ready: continue
+                    if self.processes[i].exitcode != None:
+                        if self.pending[i].exited:
+                            raise Exception("Client process %d exited with exit code %d without a result" % (i, self.processes[i].exitcode))
+                        self.pending[i].exited = True
+                ## FOR
+                continue
+            self.pending[i].ready = True
+            if data != None: self.pending[i].value = cPickle.loads(data)
+            self.pending[i].error = error
+            remaining -= 1
+        ## WHILE
+        for p in self.processes:
+            p.join()
+    ## DEF
+## CLASS
+
+class ClientResult:
+    def __init__(self):
+        self.ready = False
+        self.exited = False
+        self.value = None
+        self.error = None
+    
+    def wait(self):
+        assert self.ready, "The ClientPool was not joined"
+    
+    def get(self):
+        self.wait()
+        if self.error != None: raise Exception("Client failed\n%s" % self.error)
+        return (self.value)
+## CLASS
+
+def runClient(results, i, func, args):
+    ## The result is pickled here so that a result that cannot be pickled is
+    ## reported as an error instead of being dropped by the queue
+    try:
+        results.put((i, cPickle.dumps(func(*args), -1), None))
+    except:
+        results.put((i, None, traceback.format_exc()))
+## DEF
+
 ## ==============================================
 ## startLoading
 ## ==============================================
 def startLoading(driverClass, scaleParameters, args, config):
     logging.debug("Creating client pool with %d processes" % args['clients'])
-    pool = multiprocessing.Pool(args['clients'])
+    pool = ClientPool()
     debug = logging.getLogger().isEnabledFor(logging.DEBUG)
     
     # Split the warehouses into chunks
@@ -84,19 +169,28 @@ def startLoading(driverClass, scaleParameters, args, config):
     
     loader_results = [ ]
     for i in range(args['clients']):
-        r = pool.apply_async(loaderFunc, (driverClass, scaleParameters, args, config, w_ids[i], True))
+        r = pool.apply_async(loaderFunc, (driverClass, scaleParameters, args, config, w_ids[i], True, (i, args['clients'])))
         loader_results.append(r)
     ## FOR
     
     pool.close()
     logging.debug("Waiting for %d loaders to finish" % args['clients'])
     pool.join()
+    
+    load_stats = None
+    for r in loader_results:
+        if load_stats == None:
+            load_stats = r.get()
+        else:
+            load_stats.append(r.get())
+    ## FOR
+    return (load_stats)
 ## DEF
 
 ## ==============================================
 ## loaderFunc
 ## ==============================================
-def loaderFunc(driverClass, scaleParameters, args, config, w_ids, debug):
+def loaderFunc(driverClass, scaleParameters, args, config, w_ids, debug, itemShare = (0, 1)):
     driver = driverClass(args['ddl'])
     assert driver != None
     logging.debug("Starting client execution: %s [warehouses=%d]" % (driver, len(w_ids)))
@@ -107,11 +201,12 @@ def loaderFunc(driverClass, scaleParameters, args, config, w_ids, debug):
     driver.loadConfig(config)
    
     try:
-        loadItems = (1 in w_ids)
-        l = loader.Loader(driver, scaleParameters, w_ids, loadItems)
+        ## Every client loads its share of the ITEM table
+        l = loader.makeLoader(driver, scaleParameters, w_ids, True, args, config, itemShare)
         driver.loadStart()
-        l.execute()
+        load_stats = l.execute()
         driver.loadFinish()   
+        return (load_stats)
     except KeyboardInterrupt:
             return -1
     except (Exception, AssertionError), ex:
@@ -127,12 +222,16 @@ def loaderFunc(driverClass, scaleParameters, args, config, w_ids, debug):
 ## ==============================================
 def startExecution(driverClass, scaleParameters, args, config):
     logging.debug("Creating client pool with %d processes" % args['clients'])
-    pool = multiprocessing.Pool(args['clients'])
+    pool = ClientPool()
     debug = logging.getLogger().isEnabledFor(logging.DEBUG)
     
+    ## Every client gets its own share of the home warehouses
+    homes = executor.assignClientWarehouses(scaleParameters, args['clients'])
+    
     worker_results = [ ]
     for i in range(args['clients']):
-        r = pool.apply_async(executorFunc, (driverClass, scaleParameters, args, config, debug,))
+        clientArgs = dict(args, client_warehouses=homes[i])
+        r = pool.apply_async(clientExecutorFunc, (driverClass, scaleParameters, clientArgs, config, debug, i))
         worker_results.append(r)
     ## FOR
     pool.close()
@@ -153,23 +252,57 @@ def startExecution(driverClass, scaleParameters, args, config):
 ## ==============================================
 ## executorFunc
 ## ==============================================
-def executorFunc(driverClass, scaleParameters, args, config, debug):
-    driver = driverClass(args['ddl'])
-    assert driver != None
-    logging.debug("Starting client execution: %s" % driver)
-    
+def executorFunc(driverClass, scaleParameters, args, config, debug, clientId = 0):
     config['execute'] = True
     config['reset'] = False
-    driver.loadConfig(config)
-
-    e = executor.Executor(driver, scaleParameters, stop_on_error=args['stop_on_error'])
-    driver.executeStart()
-    results = e.execute(args['duration'])
-    driver.executeFinish()
+    
+    ## The DELIVERY transactions of all of the terminals of this client are
+    ## deferred to the same queue
+    deliveries = deliveryqueue.makeDeliveryQueue(driverClass, args, config, clientId)
+    
+    streams = None
+    driver = None
+    if args.get('replay'):
+        e, driver = replay.makeReplayExecutor(driverClass, args, config, clientId)
+        logging.debug("Starting client execution: %s [replay=%s]" % (driver, args['replay']))
+    elif args['threads'] > 1:
+        ## The threads each create and start their own driver
+        e = threadedexecutor.makeThreadedExecutor(driverClass, scaleParameters, args, config, clientId, deliveries)
+    elif args['terminals'] > 1 or args.get('client_rate') or args['emulate_terminals']:
+        e, driver = asyncexecutor.makeAsyncExecutor(driverClass, scaleParameters, args, config, clientId, deliveries)
+        logging.debug("Starting client execution: %s [terminals=%d]" % (driver, args['terminals']))
+    else:
+        driver = driverClass(args['ddl'])
+        assert driver != None
+        logging.debug("Starting client execution: %s" % driver)
+        driver.loadConfig(config)
+        homes = executor.makeTerminalHomes(scaleParameters, args, 1)
+        streams = paramstream.makeParameterStreams(scaleParameters, args, clientId, [ None ], homes)
+        e = executor.Executor(driver, scaleParameters, stop_on_error=args['stop_on_error'], seed=args.get('seed'), clientId=clientId, \
+                              stream=streams.get(0) if streams != None else None, home=homes[0] if homes != None else None, mix=args.get('mix'), \
+                              skew=args.get('skew'), retry=executor.makeRetryPolicy(driverClass, args, clientId), deliveries=deliveries)
+    
+    if driver != None: driver.executeStart()
+    if deliveries != None: deliveries.start()
+    try:
+        results = e.execute(args['duration'], args['warmup'])
+    finally:
+        if streams != None: streams.close()
+    if driver != None: driver.executeFinish()
+    
+    ## The queued DELIVERY transactions are run to the end
+    if deliveries != None and results != -1: results.merge(deliveries.finish())
     
     return results
 ## DEF
 
+def clientExecutorFunc(driverClass, scaleParameters, args, config, debug, clientId):
+    """Run executorFunc in a client process and encode its results for startExecution"""
+    r = executorFunc(driverClass, scaleParameters, args, config, debug, clientId)
+    if isinstance(r, results.Results): r.encode()
+    return (r)
+## DEF
+
 ## ==============================================
 ## main
 ## ==============================================
@@ -187,10 +320,84 @@ if __name__ == '__main__':
                          help='Number of Warehouses')
     aparser.add_argument('--duration', default=60, type=int, metavar='D',
                          help='How long to run the benchmark in seconds')
+    aparser.add_argument('--warmup', default=0, type=int,
+                         help='How long to warmup/cooldown the benchmark in seconds')
     aparser.add_argument('--ddl', default=os.path.realpath(os.path.join(os.path.dirname(__file__), "tpcc.sql")),
                          help='Path to the TPC-C DDL SQL file')
     aparser.add_argument('--clients', default=1, type=int, metavar='N',
                          help='The number of blocking clients to fork')
+    aparser.add_argument('--rate', type=float, metavar='TPS',
+                         help='Start transactions at this total rate over all of the clients, no matter how long they take (open-loop)')
+    aparser.add_argument('--arrivals', default='poisson', choices=['poisson', 'constant'],
+                         help='The distribution of the time between the transactions started with --rate')
+    aparser.add_argument('--threads', default=1, type=int, metavar='K',
+                         help='The number of blocking terminals that each client runs in threads, each with its own driver')
+    aparser.add_argument('--terminals', default=1, type=int, metavar='T',
+                         help='The number of terminals that each client runs concurrently')
+    aparser.add_argument('--mix', metavar='MIX',
+                         help='The transaction mix: one of %s (default: %s), or the number of cards of each transaction type in the deck, e.g. NEW_ORDER=1,PAYMENT=1' % \
+                              (", ".join(sorted(constants.MIX_PROFILES.keys())), constants.DEFAULT_MIX))
+    aparser.add_argument('--skew', metavar='SKEW',
+                         help='The distributions of the transaction parameters (%s) as PARAM=DIST[:ARG...] with DIST in %s, e.g. warehouse=zipfian:0.99,item=hotspot:0.2:0.8, and the remote percentages, e.g. remote-item=5,remote-payment=30' % \
+                              (", ".join(distribution.PARAMETERS), ", ".join(distribution.DISTRIBUTIONS)))
+    aparser.add_argument('--home-warehouses', action='store_true',
+                         help='Bind every terminal to home warehouses of its own instead of picking any warehouse for each transaction')
+    aparser.add_argument('--emulate-terminals', action='store_true',
+                         help='Emulate the terminals of the spec: ten per warehouse, each with keying and think times')
+    aparser.add_argument('--terminal-time-scale', default=1.0, type=float, metavar='F',
+                         help='Scale the keying and think times of --emulate-terminals by this factor')
+    aparser.add_argument('--driver-threads', type=int, metavar='N',
+                         help='The number of threads that run the transactions of the terminals of drivers that are not asynchronous (default: one per terminal)')
+    aparser.add_argument('--loaderprocs', default=1, type=int, metavar='P',
+                         help='The number of processes each client uses to load its warehouses')
+    aparser.add_argument('--load-pipeline', default=0, type=int, metavar='G',
+                         help='Generate the data in G processes that feed separate driver writer threads')
+    aparser.add_argument('--load-writers', default=1, type=int, metavar='W',
+                         help='The number of driver writer threads used with --load-pipeline')
+    aparser.add_argument('--data-cache', metavar='DIR',
+                         help='Cache the generated data in this directory and replay it on later loads with the same --seed')
+    aparser.add_argument('--load-journal', metavar='DIR',
+                         help='Record the progress of the load in a journal in this directory')
+    aparser.add_argument('--resume-load', action='store_true',
+                         help='Resume the most recent load in the --load-journal directory, skipping the data that it already loaded')
+    aparser.add_argument('--load-stats', metavar='FILE',
+                         help='Write the per worker and per table load statistics to this file as JSON')
+    aparser.add_argument('--timeline', metavar='FILE',
+                         help='Write the throughput and latency of every second of the run to this file (as CSV if it ends with .csv, otherwise as JSON)')
+    aparser.add_argument('--results', metavar='FILE',
+                         help='Write the counts, latency histograms and timeline of the run to this file as JSON')
+    aparser.add_argument('--replay', metavar='PATH',
+                         help='Run the transactions of a trace that the csv driver recorded (its txn_directory, or one of its files) instead of generating them, split across the clients by warehouse')
+    aparser.add_argument('--replay-speed', default=1.0, type=float, metavar='F',
+                         help='Replay the trace at this multiple of its original pace, or as fast as possible with 0')
+    aparser.add_argument('--param-stream', action='store_true',
+                         help='Generate the transaction parameters ahead of time in a helper process')
+    aparser.add_argument('--param-cache', metavar='DIR',
+                         help='Pre-generate the transaction parameters in this directory and reuse them in later runs with the same --seed')
+    aparser.add_argument('--slo-p99', type=float, metavar='MS',
+                         help='Instead of running the benchmark once, search for the highest load whose p99 latency stays within this many milliseconds')
+    aparser.add_argument('--slo-p999', type=float, metavar='MS',
+                         help='Also require the p99.9 latency of the saturation search steps to stay within this many milliseconds')
+    aparser.add_argument('--search-knob', default=saturation.KNOB_RATE, choices=[saturation.KNOB_RATE, saturation.KNOB_TERMINALS],
+                         help='Adjust the load of the saturation search by the target rate (over all of the clients) or the number of terminals per client')
+    aparser.add_argument('--search-min', type=float, metavar='L',
+                         help='The load that the saturation search starts from (--rate or 10 transactions/s, or 1 terminal, by default)')
+    aparser.add_argument('--search-max', type=float, metavar='L',
+                         help='The highest load that the saturation search tries')
+    aparser.add_argument('--search-steps', default=saturation.SEARCH_MAX_STEPS, type=int, metavar='N',
+                         help='The most steps (each a run of --duration seconds after --warmup) that the saturation search takes')
+    aparser.add_argument('--search-output', metavar='FILE',
+                         help='Write the result and the whole curve of the saturation search to this file as JSON')
+    aparser.add_argument('--deferred-delivery', action='store_true',
+                         help='Only queue the DELIVERY transactions at the terminals, and run them in the background as in TPC-C 2.7.2')
+    aparser.add_argument('--delivery-workers', default=1, type=int, metavar='N',
+                         help='Number of background workers per client process that run the queued DELIVERY transactions')
+    aparser.add_argument('--retries', default=0, type=int, metavar='R',
+                         help='Retry a transaction that failed with an error that the driver says is retriable (e.g., a conflict) up to this many times')
+    aparser.add_argument('--retry-backoff', default=constants.DEFAULT_RETRY_BACKOFF, type=float, metavar='S',
+                         help='Wait up to this many seconds before the first retry of a transaction, and twice as long before each of the next ones')
+    aparser.add_argument('--seed', type=int,
+                         help='Master seed that all of the random data and transaction parameters are derived from')
     aparser.add_argument('--stop-on-error', action='store_true',
                          help='Stop the transaction execution when the driver throws an exception.')
     aparser.add_argument('--no-load', action='store_true',
@@ -204,6 +411,17 @@ if __name__ == '__main__':
     args = vars(aparser.parse_args())
 
     if args['debug']: logging.getLogger().setLevel(logging.DEBUG)
+    ## The cache is keyed by the seed, so a random one would never be replayed
+    if args['data_cache']: assert args['seed'] != None or args['resume_load'], "--data-cache requires --seed"
+    if args['resume_load']:
+        assert args['load_journal'], "--resume-load requires --load-journal"
+        assert not args['reset'], "Cannot reset the database when resuming a load"
+    if args['replay']:
+        assert not args['slo_p99'], "Cannot search for the saturation point of a replay"
+        assert not args['deferred_delivery'], "Cannot defer the DELIVERY transactions of a replay"
+    args['load_id'] = time.strftime("%Y%m%d-%H%M%S")
+    args['mix'] = executor.parseMix(args['mix'])
+    args['skew'] = distribution.parseSkew(args['skew'])
         
     ## Create a handle to the target client driver
     driverClass = createDriverClass(args['system'])
@@ -235,8 +453,14 @@ if __name__ == '__main__':
 
     ## Create ScaleParameters
     scaleParameters = scaleparameters.makeWithScaleFactor(args['warehouses'], args['scalefactor'])
-    nurand = rand.setNURand(nurand.makeForLoad())
+    ## A resumed load goes on with the seed that it was started with
+    if args['seed'] == None and args['resume_load']: args['seed'] = loadjournal.resumeSeed(args['load_journal'])
+    if args['seed'] == None: args['seed'] = rand.makeSeed()
+    logging.info("Using random seed %d" % args['seed'])
+    rand.setNURand(nurand.makeForSeed(args['seed'])[0])
     if args['debug']: logging.debug("Scale Parameters:\n%s" % scaleParameters)
+    if args['rate']: args['client_rate'] = args['rate'] / float(args['clients'])
+    args['total_clients'] = args['clients']
     
     ## DATA LOADER!!!
     load_time = None
@@ -244,26 +468,44 @@ if __name__ == '__main__':
         logging.info("Loading TPC-C benchmark data using %s" % (driver))
         load_start = time.time()
         if args['clients'] == 1:
-            l = loader.Loader(driver, scaleParameters, range(scaleParameters.starting_warehouse, scaleParameters.ending_warehouse+1), True)
+            l = loader.makeLoader(driver, scaleParameters, range(scaleParameters.starting_warehouse, scaleParameters.ending_warehouse+1), True, args, config)
             driver.loadStart()
-            l.execute()
+            load_stats = l.execute()
             driver.loadFinish()
         else:
-            startLoading(driverClass, scaleParameters, args, config)
+            load_stats = startLoading(driverClass, scaleParameters, args, config)
+            ## The clients each loaded part of the ITEM table
+            loader.finishSplitItems(driver, args)
         load_time = time.time() - load_start
+        print load_stats.show(load_time)
+        if args['load_stats']: load_stats.save(args['load_stats'], load_time)
     ## IF
     
+    ## SATURATION SEARCH!!!
+    if not args['no_execute'] and args['slo_p99']:
+        def runStep(stepArgs):
+            if args['clients'] == 1:
+                return executorFunc(driverClass, scaleParameters, stepArgs, config, args['debug'])
+            return startExecution(driverClass, scaleParameters, stepArgs, config)
+        ## DEF
+        search = saturation.makeSaturationSearch(args, runStep)
+        search.run()
+        print search.show()
+        if args['search_output']: search.save(args['search_output'])
+    
     ## WORKLOAD DRIVER!!!
-    if not args['no_execute']:
+    elif not args['no_execute']:
         if args['clients'] == 1:
-            e = executor.Executor(driver, scaleParameters, stop_on_error=args['stop_on_error'])
-            driver.executeStart()
-            results = e.execute(args['duration'])
-            driver.executeFinish()
+            results = executorFunc(driverClass, scaleParameters, args, config, args['debug'])
         else:
             results = startExecution(driverClass, scaleParameters, args, config)
         assert results
-        print results.show(load_time)
+        duration = args['duration']
+        ## A replay ends early if it runs out of transactions
+        if args['replay']: duration = max(min(duration, results.stop - results.start - args['warmup']), 1)
+        print results.show(load_time, duration)
+        if args['timeline']: results.saveTimeline(args['timeline'])
+        if args['results']: results.save(args['results'], duration)
     ## IF
     
 ## MAIN
\ No newline at end of file
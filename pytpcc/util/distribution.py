@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import math
+
+## The transaction parameters that can be skewed
+WAREHOUSE = "warehouse"
+DISTRICT = "district"
+CUSTOMER = "customer"
+ITEM = "item"
+PARAMETERS = [ WAREHOUSE, DISTRICT, CUSTOMER, ITEM ]
+
+## The percentages of the NEW_ORDER items that are supplied by a remote
+## warehouse and of the PAYMENTs that are for a customer of a remote warehouse
+REMOTE_ITEM = "remote-item"
+REMOTE_PAYMENT = "remote-payment"
+PERCENTAGES = [ REMOTE_ITEM, REMOTE_PAYMENT ]
+
+UNIFORM = "uniform"
+NURAND = "nurand"
+ZIPFIAN = "zipfian"
+HOTSPOT = "hotspot"
+LATEST = "latest"
+DISTRIBUTIONS = [ UNIFORM, NURAND, ZIPFIAN, HOTSPOT, LATEST ]
+
+## The A constant of the parameters that have a NURand (TPC-C 2.1.6)
+NURAND_A = {
+    CUSTOMER: 1023,
+    ITEM: 8191,
+}
+
+## The default skew of a zipfian (and latest) distribution, and the share of
+## the ids that are hot and the share of the accesses that go to them in a
+## hotspot distribution
+ZIPFIAN_THETA = 0.99
+HOTSPOT_FRACTION = 0.2
+HOTSPOT_PROBABILITY = 0.8
+
+## The distributions and percentages of the TPC-C specification
+DEFAULT_SKEW = {
+    WAREHOUSE: (UNIFORM, ),
+    DISTRICT: (UNIFORM, ),
+    CUSTOMER: (NURAND, ),
+    ITEM: (NURAND, ),
+    REMOTE_ITEM: 1,
+    REMOTE_PAYMENT: 15,
+}
+
+## ==============================================
+## parseSkew
+## ==============================================
+def parseSkew(value):
+    """
+        Parse a --skew: a comma separated list of PARAM=DIST[:ARG...] (e.g.,
+        "warehouse=zipfian:0.9,item=hotspot:0.1:0.9") and of the remote
+        percentages (e.g., "remote-payment=50"). The parameters that are left
+        out keep the distribution of the specification.
+    """
+    skew = dict(DEFAULT_SKEW)
+    if value == None: return (skew)
+    
+    usage = "expected a list of PARAM=%s[:ARG...] with PARAM in %s, or of %s=PERCENT" % \
+            ("|".join(DISTRIBUTIONS), ", ".join(PARAMETERS), "|".join(PERCENTAGES))
+    for item in value.split(","):
+        name, sep, spec = item.partition("=")
+        name = name.strip().lower()
+        spec = spec.strip().lower()
+        if not sep or not name in PARAMETERS + PERCENTAGES:
+            raise Exception("Invalid skew '%s': %s" % (value, usage))
+        if name in PERCENTAGES:
+            if not spec.isdigit() or int(spec) > 100:
+                raise Exception("Invalid skew '%s': %s must be a whole percentage" % (value, name))
+            skew[name] = int(spec)
+            continue
+        ## IF
+        
+        fields = spec.split(":")
+        dist = fields[0]
+        try:
+            args = tuple(map(float, fields[1:]))
+        except ValueError:
+            raise Exception("Invalid skew '%s': the arguments of %s must be numbers" % (value, name))
+        if dist == UNIFORM or dist == NURAND:
+            valid = not args and (dist == UNIFORM or name in NURAND_A)
+        elif dist == ZIPFIAN or dist == LATEST:
+            if not args: args = (ZIPFIAN_THETA, )
+            valid = len(args) == 1 and 0 < args[0] < 1
+        elif dist == HOTSPOT:
+            if not args: args = (HOTSPOT_FRACTION, HOTSPOT_PROBABILITY)
+            valid = len(args) == 2 and 0 < args[0] <= 1 and 0 <= args[1] <= 1
+        else:
+            raise Exception("Invalid skew '%s': %s" % (value, usage))
+        if not valid:
+            raise Exception("Invalid skew '%s': invalid %s distribution for %s" % (value, dist, name))
+        skew[name] = (dist, ) + args
+    ## FOR
+    return (skew)
+## DEF
+
+## ==============================================
+## Samplers
+## ==============================================
+## They draw the ids in [minimum, maximum] with the given Random, and
+## precompute whatever they can so that drawing an id takes constant time.
+
+class Uniform(object):
+    def __init__(self, minimum, maximum):
+        self.minimum = minimum
+        self.maximum = maximum
+    
+    def next(self, rand):
+        return rand.number(self.minimum, self.maximum)
+## CLASS
+
+class NURand(object):
+    def __init__(self, a, minimum, maximum):
+        self.a = a
+        self.minimum = minimum
+        self.maximum = maximum
+    
+    def next(self, rand):
+        return rand.NURand(self.a, self.minimum, self.maximum)
+## CLASS
+
+class Zipfian(object):
+    """
+        The id of rank r (from 0) is drawn with a probability proportional to
+        1/(r+1)^theta, and the minimum is the most popular one. Uses the
+        method of Gray et al., "Quickly Generating Billion-Record Synthetic
+        Databases" (SIGMOD 1994), which only needs the zeta constant of the
+        number of ids.
+    """
+    
+    def __init__(self, minimum, maximum, theta = ZIPFIAN_THETA):
+        assert 0 < theta < 1, "Invalid zipfian theta %s" % theta
+        self.minimum = minimum
+        self.maximum = maximum
+        self.n = maximum - minimum + 1
+        self.zetan = zeta(self.n, theta)
+        zeta2 = zeta(2, theta)
+        self.alpha = 1.0 / (1.0 - theta)
+        self.eta = (1.0 - (2.0 / self.n) ** (1.0 - theta)) / (1.0 - zeta2 / self.zetan) if self.n > 2 else 0.0
+        self.second = 1.0 + 0.5 ** theta
+    
+    def rank(self, rand):
+        u = rand.fraction()
+        uz = u * self.zetan
+        if uz < 1.0 or self.n == 1: return (0)
+        if uz < self.second: return (1)
+        return min(int(self.n * (self.eta * u - self.eta + 1.0) ** self.alpha), self.n - 1)
+    
+    def next(self, rand):
+        return self.minimum + self.rank(rand)
+## CLASS
+
+class Latest(Zipfian):
+    """A zipfian distribution where the maximum (i.e., the newest) id is the most popular one"""
+    
+    def next(self, rand):
+        return self.maximum - self.rank(rand)
+## CLASS
+
+class Hotspot(object):
+    """The first fraction of the ids get the given share of the accesses, uniformly"""
+    
+    def __init__(self, minimum, maximum, fraction = HOTSPOT_FRACTION, probability = HOTSPOT_PROBABILITY):
+        self.minimum = minimum
+        self.n = maximum - minimum + 1
+        self.hot = min(max(1, int(round(self.n * fraction))), self.n)
+        self.probability = probability
+    
+    def next(self, rand):
+        if self.hot == self.n or rand.fraction() < self.probability:
+            return self.minimum + int(rand.fraction() * self.hot)
+        return self.minimum + self.hot + int(rand.fraction() * (self.n - self.hot))
+## CLASS
+
+## The zeta constants only depend on the number of ids, so every sampler of
+## a process shares them
+zetaCache = { }
+def zeta(n, theta):
+    """The sum of 1/i^theta for i in [1, n]"""
+    key = (n, theta)
+    if not key in zetaCache:
+        ## fsum is exactly rounded, so the constant (and with it every id that
+        ## the samplers draw) does not depend on the order of the additions
+        zetaCache[key] = math.fsum(i ** -theta for i in xrange(1, n + 1))
+    return (zetaCache[key])
+## DEF
+
+def makeSampler(name, spec, minimum, maximum):
+    """Create the sampler of a parameter for the distribution that parseSkew() gave it"""
+    dist = spec[0]
+    if dist == UNIFORM: return Uniform(minimum, maximum)
+    if dist == NURAND: return NURand(NURAND_A[name], minimum, maximum)
+    if dist == ZIPFIAN: return Zipfian(minimum, maximum, *spec[1:])
+    if dist == LATEST: return Latest(minimum, maximum, *spec[1:])
+    if dist == HOTSPOT: return Hotspot(minimum, maximum, *spec[1:])
+    raise Exception("Unexpected distribution '%s'" % dist)
+## DEF
+
+## ==============================================
+## Skew
+## ==============================================
+class Skew(object):
+    """
+        The samplers of the transaction parameters of a scale. With the
+        DEFAULT_SKEW, they draw exactly the same random numbers as the
+        specification does, so the same seed gives the same transactions.
+    """
+    
+    def __init__(self, skew, scaleParameters):
+        if skew == None: skew = DEFAULT_SKEW
+        self.skew = skew
+        self.warehouse = makeSampler(WAREHOUSE, skew[WAREHOUSE], scaleParameters.starting_warehouse, scaleParameters.ending_warehouse)
+        self.district = makeSampler(DISTRICT, skew[DISTRICT], 1, scaleParameters.districtsPerWarehouse)
+        self.customer = makeSampler(CUSTOMER, skew[CUSTOMER], 1, scaleParameters.customersPerDistrict)
+        self.item = makeSampler(ITEM, skew[ITEM], 1, scaleParameters.items)
+        self.remoteItem = skew[REMOTE_ITEM]
+        self.remotePayment = skew[REMOTE_PAYMENT]
+        
+        ## The samplers of the index in the list of the home warehouses of a
+        ## terminal, by the number of home warehouses
+        self.homes = { }
+    ## DEF
+    
+    def home(self, count):
+        if not count in self.homes:
+            self.homes[count] = makeSampler(WAREHOUSE, self.skew[WAREHOUSE], 0, count - 1)
+        return (self.homes[count])
+    ## DEF
+## CLASS
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import os
+import time
+import json
+import socket
+import logging
+
+## The roles that a LoadStats worker can have
+ROLE_LOADER = "loader"          # Generates tuples and passes them to its own driver
+ROLE_GENERATOR = "generator"    # Pipeline process that generates tuples for the writers
+ROLE_WRITER = "writer"          # Pipeline thread that passes the generators' tuples to its driver
+
+class LoadStats:
+    """
+        Where the time of the data loading went, per worker and per table.
+        A worker is anything that produces tuples and hands them on: a loader
+        process, or a generator process or writer thread of a pipelined load.
+        For each table it records the time spent producing the tuples, the
+        time spent inside the driver's load calls, and the number of rows and
+        (estimated) bytes. A generator's "driver" time is the time it waited
+        for the writers, and a writer's "generate" time is the time it waited
+        for the generators.
+    """
+    
+    def __init__(self, name = None, role = ROLE_LOADER):
+        if name == None:
+            name = "%s:%d" % (socket.gethostname(), os.getpid())
+        self.name = name
+        self.workers = {
+            name: {
+                "role": role,
+                "start": None,
+                "stop": None,
+                "callbacks": 0.0,
+                "tables": { },
+            }
+        }
+    
+    def getTable(self, tableName):
+        tables = self.workers[self.name]["tables"]
+        t = tables.get(tableName)
+        if t == None:
+            t = { "generate": 0.0, "driver": 0.0, "rows": 0, "bytes": 0, "batches": 0 }
+            tables[tableName] = t
+        return (t)
+    ## DEF
+    
+    def startLoading(self):
+        self.workers[self.name]["start"] = time.time()
+    
+    def stopLoading(self):
+        self.workers[self.name]["stop"] = time.time()
+    
+    def measureGeneration(self, tableName, chunks):
+        """Pass through the chunks, recording how long it took to produce each of them"""
+        t = self.getTable(tableName)
+        chunks = iter(chunks)
+        while True:
+            start = time.time()
+            tuples = next(chunks, None)
+            t["generate"] += time.time() - start
+            if tuples == None: break
+            
+            t["rows"] += len(tuples)
+            t["batches"] += 1
+            if tuples: t["bytes"] += len(tuples) * estimateSize(tuples[0])
+            yield tuples
+        ## WHILE
+    ## DEF
+    
+    def measureDriver(self, tableName, loadFunc, chunks):
+        """
+            Call the driver's loadFunc with the chunks, recording the time that
+            was spent inside of it but not producing the chunks that it asked for
+        """
+        t = self.getTable(tableName)
+        generated = t["generate"]
+        start = time.time()
+        loadFunc(tableName, chunks)
+        t["driver"] += (time.time() - start) - (t["generate"] - generated)
+    ## DEF
+    
+    def measureCallback(self, callback, *args):
+        """Call one of the driver's other load callbacks, recording how long it took"""
+        start = time.time()
+        result = callback(*args)
+        self.workers[self.name]["callbacks"] += time.time() - start
+        return (result)
+    ## DEF
+    
+    def append(self, other):
+        """Add the workers of another LoadStats to this one"""
+        for name, worker in other.workers.items():
+            assert not name in self.workers or name == self.name, "Duplicate load worker %s" % name
+            if name != self.name: self.workers[name] = worker
+        ## FOR
+    ## DEF
+    
+    def getTotals(self):
+        """
+            Return the per table totals over all of the workers. The rows of
+            the pipeline writers are not counted, since the generators already
+            counted them, and neither is the time that the generators and the
+            writers spent waiting for each other.
+        """
+        totals = { }
+        for worker in self.workers.values():
+            for tableName, t in worker["tables"].items():
+                total = totals.setdefault(tableName, { "generate": 0.0, "driver": 0.0, "rows": 0, "bytes": 0, "batches": 0 })
+                if worker["role"] != ROLE_WRITER:
+                    total["generate"] += t["generate"]
+                if worker["role"] != ROLE_GENERATOR:
+                    total["driver"] += t["driver"]
+                if worker["role"] != ROLE_WRITER:
+                    total["rows"] += t["rows"]
+                    total["bytes"] += t["bytes"]
+                    total["batches"] += t["batches"]
+            ## FOR
+        ## FOR
+        return (totals)
+    ## DEF
+    
+    def report(self, load_time = None):
+        """Return a dict with all of the statistics that can be dumped as JSON"""
+        return {
+            "load_time": load_time,
+            "workers": self.workers,
+            "totals": self.getTotals(),
+        }
+    ## DEF
+    
+    def save(self, path, load_time = None):
+        """Write the report() to the given file as JSON"""
+        with open(path, "w") as fd:
+            json.dump(self.report(load_time), fd, indent=2, sort_keys=True)
+    ## DEF
+    
+    def __str__(self):
+        return self.show()
+    
+    def show(self, load_time = None):
+        col_width = 14
+        f = "\n  %-" + str(col_width+4) + "s" + (("%" + str(col_width) + "s")*6)
+        total_width = (col_width*7)+6
+        line = "-"*total_width
+        
+        ret = "="*total_width + "\n"
+        if load_time != None:
+            ret += "Data Loading Time: %d seconds\n" % (load_time)
+        
+        def showTables(tables):
+            out = f % ("", "Rows", "MB", "Generate (s)", "Driver (s)", "Gen rows/s", "Load rows/s")
+            for tableName in sorted(tables.keys()):
+                t = tables[tableName]
+                out += f % (tableName, t["rows"], "%.1f" % (t["bytes"] / 1048576.0),
+                            "%.2f" % t["generate"], "%.2f" % t["driver"],
+                            "%.0f" % (t["rows"] / t["generate"]) if t["generate"] > 0 else "-",
+                            "%.0f" % (t["rows"] / t["driver"]) if t["driver"] > 0 else "-")
+            ## FOR
+            return (out)
+        ## DEF
+        
+        for name in sorted(self.workers.keys()):
+            worker = self.workers[name]
+            elapsed = (worker["stop"] - worker["start"]) if worker["start"] != None and worker["stop"] != None else 0
+            ret += "\n%s [%s] %.2f seconds, %.2f seconds in callbacks\n%s" % (name, worker["role"], elapsed, worker["callbacks"], line)
+            ret += showTables(worker["tables"])
+            ret += "\n"
+        ## FOR
+        
+        ret += "\nTotal over %d workers\n%s" % (len(self.workers), line)
+        ret += showTables(self.getTotals())
+        return (ret)
+    ## DEF
+## CLASS
+
+def estimateSize(t):
+    """Estimate the number of bytes that a tuple takes up"""
+    return sum([ len(str(v)) for v in t ])
+## DEF
@@ -31,11 +31,13 @@
 
 import rand
 
-def makeForLoad():
-    """Create random NURand constants, appropriate for loading the database."""
-    cLast = rand.number(0, 255)
-    cId = rand.number(0, 1023)
-    orderLineItemId = rand.number(0, 8191)
+def makeForLoad(r = None):
+    """Create random NURand constants, appropriate for loading the database.
+    The constants are drawn from the Random stream r, or from the rand module if it is None."""
+    if r is None: r = rand
+    cLast = r.number(0, 255)
+    cId = r.number(0, 1023)
+    orderLineItemId = r.number(0, 8191)
     return NURandC(cLast, cId, orderLineItemId)
 
 def validCRun(cRun, cLoad):
@@ -43,17 +45,24 @@ def validCRun(cRun, cLoad):
     cDelta = abs(cRun - cLoad)
     return 65 <= cDelta and cDelta <= 119 and cDelta != 96 and cDelta != 112
 
-def makeForRun(loadC):
+def makeForRun(loadC, r = None):
     """Create random NURand constants for running TPC-C. TPC-C 2.1.6.1. (page 20) specifies the valid range for these constants."""
-    cRun = rand.number(0, 255)
+    if r is None: r = rand
+    cRun = r.number(0, 255)
     while validCRun(cRun, loadC.cLast) == False:
-        cRun = rand.number(0, 255)
+        cRun = r.number(0, 255)
     assert validCRun(cRun, loadC.cLast)
     
-    cId = rand.number(0, 1023)
-    orderLineItemId = rand.number(0, 8191)
+    cId = r.number(0, 1023)
+    orderLineItemId = r.number(0, 8191)
     return NURandC(cRun, cId, orderLineItemId)
 
+def makeForSeed(seed):
+    """Return the (load, run) NURand constants that are derived from the master seed"""
+    loadC = makeForLoad(rand.makeStream(seed, "nurand", "load"))
+    runC = makeForRun(loadC, rand.makeStream(seed, "nurand", "run"))
+    return (loadC, runC)
+
 class NURandC:
     def __init__(self, cLast, cId, orderLineItemId):
         self.cLast = cLast
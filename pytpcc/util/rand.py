@@ -30,8 +30,14 @@
 # -----------------------------------------------------------------------
 
 import random
+import hashlib
 import nurand
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 SYLLABLES = [ "BAR", "OUGHT", "ABLE", "PRI", "PRES", "ESE", "ANTI", "CALLY", "ATION", "EING" ]
 
 nurandVar = None # NURand
@@ -40,90 +46,276 @@ def setNURand(nu):
     nurandVar = nu
 ## DEF
 
-def NURand(a, x, y):
-    """A non-uniform random number, as defined by TPC-C 2.1.6. (page 20)."""
-    global nurandVar
-    assert x <= y
-    if nurandVar is None:
-		setNURand(nurand.makeForLoad())
-    
-    if a == 255:
-        c = nurandVar.cLast
-    elif a == 1023:
-        c = nurandVar.cId
-    elif a == 8191:
-        c = nurandVar.orderLineItemId
-    else:
-        raise Exception("a = " + a + " is not a supported value")
-    
-    return (((number(0, a) | number(x, y)) + c) % (y - x + 1)) + x
+## ==============================================
+## Seeds
+## ==============================================
+
+def deriveSeed(seed, *path):
+    """
+        Derive the seed of an independent stream from a master seed and a path
+        that names the stream, e.g. deriveSeed(seed, "load", w_id, "STOCK").
+        Returns None (i.e., an unseeded stream) if seed is None.
+    """
+    if seed is None: return None
+    digest = hashlib.md5(repr((seed,) + path)).hexdigest()
+    return int(digest[:16], 16)
 ## DEF
 
-def number(minimum, maximum):
-    value = random.randint(minimum, maximum)
-    assert minimum <= value and value <= maximum
-    return value
+def makeSeed():
+    """A new random master seed"""
+    return random.SystemRandom().getrandbits(63)
 ## DEF
 
-def numberExcluding(minimum, maximum, excluding):
-    """An in the range [minimum, maximum], excluding excluding."""
-    assert minimum < maximum
-    assert minimum <= excluding and excluding <= maximum
+## ==============================================
+## Random
+## ==============================================
+class Random(object):
+    """
+        A stream of random values with its own state. Two streams built from the
+        same seed produce exactly the same values, so the work that uses a
+        stream can be done by any process in any order.
+    """
+    
+    def __init__(self, seed = None, nurandC = None):
+        self.random = random.Random(seed)
+        self.nurandC = nurandC
+        ## The bulk generators hand the state of self.random to this numpy
+        ## generator, which has the same Mersenne Twister, so that they draw
+        ## exactly the same values with or without numpy
+        self.numpy = None
+        if numpy is not None:
+            self.numpy = numpy.random.RandomState()
+    ## DEF
+    
+    def NURand(self, a, x, y):
+        """A non-uniform random number, as defined by TPC-C 2.1.6. (page 20)."""
+        assert x <= y
+        nu = self.nurandC
+        if nu is None:
+            if nurandVar is None: setNURand(nurand.makeForLoad())
+            nu = nurandVar
+        
+        if a == 255:
+            c = nu.cLast
+        elif a == 1023:
+            c = nu.cId
+        elif a == 8191:
+            c = nu.orderLineItemId
+        else:
+            raise Exception("a = " + a + " is not a supported value")
+        
+        return (((self.number(0, a) | self.number(x, y)) + c) % (y - x + 1)) + x
+    ## DEF
+    
+    def number(self, minimum, maximum):
+        value = self.random.randint(minimum, maximum)
+        assert minimum <= value and value <= maximum
+        return value
+    ## DEF
+    
+    def fraction(self):
+        """A random float in the range [0, 1)."""
+        return self.random.random()
+    ## DEF
+    
+    def numberExcluding(self, minimum, maximum, excluding):
+        """An in the range [minimum, maximum], excluding excluding."""
+        assert minimum < maximum
+        assert minimum <= excluding and excluding <= maximum
 
-    ## Generate 1 less number than the range
-    num = number(minimum, maximum-1)
+        ## Generate 1 less number than the range
+        num = self.number(minimum, maximum-1)
 
-    ## Adjust the numbers to remove excluding
-    if num >= excluding: num += 1
-    assert minimum <= num and num <= maximum and num != excluding
-    return num
-## DEF 
+        ## Adjust the numbers to remove excluding
+        if num >= excluding: num += 1
+        assert minimum <= num and num <= maximum and num != excluding
+        return num
+    ## DEF 
+    
+    def fixedPoint(self, decimal_places, minimum, maximum):
+        assert decimal_places > 0
+        assert minimum < maximum
 
-def fixedPoint(decimal_places, minimum, maximum):
-    assert decimal_places > 0
-    assert minimum < maximum
+        multiplier = 1
+        for i in range(0, decimal_places):
+            multiplier *= 10
 
-    multiplier = 1
-    for i in range(0, decimal_places):
-        multiplier *= 10
+        int_min = int(minimum * multiplier + 0.5)
+        int_max = int(maximum * multiplier + 0.5)
+
+        return float(self.number(int_min, int_max) / float(multiplier))
+    ## DEF
+    
+    def selectUniqueIds(self, numUnique, minimum, maximum):
+        rows = set()
+        for i in range(0, numUnique):
+            index = None
+            while index == None or index in rows:
+                index = self.number(minimum, maximum)
+            ## WHILE
+            rows.add(index)
+        ## FOR
+        assert len(rows) == numUnique
+        return rows
+    ## DEF
+    
+    def shuffle(self, values):
+        self.random.shuffle(values)
+    ## DEF
+    
+    def astring(self, minimum_length, maximum_length):
+        """A random alphabetic string with length in range [minimum_length, maximum_length]."""
+        return self.randomString(minimum_length, maximum_length, 'a', 26)
+    ## DEF
+    
+    def nstring(self, minimum_length, maximum_length):
+        """A random numeric string with length in range [minimum_length, maximum_length]."""
+        return self.randomString(minimum_length, maximum_length, '0', 10)
+    ## DEF
+    
+    def randomString(self, minimum_length, maximum_length, base, numCharacters):
+        length = self.number(minimum_length, maximum_length)
+        baseByte = ord(base)
+        string = ""
+        for i in range(length):
+            string += chr(baseByte + self.number(0, numCharacters-1))
+        return string
+    ## DEF
+    
+    def makeRandomLastName(self, maxCID):
+        """A non-uniform random last name, as defined by TPC-C 4.3.2.3. The name will be limited to maxCID."""
+        min_cid = 999
+        if (maxCID - 1) < min_cid: min_cid = maxCID - 1
+        return makeLastName(self.NURand(255, 0, min_cid))
+    ## DEF
+    
+    ## ----------------------------------------------
+    ## Bulk Generation
+    ## ----------------------------------------------
+    ## These produce a whole column of values at once so that the loader does
+    ## not have to go through the per-value functions above for every field of
+    ## every tuple. They use numpy when it is available, but the values only
+    ## depend on the seed: both ways map the same fractions() to them.
+
+    def fractions(self, count):
+        """A numpy array of the count random floats in [0, 1) that count calls
+        to fraction() would return, which leaves this stream in the same state"""
+        version, state, gauss = self.random.getstate()
+        self.numpy.set_state(("MT19937", numpy.array(state[:-1], dtype=numpy.uint32), state[-1]))
+        values = self.numpy.random_sample(count)
+        keys, pos = self.numpy.get_state()[1:3]
+        self.random.setstate((version, tuple(map(long, keys)) + (long(pos), ), gauss))
+        return values
+    ## DEF
+
+    def numbers(self, minimum, maximum, count):
+        """A list of count random numbers in the range [minimum, maximum]."""
+        assert minimum <= maximum
+        span = maximum - minimum + 1
+        if self.numpy is not None:
+            return (minimum + (self.fractions(count) * span).astype(numpy.int64)).tolist()
+        r = self.random.random
+        return [ minimum + int(r() * span) for i in xrange(count) ]
+    ## DEF
+    
+    def fixedPoints(self, decimal_places, minimum, maximum, count):
+        """A list of count random fixed point numbers. See fixedPoint()."""
+        assert decimal_places > 0
+        assert minimum < maximum
+
+        multiplier = float(10 ** decimal_places)
+        int_min = int(minimum * multiplier + 0.5)
+        int_max = int(maximum * multiplier + 0.5)
+        return [ x / multiplier for x in self.numbers(int_min, int_max, count) ]
+    ## DEF
+    
+    def astrings(self, minimum_length, maximum_length, count):
+        """A list of count random alphabetic strings. See astring()."""
+        return self.randomStrings(minimum_length, maximum_length, count, 'a', 26)
+    ## DEF
+    
+    def nstrings(self, minimum_length, maximum_length, count):
+        """A list of count random numeric strings. See nstring()."""
+        return self.randomStrings(minimum_length, maximum_length, count, '0', 10)
+    ## DEF
+    
+    def randomStrings(self, minimum_length, maximum_length, count, base, numCharacters):
+        if minimum_length == maximum_length:
+            chars = self.randomCharacters(count * minimum_length, base, numCharacters)
+            return [ chars[i:i+minimum_length] for i in xrange(0, count * minimum_length, minimum_length) ]
 
-    int_min = int(minimum * multiplier + 0.5)
-    int_max = int(maximum * multiplier + 0.5)
+        lengths = self.numbers(minimum_length, maximum_length, count)
+        chars = self.randomCharacters(sum(lengths), base, numCharacters)
+        strings = [ ]
+        offset = 0
+        for length in lengths:
+            strings.append(chars[offset:offset+length])
+            offset += length
+        ## FOR
+        return strings
+    ## DEF
+    
+    def randomCharacters(self, length, base, numCharacters):
+        """A single random string of exactly length characters."""
+        baseByte = ord(base)
+        if self.numpy is not None:
+            return (baseByte + (self.fractions(length) * numCharacters).astype(numpy.int64)).astype(numpy.uint8).tostring()
+        alphabet = [ chr(baseByte + i) for i in range(numCharacters) ]
+        r = self.random.random
+        return "".join([ alphabet[int(r() * numCharacters)] for i in xrange(length) ])
+    ## DEF
+## CLASS
 
-    return float(number(int_min, int_max) / float(multiplier))
+def makeStream(seed, *path):
+    """Return the Random stream with the given name that is derived from the master seed"""
+    return Random(deriveSeed(seed, *path))
 ## DEF
 
+## ==============================================
+## Module Functions
+## ==============================================
+## These use a single process-wide stream that is not seeded
+
+defaultRandom = Random()
+
+def NURand(a, x, y):
+    return defaultRandom.NURand(a, x, y)
+
+def number(minimum, maximum):
+    return defaultRandom.number(minimum, maximum)
+
+def numberExcluding(minimum, maximum, excluding):
+    return defaultRandom.numberExcluding(minimum, maximum, excluding)
+
+def fixedPoint(decimal_places, minimum, maximum):
+    return defaultRandom.fixedPoint(decimal_places, minimum, maximum)
+
 def selectUniqueIds(numUnique, minimum, maximum):
-    rows = set()
-    for i in range(0, numUnique):
-        index = None
-        while index == None or index in rows:
-            index = number(minimum, maximum)
-        ## WHILE
-        rows.add(index)
-    ## FOR
-    assert len(rows) == numUnique
-    return rows
-## DEF
+    return defaultRandom.selectUniqueIds(numUnique, minimum, maximum)
 
 def astring(minimum_length, maximum_length):
-    """A random alphabetic string with length in range [minimum_length, maximum_length]."""
-    return randomString(minimum_length, maximum_length, 'a', 26)
-## DEF
+    return defaultRandom.astring(minimum_length, maximum_length)
 
 def nstring(minimum_length, maximum_length):
-    """A random numeric string with length in range [minimum_length, maximum_length]."""
-    return randomString(minimum_length, maximum_length, '0', 10)
-## DEF
+    return defaultRandom.nstring(minimum_length, maximum_length)
 
 def randomString(minimum_length, maximum_length, base, numCharacters):
-    length = number(minimum_length, maximum_length)
-    baseByte = ord(base)
-    string = ""
-    for i in range(length):
-        string += chr(baseByte + number(0, numCharacters-1))
-    return string
-## DEF
+    return defaultRandom.randomString(minimum_length, maximum_length, base, numCharacters)
+
+def makeRandomLastName(maxCID):
+    return defaultRandom.makeRandomLastName(maxCID)
+
+def numbers(minimum, maximum, count):
+    return defaultRandom.numbers(minimum, maximum, count)
+
+def fixedPoints(decimal_places, minimum, maximum, count):
+    return defaultRandom.fixedPoints(decimal_places, minimum, maximum, count)
+
+def astrings(minimum_length, maximum_length, count):
+    return defaultRandom.astrings(minimum_length, maximum_length, count)
+
+def nstrings(minimum_length, maximum_length, count):
+    return defaultRandom.nstrings(minimum_length, maximum_length, count)
 
 def makeLastName(number):
     """A last name as defined by TPC-C 4.3.2.3. Not actually random."""
@@ -132,10 +324,3 @@ def makeLastName(number):
     indicies = [ number/100, (number/10)%10, number%10 ]
     return "".join(map(lambda x: SYLLABLES[x], indicies))
 ## DEF
-
-def makeRandomLastName(maxCID):
-    """A non-uniform random last name, as defined by TPC-C 4.3.2.3. The name will be limited to maxCID."""
-    min_cid = 999
-    if (maxCID - 1) < min_cid: min_cid = maxCID - 1
-    return makeLastName(NURand(255, 0, min_cid))
-## DEF
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import os
+import struct
+import cPickle
+
+## Every record is a length header followed by the pickled record
+RECORD_HEADER = struct.Struct("<I")
+
+def writeRecord(f, record):
+    data = cPickle.dumps(record, cPickle.HIGHEST_PROTOCOL)
+    f.write(RECORD_HEADER.pack(len(data)))
+    f.write(data)
+## DEF
+
+def readRecord(f):
+    length, = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+    return cPickle.loads(f.read(length))
+## DEF
+
+def readRecords(f):
+    """Generator of the complete (record, offsetAfterRecord) pairs in a file, which
+    stops at a record that was only partially written"""
+    size = os.fstat(f.fileno()).st_size
+    offset = 0
+    while offset + RECORD_HEADER.size <= size:
+        length, = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+        if offset + RECORD_HEADER.size + length > size: break
+        data = f.read(length)
+        offset += RECORD_HEADER.size + length
+        yield (cPickle.loads(data), offset)
+    ## WHILE
+## DEF
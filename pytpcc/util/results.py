@@ -26,30 +26,132 @@
 
 import logging
 import time
+import json
+import bisect
+import collections
 import constants
 from hdrh.histogram import HdrHistogram
 
+## The longest latency (in microseconds) that the histograms can hold. In
+## open-loop mode the latencies include the time spent queued behind a stall,
+## so they can be much longer than any single transaction.
+MAX_LATENCY = 60 * 60 * 1000000
+
+## The length (in seconds) of the intervals of the timeline
+TIMELINE_INTERVAL = 1
+
+## The number of the latest intervals that are kept open, so that
+## transactions that complete a little out of order still land in the right
+## one. The latencies of an interval are only added to the histograms once
+## it is closed.
+TIMELINE_OPEN_INTERVALS = 2
+
+## The percentiles of the latency in every interval of the timeline
+TIMELINE_PERCENTILES = [ 50, 90, 99 ]
+
+## The transaction types in the order of their slots in a Results
+TXN_SLOTS = sorted([ constants.TransactionTypes.DELIVERY,
+                     constants.TransactionTypes.NEW_ORDER,
+                     constants.TransactionTypes.ORDER_STATUS,
+                     constants.TransactionTypes.PAYMENT,
+                     constants.TransactionTypes.STOCK_LEVEL ])
+TXN_SLOT = dict([ (txn, slot) for slot, txn in enumerate(TXN_SLOTS) ])
+
+## ==============================================
+## now
+## ==============================================
+def makeClock():
+    """Return a function that reads a monotonic clock in nanoseconds. Python 2
+    does not have one, so it calls clock_gettime() through ctypes, and falls
+    back to the wall clock where that is not available."""
+    if hasattr(time, "monotonic_ns"):
+        return time.monotonic_ns
+    try:
+        import ctypes, ctypes.util, sys
+        assert sys.platform.startswith("linux")
+        CLOCK_MONOTONIC = 1
+        libc = ctypes.CDLL(ctypes.util.find_library("c"))
+        clock_gettime = libc.clock_gettime
+        ts = (ctypes.c_long * 2)()
+        ref = ctypes.byref(ts)
+        assert clock_gettime(CLOCK_MONOTONIC, ref) == 0
+        def monotonic():
+            clock_gettime(CLOCK_MONOTONIC, ref)
+            return ts[0] * 1000000000 + ts[1]
+        ## DEF
+        return monotonic
+    except (Exception, AssertionError), ex:
+        logging.warn("No monotonic clock, so the latencies are timed with the wall clock: %s" % ex)
+        return lambda: int(time.time() * 1000000000)
+## DEF
+
+## The clock (in nanoseconds) that the start and stop times of the transactions are read from
+now = makeClock()
+
+def makeHistogram():
+    """Return an empty latency histogram. All of them must have the same range to be added up."""
+    return HdrHistogram(1, MAX_LATENCY, 3)
+## DEF
+
+def makeIntervalHistogram():
+    """Return an empty latency histogram for one interval of the timeline.
+    There can be a lot of them, so they are less precise than the others."""
+    return HdrHistogram(1, MAX_LATENCY, 2)
+## DEF
+
+def addCounts(a, b):
+    """Add the counts (by reason) in b to the ones in a"""
+    for reason in b.keys():
+        a[reason] = a.get(reason, 0) + b[reason]
+## DEF
+
+def addEncoded(a, b):
+    """Add up two encoded interval histograms (either of which may be None)"""
+    if a == None: return (b)
+    if b == None: return (a)
+    hdr = makeIntervalHistogram()
+    hdr.decode_and_add(a)
+    hdr.decode_and_add(b)
+    return (hdr.encode())
+## DEF
+
 class Results:
     
     def __init__(self):
         self.start = None
         self.stop = None
-        self.txn_id = 0
-        self.txn_counters = {
-            constants.TransactionTypes.DELIVERY:     0,
-            constants.TransactionTypes.NEW_ORDER:    0,
-            constants.TransactionTypes.ORDER_STATUS: 0,
-            constants.TransactionTypes.PAYMENT:      0,
-            constants.TransactionTypes.STOCK_LEVEL:  0,
-        }
-        self.txn_times = {
-            constants.TransactionTypes.DELIVERY:     HdrHistogram(1, 1000000, 3),
-            constants.TransactionTypes.NEW_ORDER:    HdrHistogram(1, 1000000, 3),
-            constants.TransactionTypes.ORDER_STATUS: HdrHistogram(1, 1000000, 3),
-            constants.TransactionTypes.PAYMENT:      HdrHistogram(1, 1000000, 3),
-            constants.TransactionTypes.STOCK_LEVEL:  HdrHistogram(1, 1000000, 3),
-        }
-        self.running = { }
+        self.txn_counters = dict([ (txn, 0) for txn in TXN_SLOTS ])
+        self.slots = [ makeHistogram() for txn in TXN_SLOTS ]
+        self.txn_times = dict(zip(TXN_SLOTS, self.slots))
+        
+        ## The measured transactions of each type that were retried or that
+        ## failed for good, counted by the reason that they failed for
+        self.txn_retries = dict([ (txn, { }) for txn in TXN_SLOTS ])
+        self.txn_aborts = dict([ (txn, { }) for txn in TXN_SLOTS ])
+        
+        ## The DELIVERY transactions that were run in deferred mode: how long
+        ## they waited in the queue, and how long it took to process them
+        self.deferred_count = 0
+        self.deferred_queue_times = makeHistogram()
+        self.deferred_times = makeHistogram()
+        
+        ## The timeline: for every interval (numbered from the epoch) that
+        ## any transaction completed in, the number of transactions and their
+        ## latency histogram for each transaction type
+        self.interval = TIMELINE_INTERVAL
+        self.interval_counters = { }
+        self.interval_times = { }
+        
+        ## The latencies of the open intervals, in a list per slot, and the
+        ## ones of the interval that the last transaction completed in
+        self.pending = { }
+        self.open_intervals = [ ]
+        self.current = None
+        self.current_pending = None
+        
+        ## Converts the clock to nanoseconds since the epoch
+        self.clock_offset = int(time.time() * 1000000000) - now()
+        self.interval_length = self.interval * 1000000000
         
     def startBenchmark(self):
         """Mark the benchmark as having been started"""
@@ -64,81 +166,352 @@ class Results:
         assert self.stop == None
         logging.debug("Stopping benchmark statistics collection")
         self.stop = time.time()
+        self.closeIntervals()
         
-    def startTransaction(self, txn):
-        self.txn_id += 1
-        id = self.txn_id
-        self.running[id] = (txn, time.time())
-        return id
-        
-    def abortTransaction(self, id):
-        """Abort a transaction and discard its times"""
-        assert id in self.running
-        txn_name, txn_start = self.running[id]
-        del self.running[id]
-        
-    def stopTransaction(self, id, measure):
-        """Record that the benchmark completed an invocation of the given transaction"""
-        assert id in self.running
-        txn_name, txn_start = self.running[id]
-        del self.running[id]
-        
-        if measure:
-            duration = time.time() - txn_start
-            hdr = self.txn_times[txn_name]
-            hdr.record_value(duration * 1000000) # microsecs
-            
-            total_cnt = self.txn_counters.get(txn_name, 0)
-            self.txn_counters[txn_name] = total_cnt + 1
+    def clockTime(self, wall):
+        """Convert a time.time() to the clock that the transactions are timed with"""
+        return int(wall * 1000000000) - self.clock_offset
+        
+    def startTransaction(self, txn, start = None):
+        """Record that a transaction started, and return what stopTransaction()
+        needs to time it. In open-loop mode, start is the time (from now())
+        that it was supposed to start, so that its latency includes any queueing."""
+        return (TXN_SLOT[txn], start if start != None else now())
+        
+    def retryTransaction(self, id, measure, reason):
+        """Record that an attempt of a transaction failed and that it will be
+        run again. Its latency goes on until it completes or is aborted."""
+        if not measure: return
+        retries = self.txn_retries[TXN_SLOTS[id[0]]]
+        retries[reason] = retries.get(reason, 0) + 1
+        
+    def abortTransaction(self, id, measure = False, reason = None):
+        """Record that a transaction failed for good. Its time is discarded,
+        but a measured one is counted as an abort for the given reason."""
+        if not measure: return
+        aborts = self.txn_aborts[TXN_SLOTS[id[0]]]
+        aborts[reason] = aborts.get(reason, 0) + 1
+        
+    def recordDeferred(self, queued, started, finished, measure):
+        """Record a DELIVERY that was run in deferred mode, with the times
+        (from now()) that it was queued, taken off the queue and finished"""
+        if not measure: return
+        self.deferred_count += 1
+        self.deferred_queue_times.record_value((started - queued) // 1000) # microsecs
+        self.deferred_times.record_value((finished - started) // 1000)
+        
+    def attempts(self, txn_name):
+        """The number of times that transactions of the given type were run:
+        the completed ones, the retries and the final aborts"""
+        self.closeIntervals()
+        return (self.txn_counters[txn_name] + sum(self.txn_retries[txn_name].values()) + sum(self.txn_aborts[txn_name].values()))
+        
+    def stopTransaction(self, id, measure, stop = None):
+        """Record that the benchmark completed an invocation of the given transaction.
+        The stop time (from now()) can be given if the completion was noticed
+        some time after it happened."""
+        if not measure: return
+        if stop == None: stop = now()
+        index = (stop + self.clock_offset) // self.interval_length
+        if index != self.current: self.openInterval(index)
+        self.current_pending[id[0]].append((stop - id[1]) // 1000) # microsecs
+        
+    def openInterval(self, index):
+        """Make the interval of the timeline with the given number the current one"""
+        if self.open_intervals and index < self.open_intervals[0]:
+            ## It was already closed, so the transaction goes in the oldest open one
+            index = self.open_intervals[0]
+        if not index in self.pending:
+            self.pending[index] = [ [ ] for txn in TXN_SLOTS ]
+            bisect.insort(self.open_intervals, index)
+            while len(self.open_intervals) > TIMELINE_OPEN_INTERVALS:
+                self.closeInterval(self.open_intervals[0])
+        ## IF
+        self.current = index
+        self.current_pending = self.pending[index]
+        
+    def closeInterval(self, index):
+        """Add the latencies of an interval that no more transactions will be
+        added to to the histograms, and keep its own (encoded) histograms"""
+        self.open_intervals.remove(index)
+        pending = self.pending.pop(index)
+        if self.current == index:
+            self.current = None
+            self.current_pending = None
+        
+        counters = self.interval_counters.setdefault(index, { })
+        times = self.interval_times.setdefault(index, { })
+        for slot in range(len(TXN_SLOTS)):
+            if not pending[slot]: continue
+            txn_name = TXN_SLOTS[slot]
+            hdr = self.slots[slot]
+            interval_hdr = makeIntervalHistogram()
+            ## There are far fewer distinct latencies than transactions
+            for value, count in collections.Counter(pending[slot]).iteritems():
+                hdr.record_value(value, count)
+                interval_hdr.record_value(value, count)
+            self.txn_counters[txn_name] += len(pending[slot])
+            counters[txn_name] = counters.get(txn_name, 0) + len(pending[slot])
+            times[txn_name] = addEncoded(times.get(txn_name), interval_hdr.encode())
+        ## FOR
+        
+    def closeIntervals(self):
+        while self.open_intervals:
+            self.closeInterval(self.open_intervals[0])
+        
+    def addIntervals(self, r):
+        """Add the timeline of another Results to this one"""
+        for index in r.interval_times.keys():
+            counters = self.interval_counters.setdefault(index, { })
+            times = self.interval_times.setdefault(index, { })
+            for txn_name in r.interval_times[index].keys():
+                counters[txn_name] = counters.get(txn_name, 0) + r.interval_counters[index][txn_name]
+                times[txn_name] = addEncoded(times.get(txn_name), r.interval_times[index][txn_name])
+            ## FOR
+        ## FOR
+        
+    def encode(self):
+        """Encode the histograms so that the Results can be sent to another
+        process, where append() adds them up"""
+        self.closeIntervals()
+        for txn_name in self.txn_times.keys():
+            self.txn_times[txn_name] = self.txn_times[txn_name].encode()
+        self.deferred_queue_times = self.deferred_queue_times.encode()
+        self.deferred_times = self.deferred_times.encode()
+        ## The slots are the same histograms, which cannot be pickled
+        self.slots = None
         
     def append(self, r):
+        self.closeIntervals()
         for txn_name in r.txn_counters.keys():
             orig_cnt = self.txn_counters.get(txn_name, 0)
             orig_hdr = self.txn_times[txn_name]
 
             self.txn_counters[txn_name] = orig_cnt + r.txn_counters[txn_name]
             orig_hdr.decode_and_add(r.txn_times[txn_name])
+            addCounts(self.txn_retries[txn_name], r.txn_retries[txn_name])
+            addCounts(self.txn_aborts[txn_name], r.txn_aborts[txn_name])
             #logging.debug("%s [cnt=%d, time=%d]" % (txn_name, self.txn_counters[txn_name], self.txn_times[txn_name]))
+        self.deferred_count += r.deferred_count
+        self.deferred_queue_times.decode_and_add(r.deferred_queue_times)
+        self.deferred_times.decode_and_add(r.deferred_times)
+        self.addIntervals(r)
         ## HACK
         self.start = r.start
         self.stop = r.stop
             
+    def merge(self, r):
+        """Add another Results that was collected in this process (and so is not encoded)"""
+        self.closeIntervals()
+        r.closeIntervals()
+        for txn_name in r.txn_counters.keys():
+            self.txn_counters[txn_name] = self.txn_counters.get(txn_name, 0) + r.txn_counters[txn_name]
+            self.txn_times[txn_name].add(r.txn_times[txn_name])
+            addCounts(self.txn_retries[txn_name], r.txn_retries[txn_name])
+            addCounts(self.txn_aborts[txn_name], r.txn_aborts[txn_name])
+        ## FOR
+        self.deferred_count += r.deferred_count
+        self.deferred_queue_times.add(r.deferred_queue_times)
+        self.deferred_times.add(r.deferred_times)
+        self.addIntervals(r)
+        if r.start != None and (self.start == None or r.start < self.start):
+            self.start = r.start
+        if r.stop != None and (self.stop == None or r.stop > self.stop):
+            self.stop = r.stop
+            
+    def mix(self):
+        """The share of each transaction type in the measured transactions.
+        A DELIVERY counts once per warehouse (as a card of the deck), not once
+        for each of the districts that it was run for."""
+        self.closeIntervals()
+        cards = { }
+        for txn_name in self.txn_counters.keys():
+            cards[txn_name] = self.txn_counters[txn_name]
+            if txn_name == constants.TransactionTypes.DELIVERY:
+                cards[txn_name] /= float(constants.DISTRICTS_PER_WAREHOUSE)
+        total = sum(cards.values())
+        return dict(map(lambda x: (x, cards[x] / total if total > 0 else 0.0), cards.keys()))
+        
+    def tpmC(self, duration):
+        """The number of NEW_ORDER transactions completed per minute of the
+        measurement interval. See TPC-C 5.4.1."""
+        self.closeIntervals()
+        return self.txn_counters[constants.TransactionTypes.NEW_ORDER] * 60.0 / duration
+        
+    def timeline(self):
+        """The throughput and latency in every interval, from the first one
+        that a transaction completed in to the last one. The intervals in
+        between that nothing completed in are there too, with no transactions.
+        Every interval has a row for each transaction type and a TOTAL one."""
+        self.closeIntervals()
+        rows = [ ]
+        if not self.interval_times: return (rows)
+        first = min(self.interval_times.keys())
+        last = max(self.interval_times.keys())
+        for index in range(first, last+1):
+            counters = self.interval_counters.get(index, { })
+            times = self.interval_times.get(index, { })
+            total_hdr = makeIntervalHistogram()
+            for txn_name in sorted(self.txn_counters.keys()) + [ "TOTAL" ]:
+                if txn_name == "TOTAL":
+                    txn_cnt = sum(counters.values())
+                    hdr = total_hdr
+                else:
+                    txn_cnt = counters.get(txn_name, 0)
+                    hdr = makeIntervalHistogram()
+                    if txn_name in times:
+                        hdr.decode_and_add(times[txn_name])
+                        total_hdr.add(hdr)
+                ## IF
+                row = {
+                    "time": index * self.interval,
+                    "elapsed": (index - first) * self.interval,
+                    "txn": txn_name,
+                    "count": txn_cnt,
+                    "rate": txn_cnt / float(self.interval),
+                }
+                for p in TIMELINE_PERCENTILES:
+                    row["p%d" % p] = hdr.get_value_at_percentile(p) if txn_cnt > 0 else None
+                row["max"] = hdr.get_max_value() if txn_cnt > 0 else None
+                rows.append(row)
+            ## FOR
+        ## FOR
+        return (rows)
+        
+    def saveTimeline(self, path):
+        """Write the timeline() to the given file, as CSV if its name ends
+        with .csv and as JSON otherwise"""
+        rows = self.timeline()
+        columns = [ "time", "elapsed", "txn", "count", "rate" ] + [ "p%d" % p for p in TIMELINE_PERCENTILES ] + [ "max" ]
+        with open(path, "w") as fd:
+            if path.lower().endswith(".csv"):
+                fd.write(",".join(columns) + "\n")
+                for row in rows:
+                    fd.write(",".join(map(lambda c: "" if row[c] == None else str(row[c]), columns)) + "\n")
+            else:
+                json.dump({ "interval": self.interval, "timeline": rows }, fd, indent=2, sort_keys=True)
+        ## WITH
+        
+    def save(self, path, duration = None):
+        """Write the counts, the (encoded) histograms and the timeline to the
+        given file as JSON, from which load() makes the Results again. The
+        duration is the length of the measurement interval."""
+        self.closeIntervals()
+        encode = lambda hdr: hdr if isinstance(hdr, basestring) else hdr.encode()
+        data = {
+            "start": self.start,
+            "stop": self.stop,
+            "duration": duration,
+            "interval": self.interval,
+            "txn_counters": self.txn_counters,
+            "txn_times": dict([ (txn_name, encode(self.txn_times[txn_name])) for txn_name in self.txn_times.keys() ]),
+            "txn_retries": self.txn_retries,
+            "txn_aborts": self.txn_aborts,
+            "deferred_count": self.deferred_count,
+            "deferred_queue_times": encode(self.deferred_queue_times),
+            "deferred_times": encode(self.deferred_times),
+            ## JSON only has string keys
+            "interval_counters": dict([ (str(index), self.interval_counters[index]) for index in self.interval_counters.keys() ]),
+            "interval_times": dict([ (str(index), self.interval_times[index]) for index in self.interval_times.keys() ]),
+        }
+        with open(path, "w") as fd:
+            json.dump(data, fd, indent=2, sort_keys=True)
+        
     def __str__(self):
         return self.show()
         
-    def show(self, arg_duration, load_time = None):
+    def show(self, load_time = None, duration = None):
+        """Format the results. The duration is the length of the measurement
+        interval, which defaults to the whole run (including the warmup)."""
         if self.start == None:
             return "Benchmark not started"
-        if self.stop == None:
-            duration = time.time() - self.start
-        else:
-            duration = self.stop - self.start
+        self.closeIntervals()
+        if duration == None:
+            if self.stop == None:
+                duration = time.time() - self.start
+            else:
+                duration = self.stop - self.start
         
         col_width = 16
-        total_width = (col_width*4)+2
-        f = "\n  " + (("%-" + str(col_width) + "s")*4)
+        total_width = (col_width*6)+2
+        f = "\n  " + (("%-" + str(col_width) + "s")*6)
         line = "-"*total_width
 
         ret = u"" + "="*total_width + "\n"
         if load_time != None:
             ret += "Data Loading Time: %d seconds\n\n" % (load_time)
         
-        ret += "Execution Results after %d seconds\n%s" % (arg_duration, line)
-        ret += f % ("", "Executed", u"Time (µs)", "Rate")
+        ret += "Execution Results after %d seconds\n%s" % (duration, line)
+        ret += f % ("", "Executed", u"Median (µs)", u"90th (µs)", "Rate", "Mix")
         
-        total_time = 0
+        mix = self.mix()
+        total_hdr = makeHistogram()
         total_cnt = 0
         for txn in sorted(self.txn_counters.keys()):
-            txn_time = self.txn_times[txn]
+            txn_hdr = self.txn_times[txn]
             txn_cnt = self.txn_counters[txn]
-            rate = u"%.02f txn/s" % ((txn_cnt / txn_time))
-            ret += f % (txn, str(txn_cnt), str(txn_time * 1000000), rate)
+            rate = u"%.02f txn/s" % (txn_cnt / float(duration))
+            ret += f % (txn, str(txn_cnt), str(txn_hdr.get_value_at_percentile(50)), str(txn_hdr.get_value_at_percentile(90)), rate, "%.02f%%" % (mix[txn] * 100))
             
-            total_time += txn_time
+            total_hdr.add(txn_hdr)
             total_cnt += txn_cnt
         ret += "\n" + ("-"*total_width)
-        total_rate = "%.02f txn/s" % ((total_cnt / total_time))
-        ret += f % ("TOTAL", str(total_cnt), str(total_time * 1000000), total_rate)
+        total_rate = "%.02f txn/s" % (total_cnt / float(duration))
+        ret += f % ("TOTAL", str(total_cnt), str(total_hdr.get_value_at_percentile(50)), str(total_hdr.get_value_at_percentile(90)), total_rate, "")
+        ret += "\n\n%.02f tpmC" % self.tpmC(duration)
+        
+        ## The DELIVERY transactions that were deferred, if they were
+        if self.deferred_count > 0:
+            ret += "\n\nDeferred DELIVERY\n%s" % line
+            ret += f % ("", "Executed", u"Median (µs)", u"90th (µs)", "Rate", "")
+            ret += f % ("Queueing", str(self.deferred_count), str(self.deferred_queue_times.get_value_at_percentile(50)), \
+                        str(self.deferred_queue_times.get_value_at_percentile(90)), "%.02f txn/s" % (self.deferred_count / float(duration)), "")
+            ret += f % ("Processing", str(self.deferred_count), str(self.deferred_times.get_value_at_percentile(50)), \
+                        str(self.deferred_times.get_value_at_percentile(90)), "", "")
+        ## IF
+        
+        ## The retries and aborts, only if there were any
+        if any(self.txn_retries.values()) or any(self.txn_aborts.values()):
+            ret += "\n\nRetries and Aborts\n%s" % line
+            ret += f % ("", "Attempts", "Retries", "Aborts", "", "")
+            for txn in sorted(self.txn_counters.keys()):
+                retries = self.txn_retries[txn]
+                aborts = self.txn_aborts[txn]
+                ret += f % (txn, str(self.attempts(txn)), str(sum(retries.values())), str(sum(aborts.values())), "", "")
+                for reason in sorted(set(retries.keys() + aborts.keys())):
+                    ret += f % ("  " + str(reason), "", str(retries.get(reason, 0)), str(aborts.get(reason, 0)), "", "")
+            ## FOR
+        ## IF
 
         return (ret.encode('utf-8'))
 ## CLASS
+
+## ==============================================
+## load
+## ==============================================
+def load(path):
+    """Read the Results that save() wrote to the given file. Returns them
+    along with the duration of their measurement interval."""
+    with open(path, "r") as fd:
+        data = json.load(fd)
+    r = Results()
+    r.start = data["start"]
+    r.stop = data["stop"]
+    r.interval = data["interval"]
+    r.interval_length = r.interval * 1000000000
+    for txn_name in data["txn_counters"].keys():
+        txn_name = str(txn_name)
+        r.txn_counters[txn_name] = data["txn_counters"][txn_name]
+        r.txn_times[txn_name].decode_and_add(str(data["txn_times"][txn_name]))
+        addCounts(r.txn_retries[txn_name], data["txn_retries"][txn_name])
+        addCounts(r.txn_aborts[txn_name], data["txn_aborts"][txn_name])
+    ## FOR
+    r.deferred_count = data["deferred_count"]
+    r.deferred_queue_times.decode_and_add(str(data["deferred_queue_times"]))
+    r.deferred_times.decode_and_add(str(data["deferred_times"]))
+    for index in data["interval_times"].keys():
+        r.interval_counters[int(index)] = dict([ (str(txn_name), cnt) for txn_name, cnt in data["interval_counters"][index].items() ])
+        r.interval_times[int(index)] = dict([ (str(txn_name), str(hdr)) for txn_name, hdr in data["interval_times"][index].items() ])
+    ## FOR
+    return (r, data["duration"])
+## DEF
@@ -59,7 +59,7 @@ def createDriverClass(name):
 ## ==============================================
 ## loaderFunc
 ## ==============================================
-def loaderFunc(driverClass, scaleParameters, args, config, w_ids, debug):
+def loaderFunc(driverClass, scaleParameters, args, config, w_ids, debug, itemShare = (0, 1)):
     driver = driverClass(args['ddl'])
     assert driver != None
     logging.debug("Starting client execution: %s [warehouses=%d]" % (driver, len(w_ids)))
@@ -70,11 +70,12 @@ def loaderFunc(driverClass, scaleParameters, args, config, w_ids, debug):
     driver.loadConfig(config)
    
     try:
-        loadItems = (1 in w_ids)
-        l = loader.Loader(driver, scaleParameters, w_ids, loadItems)
+        ## Every worker loads its share of the ITEM table
+        l = loader.makeLoader(driver, scaleParameters, w_ids, True, args, config, itemShare)
         driver.loadStart()
-        l.execute()
+        load_stats = l.execute()
         driver.loadFinish()   
+        return (load_stats)
     except KeyboardInterrupt:
             return -1
     except (Exception, AssertionError), ex:
@@ -89,19 +90,46 @@ def loaderFunc(driverClass, scaleParameters, args, config, w_ids, debug):
 ## ==============================================
 ## executorFunc
 ## ==============================================
-def executorFunc(driverClass, scaleParameters, args, config, debug):
-    driver = driverClass(args['ddl'])
-    assert driver != None
-    logging.debug("Starting client execution: %s" % driver)
-    
+def executorFunc(driverClass, scaleParameters, args, config, debug, clientId = 0):
     config['execute'] = True
     config['reset'] = False
-    driver.loadConfig(config)
-
-    e = executor.Executor(driver, scaleParameters, stop_on_error=args['stop_on_error'])
-    driver.executeStart()
-    results = e.execute(args['duration'], args['warmup'])
-    driver.executeFinish()
+    
+    ## The DELIVERY transactions of all of the terminals of this client are
+    ## deferred to the same queue
+    deliveries = deliveryqueue.makeDeliveryQueue(driverClass, args, config, clientId)
+    
+    streams = None
+    driver = None
+    if args.get('replay'):
+        e, driver = replay.makeReplayExecutor(driverClass, args, config, clientId)
+        logging.debug("Starting client execution: %s [replay=%s]" % (driver, args['replay']))
+    elif args['threads'] > 1:
+        ## The threads each create and start their own driver
+        e = threadedexecutor.makeThreadedExecutor(driverClass, scaleParameters, args, config, clientId, deliveries)
+    elif args['terminals'] > 1 or args.get('client_rate') or args.get('emulate_terminals'):
+        e, driver = asyncexecutor.makeAsyncExecutor(driverClass, scaleParameters, args, config, clientId, deliveries)
+        logging.debug("Starting client execution: %s [terminals=%d]" % (driver, args['terminals']))
+    else:
+        driver = driverClass(args['ddl'])
+        assert driver != None
+        logging.debug("Starting client execution: %s" % driver)
+        driver.loadConfig(config)
+        homes = executor.makeTerminalHomes(scaleParameters, args, 1)
+        streams = paramstream.makeParameterStreams(scaleParameters, args, clientId, [ None ], homes)
+        e = executor.Executor(driver, scaleParameters, stop_on_error=args['stop_on_error'], seed=args.get('seed'), clientId=clientId, \
+                              stream=streams.get(0) if streams != None else None, home=homes[0] if homes != None else None, mix=args.get('mix'), \
+                              skew=args.get('skew'), retry=executor.makeRetryPolicy(driverClass, args, clientId), deliveries=deliveries)
+    
+    if driver != None: driver.executeStart()
+    if deliveries != None: deliveries.start()
+    try:
+        results = e.execute(args['duration'], args['warmup'])
+    finally:
+        if streams != None: streams.close()
+    if driver != None: driver.executeFinish()
+    
+    ## The queued DELIVERY transactions are run to the end
+    if deliveries != None and results != -1: results.merge(deliveries.finish())
     
     return results
 ## DEF
@@ -116,6 +144,7 @@ if __name__=='__channelexec__':
 	   args=command.data[1]
 	   config=command.data[2]
 	   w_ids=command.data[3]
+           itemShare=command.data[4]
 	   
 	   ## Create a handle to the target client driver at the client side
            driverClass = createDriverClass(args['system'])
@@ -123,13 +152,14 @@ if __name__=='__channelexec__':
            driver = driverClass(args['ddl'])
            assert driver != None, "Failed to create '%s' driver" % args['system']
         
-           loaderFunc(driverClass,scaleParameters,args,config,w_ids,True)
-	   m=message.Message(header=message.LOAD_COMPLETED)
+           load_stats=loaderFunc(driverClass,scaleParameters,args,config,w_ids,True,itemShare)
+	   m=message.Message(header=message.LOAD_COMPLETED,data=load_stats)
            channel.send(pickle.dumps(m,-1))          
        elif command.header==message.CMD_EXECUTE:
 	   scaleParameters=command.data[0]
 	   args=command.data[1]
 	   config=command.data[2]
+           clientId=command.data[3]
 	  
 	   ## Create a handle to the target client driver at the client side
 	   if driverClass==None:
@@ -138,20 +168,30 @@ if __name__=='__channelexec__':
                driver = driverClass(args['ddl'])
                assert driver != None, "Failed to create '%s' driver" % args['system']
            
-           results=executorFunc(driverClass,scaleParameters,args,config,True)
-           d = constants.TransactionTypes.DELIVERY
-           no = constants.TransactionTypes.NEW_ORDER
-           os = constants.TransactionTypes.ORDER_STATUS
-           p = constants.TransactionTypes.PAYMENT
-           sl = constants.TransactionTypes.STOCK_LEVEL
-           results.txn_times[d] = results.txn_times[d].encode()
-           results.txn_times[no] = results.txn_times[no].encode()
-           results.txn_times[os] = results.txn_times[os].encode()
-           results.txn_times[p] = results.txn_times[p].encode()
-           results.txn_times[sl] = results.txn_times[sl].encode()
+           results=executorFunc(driverClass,scaleParameters,args,config,True,clientId)
+           ## Encodes the histograms of the timeline too
+           results.encode()
            m=message.Message(header=message.EXECUTE_COMPLETED,data=results)
            channel.send(pickle.dumps(m,-1))
            
+       elif command.header==message.CMD_LOAD_FINISH_ITEM:
+	   args=command.data[0]
+	   config=command.data[1]
+           
+           ## The workers each loaded part of the ITEM table, so the
+           ## coordinator has one of them tell the driver that it is done
+	   if driverClass==None:
+               driverClass = createDriverClass(args['system'])
+               assert driverClass != None, "Failed to find '%s' class" % args['system']
+           driver = driverClass(args['ddl'])
+           config['load'] = True
+           config['execute'] = False
+           config['reset'] = False
+           driver.loadConfig(config)
+           loader.finishSplitItems(driver, args)
+           m=message.Message(header=message.LOAD_FINISH_ITEM_COMPLETED)
+           channel.send(pickle.dumps(m,-1))
+           
        elif command.header==message.CMD_STOP:
 	   pass
        else:
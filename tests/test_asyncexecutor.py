@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import logging
+import unittest
+
+import tests
+import constants
+from drivers.abstractdriver import AbstractDriver
+from runtime import asyncexecutor
+from runtime import executor
+from util import rand
+from util import results
+from util import scaleparameters
+
+DELIVERY = constants.TransactionTypes.DELIVERY
+NEW_ORDER = constants.TransactionTypes.NEW_ORDER
+
+class Conflict(Exception):
+    pass
+## CLASS
+
+class FlakyDriver(AbstractDriver):
+    """Fails the first attempt of the transactions whose d_id is in failDistricts
+    (all of them if it is None) with a retriable error, and completes everything else"""
+    
+    def __init__(self, failDistricts = None):
+        super(FlakyDriver, self).__init__("flaky", None)
+        self.failDistricts = failDistricts
+        self.failed = set()
+        ## The parameters are kept so that their ids are not reused
+        self.params = [ ]
+        self.calls = 0
+        self.retries = 0
+    
+    @classmethod
+    def isRetriable(cls, error):
+        return isinstance(error, Conflict)
+    
+    def executeTransactionAsync(self, txn, params, callback):
+        self.calls += 1
+        self.params.append(params)
+        key = (id(params), params["d_id"])
+        if key in self.failed:
+            self.retries += 1
+        elif self.failDistricts == None or params["d_id"] in self.failDistricts:
+            self.failed.add(key)
+            callback(None, Conflict())
+            return
+        callback(None, None)
+    ## DEF
+## CLASS
+
+class TestEmulatedTerminalExecutor(unittest.TestCase):
+    
+    def setUp(self):
+        ## The aborts are logged as warnings
+        logging.disable(logging.WARNING)
+    
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+    
+    def execute(self, driver, mix, retries, backoff, duration):
+        """Run the terminals of a warehouse without keying and think times,
+        returning the Results and the number of transactions that were started"""
+        sp = scaleparameters.makeWithScaleFactor(1, 100)
+        retry = executor.RetryPolicy(FlakyDriver, retries, backoff, rand.makeStream(3, "retry"))
+        e = asyncexecutor.EmulatedTerminalExecutor(driver, sp, [ 1 ], timeScale=0, seed=3, mix=mix, retry=retry)
+        starts = [ 0 ]
+        startTransaction = results.Results.startTransaction
+        def countStarts(r, txn, start = None):
+            starts[0] += 1
+            return startTransaction(r, txn, start)
+        ## DEF
+        results.Results.startTransaction = countStarts
+        try:
+            r = e.execute(duration, 0)
+        finally:
+            results.Results.startTransaction = startTransaction
+        return (r, starts[0])
+    ## DEF
+    
+    def testDeliveryDistrictRetries(self):
+        ## Every district is a transaction of its own, with its own start
+        ## time and retries, even after the one before it was retried
+        driver = FlakyDriver([ 1, 2 ])
+        r, starts = self.execute(driver, { DELIVERY: 1 }, 1, 0.0, 0.3)
+        self.assertTrue(driver.retries > 0)
+        self.assertEqual(starts, driver.calls - driver.retries)
+        self.assertEqual(r.txn_aborts[DELIVERY], { })
+        self.assertEqual(sum(r.txn_retries[DELIVERY].values()), driver.retries)
+    ## DEF
+    
+    def testRetriesAfterTheEnd(self):
+        ## The retries whose backoff ends after the run are aborted, and all
+        ## of the others are run
+        driver = FlakyDriver()
+        r, starts = self.execute(driver, { NEW_ORDER: 1 }, 1, constants.MAX_RETRY_BACKOFF, 0.3)
+        self.assertEqual(sum(r.txn_retries[NEW_ORDER].values()), driver.retries)
+        self.assertTrue(sum(r.txn_aborts[NEW_ORDER].values()) > 0)
+        self.assertEqual(starts, driver.calls - driver.retries)
+    ## DEF
+## CLASS
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import unittest
+
+import tests
+from runtime import batchsizer
+
+class BoundedHandle:
+    def __init__(self, bounds):
+        self.bounds = bounds
+    
+    def loadBatchBounds(self, tableName):
+        return self.bounds
+## CLASS
+
+class TestBatchSizer(unittest.TestCase):
+    
+    def testInitialSize(self):
+        self.assertEqual(batchsizer.BatchSizer(BoundedHandle((10, 100)), 50).size("ITEM"), 50)
+        self.assertEqual(batchsizer.BatchSizer(BoundedHandle((10, 100)), 500).size("ITEM"), 100)
+        self.assertEqual(batchsizer.BatchSizer(BoundedHandle((10, 100)), 1).size("ITEM"), 10)
+        self.assertRaises(AssertionError, batchsizer.BatchSizer(BoundedHandle((0, 100)), 50).size, "ITEM")
+    ## DEF
+    
+    def testRebatch(self):
+        sizer = batchsizer.BatchSizer(BoundedHandle((3, 3)), 3)
+        chunks = [ range(0, 2), range(2, 9), [ ], range(9, 10) ]
+        self.assertEqual(list(sizer.rebatch("ITEM", iter(chunks))), [ range(0, 3), range(3, 6), range(6, 9), [ 9 ] ])
+    ## DEF
+    
+    def testGrowsWhileFaster(self):
+        sizer = batchsizer.BatchSizer(BoundedHandle((100, 1000)), 100)
+        ## A fixed cost per batch makes bigger batches faster
+        sizes = [ ]
+        for i in range(60):
+            size = sizer.size("ITEM")
+            sizer.record("ITEM", size, 0.01 + size * 1e-6)
+            sizes.append(size)
+        ## FOR
+        self.assertEqual(max(sizes), 1000)
+        self.assertTrue(sizes[-1] >= 500)
+        self.assertTrue(min(sizes) >= 100)
+    ## DEF
+    
+    def testShrinksOnSlowBatches(self):
+        sizer = batchsizer.BatchSizer(BoundedHandle((100, 1000)), 800, maxLatency=1.0)
+        sizer.record("STOCK", 800, 5.0)
+        self.assertTrue(sizer.size("STOCK") < 800)
+        for i in range(20):
+            sizer.record("STOCK", sizer.size("STOCK"), 5.0)
+        self.assertEqual(sizer.size("STOCK"), 100)
+        ## The other tables are sized on their own
+        self.assertEqual(sizer.size("ITEM"), 800)
+    ## DEF
+## CLASS
+
+if __name__ == '__main__':
+    unittest.main()
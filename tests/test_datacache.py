@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import tests
+from runtime import datacache
+from util import scaleparameters
+
+class TestDataCache(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.scaleParameters = scaleparameters.makeWithScaleFactor(1, 100)
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def testKey(self):
+        a = datacache.DataCache(self.directory, self.scaleParameters, 1)
+        self.assertEqual(a.directory, datacache.DataCache(self.directory, self.scaleParameters, 1).directory)
+        ## The number of warehouses is not part of the key
+        more = scaleparameters.makeWithScaleFactor(4, 100)
+        self.assertEqual(a.directory, datacache.DataCache(self.directory, more, 1).directory)
+        self.assertNotEqual(a.directory, datacache.DataCache(self.directory, self.scaleParameters, 2).directory)
+        smaller = scaleparameters.makeWithScaleFactor(1, 50)
+        self.assertNotEqual(a.directory, datacache.DataCache(self.directory, smaller, 1).directory)
+    ## DEF
+    
+    def testReplay(self):
+        cache = datacache.DataCache(self.directory, self.scaleParameters, 1)
+        unit = ("STOCK", 1, 1, 1000, set([ 3, 5 ]))
+        self.assertFalse(cache.contains(unit))
+        
+        written = [ ("STOCK", [ [ i, 1, "x" * i ] for i in range(1, 100) ]), ("STOCK", [ ]), ("STOCK", [ [ 100, 1, "y" ] ]) ]
+        w = cache.open(unit)
+        for tableName, tuples in written:
+            w.write(tableName, tuples)
+        ## Nothing can be replayed until the unit is committed
+        self.assertFalse(cache.contains(unit))
+        w.commit()
+        self.assertTrue(cache.contains(unit))
+        self.assertEqual(list(cache.replay(unit)), written)
+    ## DEF
+    
+    def testAbort(self):
+        cache = datacache.DataCache(self.directory, self.scaleParameters, 1)
+        unit = ("DISTRICT", 1, 2)
+        w = cache.open(unit)
+        self.assertEqual(list(w.record("ORDERS", iter([ [ [ 1 ] ], [ [ 2 ] ] ]))), [ [ [ 1 ] ], [ [ 2 ] ] ])
+        w.abort()
+        self.assertFalse(cache.contains(unit))
+        self.assertEqual(os.listdir(cache.directory), [ ])
+    ## DEF
+## CLASS
+
+if __name__ == '__main__':
+    unittest.main()
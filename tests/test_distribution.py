@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import math
+import unittest
+import collections
+
+import tests
+from util import distribution
+from util import rand
+from util import scaleparameters
+
+class TestSkew(unittest.TestCase):
+    
+    def testParseSkew(self):
+        self.assertEqual(distribution.parseSkew(None), distribution.DEFAULT_SKEW)
+        skew = distribution.parseSkew("warehouse=zipfian, Item=hotspot:0.1:0.9,customer=latest:0.5,remote-payment=50")
+        self.assertEqual(skew[distribution.WAREHOUSE], (distribution.ZIPFIAN, distribution.ZIPFIAN_THETA))
+        self.assertEqual(skew[distribution.ITEM], (distribution.HOTSPOT, 0.1, 0.9))
+        self.assertEqual(skew[distribution.CUSTOMER], (distribution.LATEST, 0.5))
+        self.assertEqual(skew[distribution.DISTRICT], distribution.DEFAULT_SKEW[distribution.DISTRICT])
+        self.assertEqual(skew[distribution.REMOTE_PAYMENT], 50)
+        self.assertEqual(skew[distribution.REMOTE_ITEM], distribution.DEFAULT_SKEW[distribution.REMOTE_ITEM])
+        for value in [ "warehouse", "foo=uniform", "warehouse=nurand", "item=zipfian:1.5", "item=zipfian:x", \
+                       "item=hotspot:0.5", "item=bogus", "remote-item=101", "remote-item=zipfian" ]:
+            self.assertRaises(Exception, distribution.parseSkew, value)
+    ## DEF
+    
+    def testSamplerRanges(self):
+        r = rand.makeStream(3, "skew")
+        for spec in [ (distribution.UNIFORM, ), (distribution.NURAND, ), (distribution.ZIPFIAN, 0.99), \
+                      (distribution.LATEST, 0.5), (distribution.HOTSPOT, 0.2, 0.8), (distribution.HOTSPOT, 1.0, 0.5) ]:
+            for minimum, maximum in [ (1, 1), (1, 2), (5, 17), (1, 100000) ]:
+                sampler = distribution.makeSampler(distribution.ITEM, spec, minimum, maximum)
+                values = [ sampler.next(r) for i in range(2000) ]
+                self.assertTrue(minimum <= min(values) and max(values) <= maximum, "%s [%d, %d]" % (spec, minimum, maximum))
+            ## FOR
+        ## FOR
+    ## DEF
+    
+    def testSamplerSkew(self):
+        r = rand.makeStream(3, "skew")
+        counts = collections.Counter([ distribution.Zipfian(1, 100).next(r) for i in range(20000) ])
+        self.assertEqual(counts.most_common(1)[0][0], 1)
+        self.assertTrue(counts[1] > counts[2] > counts[10])
+        counts = collections.Counter([ distribution.Latest(1, 100).next(r) for i in range(20000) ])
+        self.assertEqual(counts.most_common(1)[0][0], 100)
+        hot = len([ x for x in [ distribution.Hotspot(1, 100, 0.1, 0.9).next(r) for i in range(20000) ] if x <= 10 ])
+        self.assertTrue(0.87 < hot / 20000.0 < 0.93)
+    ## DEF
+    
+    def testZeta(self):
+        self.assertEqual(distribution.zeta(1, 0.5), 1.0)
+        self.assertAlmostEqual(distribution.zeta(2, 0.5), 1.0 + 2 ** -0.5)
+        ## The constant does not depend on the order that the terms are added in
+        terms = [ i ** -0.99 for i in xrange(1, 10001) ]
+        self.assertEqual(distribution.zeta(10000, 0.99), math.fsum(reversed(terms)))
+        self.assertEqual(distribution.zeta(10000, 0.99), math.fsum(sorted(terms)))
+    ## DEF
+    
+    def testDefaultSkew(self):
+        ## The default samplers draw the same numbers as the specification does
+        sp = scaleparameters.makeWithScaleFactor(4, 10)
+        skew = distribution.Skew(None, sp)
+        a = rand.makeStream(3, "skew")
+        b = rand.makeStream(3, "skew")
+        for i in range(1000):
+            self.assertEqual(skew.warehouse.next(a), b.number(sp.starting_warehouse, sp.ending_warehouse))
+            self.assertEqual(skew.district.next(a), b.number(1, sp.districtsPerWarehouse))
+            self.assertEqual(skew.customer.next(a), b.NURand(1023, 1, sp.customersPerDistrict))
+            self.assertEqual(skew.item.next(a), b.NURand(8191, 1, sp.items))
+        ## FOR
+    ## DEF
+    
+    def testSameSeedSameIds(self):
+        sp = scaleparameters.makeWithScaleFactor(4, 10)
+        skew = distribution.Skew(distribution.parseSkew("warehouse=zipfian,item=hotspot,customer=latest"), sp)
+        def draw(seed):
+            r = rand.makeStream(seed, "skew")
+            return [ (skew.warehouse.next(r), skew.item.next(r), skew.customer.next(r), skew.home(3).next(r)) for i in range(500) ]
+        ## DEF
+        self.assertEqual(draw(3), draw(3))
+        self.assertNotEqual(draw(3), draw(4))
+    ## DEF
+## CLASS
+
+if __name__ == '__main__':
+    unittest.main()
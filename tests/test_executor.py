@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import sqlite3
+import unittest
+from datetime import datetime
+
+import tests
+import constants
+from drivers.sqlitedriver import SqliteDriver
+from runtime import executor
+from util import rand
+from util import scaleparameters
+
+def makeTransactions(e, count):
+    """The next count (txn, params) of the Executor, without the timestamps"""
+    txns = [ ]
+    for i in range(count):
+        txn, params = e.doOne()
+        txns.append((txn, dict([ (k, v) for k, v in params.items() if not isinstance(v, datetime) ])))
+    ## FOR
+    return (txns)
+## DEF
+
+class TestHomeWarehouses(unittest.TestCase):
+    
+    def testClientWarehouses(self):
+        sp = scaleparameters.makeWithScaleFactor(6, 100)
+        homes = executor.assignClientWarehouses(sp, 4)
+        self.assertEqual(homes, [ [ 1, 5 ], [ 2, 6 ], [ 3 ], [ 4 ] ])
+        
+        ## The clients of each node get an even share of the warehouses
+        homes = executor.assignClientWarehouses(sp, 4, [ "a", "a", "b", "b" ])
+        self.assertEqual(sorted(sum(homes, [ ])), range(1, 7))
+        self.assertEqual(len(homes[0] + homes[1]), 3)
+        self.assertEqual(len(homes[2] + homes[3]), 3)
+        
+        ## With fewer warehouses than clients, the clients share them
+        homes = executor.assignClientWarehouses(scaleparameters.makeWithScaleFactor(2, 100), 5)
+        self.assertEqual(homes, [ [ 1 ], [ 2 ], [ 1 ], [ 2 ], [ 1 ] ])
+    ## DEF
+    
+    def testTerminalHomes(self):
+        self.assertEqual(executor.assignTerminalHomes([ 1, 2, 3 ], 2), [ ([ 1, 3 ], None), ([ 2 ], None) ])
+        
+        homes = executor.assignTerminalHomes([ 4, 5 ], 20)
+        self.assertEqual([ w_ids for w_ids, d_id in homes ], [ [ 4 ], [ 5 ] ] * 10)
+        ## The terminals of a warehouse each get their own district
+        for w_id in [ 4, 5 ]:
+            d_ids = [ d_id for w_ids, d_id in homes if w_ids == [ w_id ] ]
+            self.assertEqual(sorted(d_ids), range(1, constants.DISTRICTS_PER_WAREHOUSE+1))
+    ## DEF
+    
+    def testHomeTransactions(self):
+        sp = scaleparameters.makeWithScaleFactor(4, 100)
+        e = executor.Executor(None, sp, seed=3, home=([ 2, 3 ], 7))
+        for txn, params in makeTransactions(e, 500):
+            self.assertTrue(params["w_id"] in [ 2, 3 ])
+            if txn == constants.TransactionTypes.STOCK_LEVEL:
+                self.assertEqual(params["d_id"], 7)
+        ## FOR
+    ## DEF
+    
+    def testSameSeedSameTransactions(self):
+        sp = scaleparameters.makeWithScaleFactor(4, 100)
+        make = lambda seed, terminalId: executor.Executor(None, sp, seed=seed, clientId=1, terminalId=terminalId, home=([ 1, 4 ], None))
+        self.assertEqual(makeTransactions(make(3, 2), 200), makeTransactions(make(3, 2), 200))
+        self.assertNotEqual(makeTransactions(make(3, 2), 200), makeTransactions(make(3, 5), 200))
+        self.assertNotEqual(makeTransactions(make(3, 2), 200), makeTransactions(make(4, 2), 200))
+    ## DEF
+## CLASS
+
+class TestMix(unittest.TestCase):
+    
+    def testParseMix(self):
+        self.assertEqual(executor.parseMix(None), constants.MIX_PROFILES[constants.DEFAULT_MIX])
+        self.assertEqual(executor.parseMix("legacy"), constants.MIX_PROFILES["legacy"])
+        self.assertEqual(executor.parseMix("new_order=3, Payment=2,DELIVERY=0"), \
+                         { constants.TransactionTypes.NEW_ORDER: 3, constants.TransactionTypes.PAYMENT: 2 })
+        for value in [ "bogus", "NEW_ORDER", "NEW_ORDER=x", "NEW_ORDER=-1", "FOO=1", "NEW_ORDER=0" ]:
+            self.assertRaises(Exception, executor.parseMix, value)
+    ## DEF
+    
+    def testEveryDeckHasTheMix(self):
+        mix = constants.MIX_PROFILES["spec"]
+        deck = executor.MixDeck(mix, rand.makeStream(3, "deck"))
+        size = sum(mix.values())
+        for i in range(20):
+            cards = [ deck.next() for j in range(size) ]
+            for txn in mix.keys():
+                self.assertEqual(cards.count(txn), mix[txn])
+        ## FOR
+    ## DEF
+    
+    def testSameSeedSameDeal(self):
+        def deal(seed):
+            deck = executor.MixDeck(None, rand.makeStream(seed, "deck"))
+            return [ deck.next() for i in range(230) ]
+        ## DEF
+        self.assertEqual(deal(3), deal(3))
+        self.assertNotEqual(deal(3), deal(4))
+    ## DEF
+## CLASS
+
+class TestRetryPolicy(unittest.TestCase):
+    
+    def testShouldRetry(self):
+        locked = sqlite3.OperationalError("database is locked")
+        policy = executor.RetryPolicy(SqliteDriver, 2, 0.01, rand.makeStream(3, "retry"))
+        self.assertTrue(policy.shouldRetry(locked, 0))
+        self.assertTrue(policy.shouldRetry(locked, 1))
+        self.assertFalse(policy.shouldRetry(locked, 2))
+        self.assertFalse(policy.shouldRetry(sqlite3.IntegrityError("UNIQUE constraint failed"), 0))
+        self.assertEqual(policy.reason(locked), "locked")
+        self.assertEqual(policy.reason(KeyError("x")), "KeyError")
+        
+        ## By default nothing is retried
+        self.assertFalse(executor.RetryPolicy().shouldRetry(locked, 0))
+        self.assertEqual(executor.RetryPolicy().reason(locked), "OperationalError")
+    ## DEF
+    
+    def testBackoff(self):
+        policy = executor.RetryPolicy(SqliteDriver, 20, 0.01, rand.makeStream(3, "retry"))
+        for attempt in range(20):
+            limit = min(0.01 * 2 ** attempt, constants.MAX_RETRY_BACKOFF)
+            backoffs = [ policy.backoff(attempt) for i in range(200) ]
+            self.assertTrue(0 <= min(backoffs) and max(backoffs) <= limit)
+            ## The backoffs are spread over the whole range
+            self.assertTrue(max(backoffs) > limit / 2)
+        ## FOR
+        
+        ## The same seed gives the same backoffs
+        a = executor.makeRetryPolicy(SqliteDriver, { "seed": 3, "retries": 1 }, 1, 2)
+        b = executor.makeRetryPolicy(SqliteDriver, { "seed": 3, "retries": 1 }, 1, 2)
+        self.assertEqual([ a.backoff(i) for i in range(10) ], [ b.backoff(i) for i in range(10) ])
+    ## DEF
+## CLASS
+
+if __name__ == '__main__':
+    unittest.main()
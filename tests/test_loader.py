@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import os
+import glob
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+import tests
+import constants
+from drivers.abstractdriver import AbstractDriver
+from runtime import loader
+from util import records
+from util import scaleparameters
+
+## ==============================================
+## RecordingDriver
+## ==============================================
+nextRecordingId = 0
+recordingIdLock = threading.Lock()
+
+class RecordingDriver(AbstractDriver):
+    """Appends every loadTuples call to a file of its own in the configured
+    directory, so that the loader processes and threads can use it too"""
+    
+    def __init__(self, ddl):
+        super(RecordingDriver, self).__init__("recording", ddl)
+        self.path = None
+    
+    def makeDefaultConfig(self):
+        return { "directory": ("Where the tuples are recorded", None) }
+    
+    def loadConfig(self, config):
+        global nextRecordingId
+        with recordingIdLock:
+            recordingId = nextRecordingId
+            nextRecordingId += 1
+        self.path = os.path.join(config["directory"], "%d-%d.dat" % (os.getpid(), recordingId))
+    
+    def loadTuples(self, tableName, tuples):
+        with open(self.path, "ab") as f:
+            records.writeRecord(f, (tableName, tuples))
+## CLASS
+
+def readTables(directory):
+    """Return the sorted tuples that were recorded for each table. The
+    timestamps are the time of the load, so they are left out."""
+    tables = { }
+    for path in glob.glob(os.path.join(directory, "*.dat")):
+        with open(path, "rb") as f:
+            for (tableName, tuples), offset in records.readRecords(f):
+                rows = tables.setdefault(tableName, [ ])
+                for t in tuples:
+                    rows.append(tuple([ None if isinstance(v, datetime) else v for v in t ]))
+        ## WITH
+    ## FOR
+    for rows in tables.values():
+        rows.sort()
+    return (tables)
+## DEF
+
+class TestLoader(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.scaleParameters = scaleparameters.makeWithScaleFactor(2, 100)
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def load(self, name, seed = 11, w_ids = None, needLoadItems = True, **options):
+        """Load the data with the given Loader options and return its tables"""
+        directory = os.path.join(self.directory, name)
+        os.makedirs(directory)
+        config = { "directory": directory, "reset": False }
+        handle = RecordingDriver(None)
+        handle.loadConfig(config)
+        if w_ids == None: w_ids = range(self.scaleParameters.starting_warehouse, self.scaleParameters.ending_warehouse+1)
+        l = loader.Loader(handle, self.scaleParameters, w_ids, needLoadItems, config=config, seed=seed, **options)
+        handle.loadStart()
+        l.execute()
+        handle.loadFinish()
+        return readTables(directory)
+    ## DEF
+    
+    def testTableSizes(self):
+        tables = self.load("serial")
+        sp = self.scaleParameters
+        districts = sp.warehouses * sp.districtsPerWarehouse
+        self.assertEqual(len(tables[constants.TABLENAME_ITEM]), sp.items)
+        self.assertEqual(len(tables[constants.TABLENAME_WAREHOUSE]), sp.warehouses)
+        self.assertEqual(len(tables[constants.TABLENAME_DISTRICT]), districts)
+        self.assertEqual(len(tables[constants.TABLENAME_CUSTOMER]), districts * sp.customersPerDistrict)
+        self.assertEqual(len(tables[constants.TABLENAME_HISTORY]), districts * sp.customersPerDistrict)
+        self.assertEqual(len(tables[constants.TABLENAME_ORDERS]), districts * sp.customersPerDistrict)
+        self.assertEqual(len(tables[constants.TABLENAME_NEW_ORDER]), districts * sp.newOrdersPerDistrict)
+        self.assertEqual(len(tables[constants.TABLENAME_STOCK]), sp.warehouses * sp.items)
+    ## DEF
+    
+    def testSameSeedSameData(self):
+        self.assertEqual(self.load("first"), self.load("second"))
+        self.assertNotEqual(self.load("third", seed=12), self.load("fourth"))
+    ## DEF
+    
+    def testParallelLoad(self):
+        self.assertEqual(self.load("serial"), self.load("parallel", processes=3))
+    ## DEF
+    
+    def testPipelinedLoad(self):
+        self.assertEqual(self.load("serial"), self.load("pipelined", generators=3, writers=2))
+    ## DEF
+    
+    def testCachedLoad(self):
+        cacheDir = os.path.join(self.directory, "cache")
+        serial = self.load("serial")
+        self.assertEqual(serial, self.load("generated", cacheDir=cacheDir))
+        ## The second load must replay every unit from the cache
+        generateUnit = loader.Loader.generateUnit
+        def fail(l, unit): raise Exception("Generated %s instead of replaying it" % loader.unitName(unit))
+        loader.Loader.generateUnit = fail
+        try:
+            self.assertEqual(serial, self.load("replayed", cacheDir=cacheDir, processes=2))
+        finally:
+            loader.Loader.generateUnit = generateUnit
+    ## DEF
+## CLASS
+
+if __name__ == '__main__':
+    unittest.main()
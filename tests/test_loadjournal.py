@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import os
+import re
+import time
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from distutils.spawn import find_executable
+
+import tests
+import constants
+from drivers.sqlitedriver import SqliteDriver
+from runtime import loader
+from runtime import loadjournal
+from util import scaleparameters
+
+DDL = os.path.join(tests.PYTPCC_DIR, "tpcc.sql")
+
+## The timestamps are the time of the load
+TIMESTAMP = re.compile(r"^\d{4}-\d\d-\d\d \d\d:\d\d:\d\d")
+
+def readDatabase(path):
+    """Return the sorted rows of every table of a SqliteDriver database"""
+    conn = sqlite3.connect(path)
+    tables = { }
+    for tableName in constants.ALL_TABLES:
+        rows = [ tuple([ None if isinstance(v, basestring) and TIMESTAMP.match(v) else v for v in row ]) \
+                 for row in conn.execute("SELECT * FROM %s" % tableName) ]
+        tables[tableName] = sorted(rows)
+    ## FOR
+    conn.close()
+    return (tables)
+## DEF
+
+class TestLoadJournal(unittest.TestCase):
+    
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+    
+    def testEntries(self):
+        journal = loadjournal.openJournal(self.directory, "a", False)
+        journal.started("DISTRICT-1-1")
+        journal.done("DISTRICT-1-1")
+        journal.started("DISTRICT-1-2")
+        journal.finished("WAREHOUSE-1")
+        ## A crash can cut the last entry short
+        journal.output.write(loadjournal.UNIT_DONE[:2])
+        
+        journal = loadjournal.openJournal(self.directory, None, True)
+        self.assertTrue(journal.isDone("DISTRICT-1-1"))
+        self.assertFalse(journal.isPartial("DISTRICT-1-1"))
+        self.assertFalse(journal.isDone("DISTRICT-1-2"))
+        self.assertTrue(journal.isPartial("DISTRICT-1-2"))
+        self.assertFalse(journal.isPartial("DISTRICT-1-3"))
+        self.assertTrue(journal.isFinished("WAREHOUSE-1"))
+        self.assertFalse(journal.isFinished("WAREHOUSE-2"))
+    ## DEF
+    
+    def testSeed(self):
+        self.assertEqual(loadjournal.resumeSeed(self.directory), None)
+        loadjournal.openJournal(self.directory, "a", False).checkSeed(5)
+        ## The latest journal is the one that is resumed
+        time.sleep(0.01)
+        loadjournal.openJournal(self.directory, "b", False).checkSeed(6)
+        self.assertEqual(loadjournal.resumeSeed(self.directory), 6)
+        
+        journal = loadjournal.openJournal(self.directory, None, True)
+        self.assertTrue(journal.path.endswith("load-b.journal"))
+        journal.checkSeed(6)
+        self.assertRaises(AssertionError, journal.checkSeed, 5)
+        self.assertRaises(AssertionError, journal.checkSeed, None)
+    ## DEF
+    
+    def testFinishSplitItems(self):
+        class Handle:
+            finished = 0
+            def loadFinishItem(self):
+                Handle.finished += 1
+        ## CLASS
+        args = { "load_journal": self.directory, "load_id": "a", "resume_load": False }
+        loader.finishSplitItems(Handle(), args)
+        self.assertEqual(Handle.finished, 1)
+        self.assertTrue(loadjournal.openJournal(self.directory, None, True).isFinished(constants.TABLENAME_ITEM))
+        ## A resumed load does not fire it again
+        loader.finishSplitItems(Handle(), dict(args, resume_load=True))
+        self.assertEqual(Handle.finished, 1)
+        ## Without a journal it is always fired
+        loader.finishSplitItems(Handle(), { })
+        self.assertEqual(Handle.finished, 2)
+    ## DEF
+    
+    @unittest.skipIf(find_executable("sqlite3") is None, "the sqlite3 shell is not installed")
+    def testResume(self):
+        scaleParameters = scaleparameters.makeWithScaleFactor(2, 100)
+        w_ids = range(scaleParameters.starting_warehouse, scaleParameters.ending_warehouse+1)
+        journalDir = os.path.join(self.directory, "journal")
+        
+        def load(name, resume, failOn = None):
+            config = { "database": os.path.join(self.directory, name + ".db"), "reset": False }
+            handle = SqliteDriver(DDL)
+            handle.loadConfig(config)
+            if failOn != None:
+                ## Make the tuples of the unit durable and then die before it
+                ## is marked as done
+                def loadFinishDistrict(w_id, d_id):
+                    if (w_id, d_id) == failOn:
+                        handle.conn.commit()
+                        raise Exception("Interrupted")
+                handle.loadFinishDistrict = loadFinishDistrict
+            ## IF
+            journal = None
+            if resume != None:
+                journal = loadjournal.openJournal(journalDir, name, resume)
+                journal.checkSeed(11)
+            l = loader.Loader(handle, scaleParameters, w_ids, True, config=config, seed=11, journal=journal)
+            handle.loadStart()
+            l.execute()
+            handle.loadFinish()
+            return (config["database"])
+        ## DEF
+        
+        expected = readDatabase(load("expected", None))
+        self.assertRaises(Exception, load, "resumed", False, (2, 3))
+        partial = readDatabase(os.path.join(self.directory, "resumed.db"))
+        self.assertTrue(0 < len(partial[constants.TABLENAME_CUSTOMER]) < len(expected[constants.TABLENAME_CUSTOMER]))
+        
+        load("resumed", True)
+        self.assertEqual(expected, readDatabase(os.path.join(self.directory, "resumed.db")))
+    ## DEF
+## CLASS
+
+if __name__ == '__main__':
+    unittest.main()
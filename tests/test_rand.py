@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import unittest
+
+import tests
+from util import rand
+from util import nurand
+
+class TestRand(unittest.TestCase):
+    
+    def testDeriveSeed(self):
+        self.assertEqual(rand.deriveSeed(7, "load", 1, "STOCK"), rand.deriveSeed(7, "load", 1, "STOCK"))
+        self.assertNotEqual(rand.deriveSeed(7, "load", 1, "STOCK"), rand.deriveSeed(7, "load", 2, "STOCK"))
+        self.assertNotEqual(rand.deriveSeed(7, "load", 1), rand.deriveSeed(8, "load", 1))
+        self.assertEqual(rand.deriveSeed(None, "load", 1), None)
+    ## DEF
+    
+    def testSameSeedSameValues(self):
+        a = rand.makeStream(3, "execute", 0)
+        b = rand.makeStream(3, "execute", 0)
+        for i in range(100):
+            self.assertEqual(a.number(1, 1000), b.number(1, 1000))
+            self.assertEqual(a.astring(5, 20), b.astring(5, 20))
+            self.assertEqual(a.fixedPoint(2, 1.0, 5000.0), b.fixedPoint(2, 1.0, 5000.0))
+        ## FOR
+        self.assertEqual(a.numbers(1, 10, 500), b.numbers(1, 10, 500))
+    ## DEF
+    
+    def testBulkValues(self):
+        r = rand.makeStream(5, "bulk")
+        values = r.numbers(3, 9, 5000)
+        self.assertEqual(len(values), 5000)
+        self.assertEqual(set(values), set(range(3, 10)))
+        for s in r.astrings(4, 8, 1000):
+            self.assertTrue(4 <= len(s) and len(s) <= 8)
+            self.assertTrue(s.isalpha() and s.islower())
+        for s in r.nstrings(6, 6, 1000):
+            self.assertEqual(len(s), 6)
+            self.assertTrue(s.isdigit())
+    ## DEF
+    
+    @unittest.skipIf(rand.numpy is None, "numpy is not installed")
+    def testBulkValuesWithoutNumpy(self):
+        for seed in [ 0, 1, 12345, 2**62 + 11 ]:
+            a = rand.makeStream(seed, "bulk")
+            b = rand.makeStream(seed, "bulk")
+            b.numpy = None
+            self.assertEqual(a.numbers(1, 100000, 3000), b.numbers(1, 100000, 3000))
+            self.assertEqual(a.astrings(26, 50, 200), b.astrings(26, 50, 200))
+            self.assertEqual(a.nstrings(4, 4, 200), b.nstrings(4, 4, 200))
+            self.assertEqual(a.fixedPoints(4, 0.0, 0.2, 300), b.fixedPoints(4, 0.0, 0.2, 300))
+            ## Both streams are left in the same state
+            self.assertEqual(a.number(0, 2**30), b.number(0, 2**30))
+            self.assertEqual(a.fraction(), b.fraction())
+        ## FOR
+    ## DEF
+    
+    def testNURandConstants(self):
+        loadC, runC = nurand.makeForSeed(42)
+        self.assertTrue(nurand.validCRun(runC.cLast, loadC.cLast))
+        again = nurand.makeForSeed(42)
+        self.assertEqual((loadC.cLast, loadC.cId, loadC.orderLineItemId), (again[0].cLast, again[0].cId, again[0].orderLineItemId))
+        self.assertEqual((runC.cLast, runC.cId, runC.orderLineItemId), (again[1].cLast, again[1].cId, again[1].orderLineItemId))
+    ## DEF
+## CLASS
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------
+# Copyright (C) 2011
+# Andy Pavlo
+# http://www.cs.brown.edu/~pavlo/
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT
+# IN NO EVENT SHALL THE AUTHORS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+# -----------------------------------------------------------------------
+
+import cPickle
+import unittest
+
+import tests
+import constants
+from util import results
+
+NEW_ORDER = constants.TransactionTypes.NEW_ORDER
+PAYMENT = constants.TransactionTypes.PAYMENT
+
+def record(r, txn, wall, latency):
+    """Record a measured transaction that completed at the given wall time
+    after the given number of microseconds"""
+    stop = r.clockTime(wall)
+    r.stopTransaction(r.startTransaction(txn, stop - latency * 1000), True, stop)
+## DEF
+
+def intervalCount(r, index, txn):
+    hdr = results.makeIntervalHistogram()
+    hdr.decode_and_add(r.interval_times[index][txn])
+    return (hdr.get_total_count())
+## DEF
+
+class TestResults(unittest.TestCase):
+    
+    def makeResults(self, base, count):
+        r = results.Results()
+        r.startBenchmark()
+        for i in range(count):
+            record(r, NEW_ORDER, base + i * 0.25, 1000 + i)
+            if i % 2 == 0: record(r, PAYMENT, base + i * 0.25, 500)
+        ## FOR
+        r.stopBenchmark()
+        return (r)
+    ## DEF
+    
+    def testTimeline(self):
+        r = self.makeResults(1000000, 12)
+        self.assertEqual(r.txn_counters[NEW_ORDER], 12)
+        self.assertEqual(r.txn_counters[PAYMENT], 6)
+        self.assertEqual(sorted(r.interval_counters.keys()), [ 1000000, 1000001, 1000002 ])
+        for index in r.interval_counters.keys():
+            self.assertEqual(r.interval_counters[index][NEW_ORDER], 4)
+            self.assertEqual(r.interval_counters[index][PAYMENT], 2)
+            self.assertEqual(intervalCount(r, index, NEW_ORDER), 4)
+        ## FOR
+        self.assertEqual(r.txn_times[NEW_ORDER].get_total_count(), 12)
+        self.assertEqual(r.txn_times[PAYMENT].get_value_at_percentile(50), 500)
+    ## DEF
+    
+    def testLateCompletion(self):
+        r = results.Results()
+        r.startBenchmark()
+        for second in range(results.TIMELINE_OPEN_INTERVALS + 1):
+            record(r, NEW_ORDER, 1000000 + second, 100)
+        ## The first interval was closed, so this goes in the oldest open one
+        record(r, NEW_ORDER, 1000000.5, 100)
+        r.stopBenchmark()
+        self.assertEqual(r.interval_counters[1000000][NEW_ORDER], 1)
+        self.assertEqual(r.interval_counters[1000001][NEW_ORDER], 2)
+        self.assertEqual(r.txn_counters[NEW_ORDER], results.TIMELINE_OPEN_INTERVALS + 2)
+    ## DEF
+    
+    def testMergeAndEncode(self):
+        merged = self.makeResults(1000000, 12)
+        merged.merge(self.makeResults(1000002, 8))
+        self.assertEqual(merged.txn_counters[NEW_ORDER], 20)
+        self.assertEqual(merged.interval_counters[1000002][NEW_ORDER], 8)
+        self.assertEqual(merged.interval_counters[1000003][NEW_ORDER], 4)
+        self.assertEqual(intervalCount(merged, 1000002, NEW_ORDER), 8)
+        
+        ## Send both halves to another Results the way that the clients do
+        appended = results.Results()
+        for r in [ self.makeResults(1000000, 12), self.makeResults(1000002, 8) ]:
+            r.retryTransaction((results.TXN_SLOT[PAYMENT], 0), True, "locked")
+            r.encode()
+            appended.append(cPickle.loads(cPickle.dumps(r, cPickle.HIGHEST_PROTOCOL)))
+        ## FOR
+        self.assertEqual(appended.txn_counters, merged.txn_counters)
+        self.assertEqual(appended.interval_counters, merged.interval_counters)
+        self.assertEqual(appended.txn_retries[PAYMENT], { "locked": 2 })
+        for txn in [ NEW_ORDER, PAYMENT ]:
+            self.assertEqual(appended.txn_times[txn].get_total_count(), merged.txn_times[txn].get_total_count())
+            for p in [ 50, 90, 99 ]:
+                self.assertEqual(appended.txn_times[txn].get_value_at_percentile(p), merged.txn_times[txn].get_value_at_percentile(p))
+        ## FOR
+        self.assertEqual(intervalCount(appended, 1000002, NEW_ORDER), 8)
+    ## DEF
+## CLASS
+
+if __name__ == '__main__':
+    unittest.main()